@@ -0,0 +1,374 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Benchmarks the host against the reference plugin in benchmarks/reference,
+# built on first use. Results are compared with baselines.json and any that
+# are slower than the baseline by more than the tolerance are reported.
+#
+#   python benchmarks/bench.py [--quick] [--only PATTERN] [--check]
+#                              [--save-baseline] [--baseline FILE]
+#
+# Every result is a time in milliseconds or microseconds, lower is better.
+
+import os
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import argparse
+import platform
+import subprocess
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PYOFX_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'pyofx')
+sys.path.insert(0, PYOFX_DIR)
+
+import build
+import ofx_host
+import ofx_status_codes
+
+BUNDLE = build.BUNDLE
+PLUGIN = 'pyofx.benchmark.reference'
+CONTEXT = 'OfxImageEffectContextFilter'
+
+RESOLUTIONS = [
+    ('720p',  1280, 720),
+    ('1080p', 1920, 1080),
+    ('4K',    3840, 2160)
+]
+
+SUITES = [
+    ('property',     0),
+    ('parameter',    1),
+    ('image_effect', 2),
+    ('multi_thread', 3),
+    ('memory',       4)
+]
+
+class BenchmarkFailed(Exception):
+    pass
+
+class ReferenceInstance(object):
+    # One instance of the reference plugin with its clips connected and a
+    # sequence render begun, ready to render any number of frames
+    def __init__(self, host, width, height, source_file):
+        self._host = host
+        self._width = width
+        self._height = height
+
+        self.active_uid = host._create_plugin_instance(BUNDLE, PLUGIN, CONTEXT, width, height)
+        host._connect_image(self.active_uid, 'Source', source_file, width, height)
+        host._connect_buffer(self.active_uid, 'Output', width, height)
+        host._begin_render_sequence(self.active_uid, 1, 1000000)
+
+    def set(self, **parameters):
+        if self._host._load_plugin_parameters(self.active_uid, parameters) != ofx_status_codes.OFX_STATUS_OK:
+            raise BenchmarkFailed('could not set {}'.format(parameters))
+
+    def render(self, time=1):
+        if self._host._render(self.active_uid, self._width, self._height, time) != ofx_status_codes.OFX_STATUS_OK:
+            raise BenchmarkFailed('render failed')
+
+    def close(self):
+        self._host._end_render_sequence(self.active_uid)
+        self._host._disconnect_buffer(self.active_uid, 'Output')
+        self._host._disconnect_image(self.active_uid, 'Source')
+        self._host._destroy_plugin_instance(self.active_uid)
+
+def measure(func, repeat, rounds=5):
+    # Best time of one call over several rounds, the least disturbed by
+    # anything else running. Errors raised inside ctypes callbacks are
+    # unraisable so they are caught with the hook.
+    errors = []
+    previous_hook = sys.unraisablehook
+    sys.unraisablehook = lambda unraisable: errors.append(unraisable.exc_value)
+
+    try:
+        times = []
+        for r in range(0, rounds):
+            start = time.perf_counter()
+            for n in range(0, repeat):
+                func()
+            times.append((time.perf_counter() - start) / repeat)
+    finally:
+        sys.unraisablehook = previous_hook
+
+    if errors:
+        raise BenchmarkFailed('{}: {}'.format(type(errors[0]).__name__, errors[0]))
+
+    return min(times)
+
+def write_source_image(directory, name, width, height):
+    import numpy
+    import PIL.Image
+
+    y, x = numpy.mgrid[0:height, 0:width]
+    image = numpy.empty((height, width, 4), dtype=numpy.uint8)
+    image[:, :, 0] = x * 255 // max(1, width - 1)
+    image[:, :, 1] = y * 255 // max(1, height - 1)
+    image[:, :, 2] = (x ^ y) & 255
+    image[:, :, 3] = 255
+
+    filename = os.path.join(directory, name + '.png')
+    PIL.Image.fromarray(image).save(filename)
+    return filename
+
+class Benchmarks(object):
+    def __init__(self, plugin_dir, work_dir, quick=False):
+        self._plugin_dir = plugin_dir
+        self._work_dir = work_dir
+        self._quick = quick
+        self._rounds = 3 if quick else 5
+        # Plugins are told there are 4 CPUs on every machine so multiThread
+        # always dispatches to worker threads
+        self._host = ofx_host.OfxHost(4)
+        self._host._load_ofx_binary(plugin_dir, BUNDLE)
+        self._host._plugin_load_and_describe(BUNDLE, PLUGIN)
+        self._sources = {}
+
+    def _source(self, name, width, height):
+        if name not in self._sources:
+            self._sources[name] = write_source_image(self._work_dir, name, width, height)
+        return self._sources[name]
+
+    def _resolutions(self):
+        return RESOLUTIONS[:2] if self._quick else RESOLUTIONS
+
+    def benchmarks(self):
+        # Name, unit and function of every benchmark in the order they run
+        found = [('instance.create_destroy', 'ms', self.instance_creation)]
+
+        for name, width, height in self._resolutions():
+            found.append(('frame.{}.host'.format(name), 'ms', lambda w=width, h=height: self.host_overhead(w, h)))
+            found.append(('frame.{}.file_io'.format(name), 'ms', lambda w=width, h=height: self.file_io(w, h)))
+
+        for name, suite in SUITES:
+            found.append(('callback.{}'.format(name), 'us', lambda s=suite: self.callback(s)))
+
+        found.append(('multi_thread.dispatch', 'us', self.multi_thread_dispatch))
+        found.append(('image_memory.1080p', 'ms', lambda: self.image_memory(1920, 1080)))
+        found.append(('array.render_64x64', 'us', self.array_render))
+        found.append(('array.batch_64x64', 'us', self.array_batch))
+        found.append(('startup.list_cached', 'ms', lambda: self.startup(True)))
+        found.append(('startup.list_uncached', 'ms', lambda: self.startup(False)))
+
+        return found
+
+    def instance_creation(self):
+        host = self._host
+
+        def create_destroy():
+            host._destroy_plugin_instance(host._create_plugin_instance(BUNDLE, PLUGIN, CONTEXT, 1920, 1080))
+
+        return measure(create_destroy, 20, self._rounds) * 1000.0
+
+    def host_overhead(self, width, height):
+        # The plugin fetches its images and parameters but does no pixel
+        # work, so the whole render action is host overhead
+        instance = ReferenceInstance(self._host, width, height, self._source('source_{}x{}'.format(width, height), width, height))
+
+        try:
+            instance.set(process=0, threads=0)
+            return measure(instance.render, 50, self._rounds) * 1000.0
+        finally:
+            instance.close()
+
+    def file_io(self, width, height):
+        # Decoding the input file and encoding the output file of one frame,
+        # what a file based render adds to every frame
+        source = self._source('source_{}x{}'.format(width, height), width, height)
+        output = os.path.join(self._work_dir, 'output.png')
+        instance = ReferenceInstance(self._host, width, height, source)
+        host = self._host
+
+        def round_trip():
+            host._disconnect_image(instance.active_uid, 'Source')
+            host._connect_image(instance.active_uid, 'Source', source, width, height)
+            host._save_image(instance.active_uid, 'Output', output, width, height)
+
+        try:
+            return measure(round_trip, 1 if width > 2000 else 3, self._rounds) * 1000.0
+        finally:
+            instance.close()
+
+    def callback(self, suite, count=2000):
+        # Time per call from the difference between renders with and without
+        # the extra calls
+        instance = ReferenceInstance(self._host, 64, 64, self._source('source_64x64', 64, 64))
+
+        try:
+            instance.set(process=0, threads=0, callbacks=0, suite=suite)
+            base = measure(instance.render, 10, self._rounds)
+            instance.set(callbacks=count)
+            loaded = measure(instance.render, 3, self._rounds)
+        finally:
+            instance.close()
+
+        return max(0.0, loaded - base) / count * 1.0e6
+
+    def multi_thread_dispatch(self):
+        # One multiThread call across the reported CPUs on a tiny image
+        instance = ReferenceInstance(self._host, 64, 64, self._source('source_64x64', 64, 64))
+
+        try:
+            instance.set(process=1, threads=0)
+            inline = measure(instance.render, 20, self._rounds)
+            instance.set(threads=1)
+            threaded = measure(instance.render, 20, self._rounds)
+        finally:
+            instance.close()
+
+        return max(0.0, threaded - inline) * 1.0e6
+
+    def image_memory(self, width, height):
+        instance = ReferenceInstance(self._host, 64, 64, self._source('source_64x64', 64, 64))
+
+        try:
+            instance.set(process=0, threads=0, scratch=0)
+            base = measure(instance.render, 10, self._rounds)
+            instance.set(scratch=width * height * 4)
+            loaded = measure(instance.render, 5, self._rounds)
+        finally:
+            instance.close()
+
+        return max(0.0, loaded - base) * 1000.0
+
+    def _array_frames(self, count):
+        import numpy
+
+        frames = numpy.empty((count, 64, 64, 4), dtype=numpy.uint8)
+        frames[...] = numpy.arange(64 * 4, dtype=numpy.uint8).reshape(64, 4)
+        return frames
+
+    def array_render(self):
+        # Time per frame of the NumPy API, one render call per frame
+        frames = self._array_frames(1)
+        parameters = {'process': 0, 'threads': 0}
+
+        def render():
+            if self._host.render(PLUGIN, {'Source': frames[0]}, parameters, bundle=BUNDLE, context=CONTEXT) is None:
+                raise BenchmarkFailed('render failed')
+
+        try:
+            return measure(render, 100, self._rounds) * 1.0e6
+        finally:
+            self._host.release_warm()
+            self._host._plugin_load_and_describe(BUNDLE, PLUGIN)
+
+    def array_batch(self, count=500):
+        # Time per frame of a whole stack rendered in one render_batch call
+        frames = self._array_frames(count)
+        output = frames.copy()
+        parameters = {'process': 0, 'threads': 0}
+
+        def render():
+            if self._host.render_batch(PLUGIN, frames, parameters, bundle=BUNDLE, context=CONTEXT, out=output) is None:
+                raise BenchmarkFailed('render failed')
+
+        try:
+            return measure(render, 1, self._rounds) / count * 1.0e6
+        finally:
+            self._host.release_warm()
+            self._host._plugin_load_and_describe(BUNDLE, PLUGIN)
+
+    def startup(self, cached):
+        # Wall time of a whole pyofx list command in a new interpreter
+        cache_dir = os.path.join(self._work_dir, 'cache')
+        command = [sys.executable, PYOFX_DIR, 'list', self._plugin_dir, BUNDLE]
+        environment = dict(os.environ, PYOFX_CACHE=cache_dir)
+
+        def run():
+            if not cached:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            subprocess.run(command, env=environment, stdout=subprocess.DEVNULL, check=True)
+
+        if cached:
+            run()
+
+        return measure(run, 1, self._rounds) * 1000.0
+
+def compare(results, baseline, tolerance):
+    regressions = []
+
+    print('{:<28} {:>12} {:>12} {:>9}'.format('Benchmark', 'Result', 'Baseline', 'Change'))
+
+    for name, unit, value in results:
+        if value is None:
+            print('{:<28} {:>12}'.format(name, 'failed'))
+            continue
+
+        expected = baseline.get(name)
+
+        if expected is None:
+            print('{:<28} {:>9.3f} {:<2}'.format(name, value, unit))
+            continue
+
+        change = (value - expected) / expected if expected > 0 else 0.0
+        flag = ''
+
+        if change > tolerance:
+            flag = ' slower'
+            regressions.append(name)
+
+        print('{:<28} {:>9.3f} {:<2} {:>9.3f} {:<2} {:>+8.1%}{}'.format(name, value, unit, expected, unit, change, flag))
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pyofx against the reference plugin')
+    parser.add_argument('--quick', action='store_true', help='Fewer rounds and no 4K frames')
+    parser.add_argument('--only', default='*', help='Only run benchmarks matching this pattern')
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baselines.json'), help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='Replace the baseline results with these')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slow down before a result is reported, default 0.25')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 when any result is slower than its baseline')
+    args = parser.parse_args()
+
+    plugin_dir = os.path.join(BENCH_DIR, 'plugins')
+    build.build(plugin_dir)
+
+    try:
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)['results']
+    except (OSError, ValueError, KeyError):
+        baseline = {}
+
+    results = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        benchmarks = Benchmarks(plugin_dir, work_dir, args.quick)
+
+        for name, unit, func in benchmarks.benchmarks():
+            if not fnmatch.fnmatch(name, args.only):
+                continue
+
+            try:
+                results.append((name, unit, func()))
+            except BenchmarkFailed as e:
+                print('{} failed, {}'.format(name, e), file=sys.stderr)
+                results.append((name, unit, None))
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline.update({name: value for name, unit, value in results if value is not None})
+
+        with open(args.baseline, 'w') as fp:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(), 'results': baseline}, fp, indent=4, sort_keys=True)
+            fp.write('\n')
+
+    if args.check and regressions:
+        print('{} benchmarks are slower than their baseline'.format(len(regressions)), file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
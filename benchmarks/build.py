@@ -0,0 +1,75 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Builds the reference plugin into benchmarks/plugins/reference.ofx.bundle
+# with the same layout as an installed OFX bundle. Uses $CC, default cc.
+
+import os
+import sys
+import shlex
+import platform
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(BENCH_DIR, 'reference', 'reference.c')
+PLUGIN_DIR = os.path.join(BENCH_DIR, 'plugins')
+BUNDLE = 'reference'
+
+INFO_PLIST = '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+    <key>CFBundleExecutable</key>
+    <string>{0}.ofx</string>
+    <key>CFBundleIdentifier</key>
+    <string>pyofx.benchmark.{0}</string>
+    <key>CFBundlePackageType</key>
+    <string>BNDL</string>
+    <key>CFBundleVersion</key>
+    <string>1.0</string>
+</dict>
+</plist>
+'''
+
+def architecture_dir():
+    if platform.system() == 'Linux':
+        return 'Linux-x86-64'
+    elif platform.system() == 'Windows':
+        return 'Win64'
+    elif platform.system() == 'Darwin':
+        return 'MacOS-x86-64'
+    return None
+
+def binary_filename(plugin_dir=PLUGIN_DIR):
+    return os.path.join(plugin_dir, BUNDLE + '.ofx.bundle', 'Contents', architecture_dir(), BUNDLE + '.ofx')
+
+def build(plugin_dir=PLUGIN_DIR, force=False):
+    binary = binary_filename(plugin_dir)
+
+    if not force and os.path.isfile(binary) and os.path.getmtime(binary) >= os.path.getmtime(SOURCE):
+        return binary
+
+    os.makedirs(os.path.dirname(binary), exist_ok=True)
+
+    with open(os.path.join(plugin_dir, BUNDLE + '.ofx.bundle', 'Contents', 'Info.plist'), 'w') as fp:
+        fp.write(INFO_PLIST.format(BUNDLE))
+
+    compiler = shlex.split(os.environ.get('CC', 'cc'))
+    flags = ['-O2', '-std=c99', '-fPIC', '-fvisibility=hidden']
+
+    if platform.system() == 'Darwin':
+        flags += ['-bundle']
+    else:
+        flags += ['-shared']
+
+    subprocess.run(compiler + flags + ['-o', binary, SOURCE], check=True)
+
+    return binary
+
+if __name__ == '__main__':
+    print(build(force='--force' in sys.argv))
@@ -0,0 +1,378 @@
+/*
+ * Copyright 2020 by David Barker.
+ * All rights reserved.
+ * This file is part of pyofx the Python3 based OpenFX plugin render host,
+ * and is released under the "MIT License Agreement". Please see the LICENSE
+ * file that should have been included as part of this package.
+ *
+ * Reference OFX plugin used by the pyofx benchmarks. Its cost is set through
+ * its parameters so the host's share of a render can be measured:
+ *
+ *   gain       Multiplies every channel.
+ *   process    0 leaves the output untouched, so a render is host work only.
+ *   compute    Extra multiplies per channel, a fixed compute cost per pixel.
+ *   threads    1 splits the pixels across multiThread, 0 renders inline.
+ *   callbacks  Number of extra suite calls made on every render.
+ *   suite      Suite the extra calls go to, 0 property, 1 parameter,
+ *              2 image effect, 3 multi thread, 4 memory.
+ *   scratch    Bytes of image memory allocated, locked and freed per render.
+ *
+ * The OFX structs are declared here so it builds without the OFX headers.
+ */
+
+#include <string.h>
+#include <limits.h>
+#include <stddef.h>
+
+#if defined(_WIN32)
+#define OfxExport __declspec(dllexport)
+#else
+#define OfxExport __attribute__((visibility("default")))
+#endif
+
+typedef int OfxStatus;
+typedef void *OfxHandle;
+
+typedef struct {
+    OfxHandle host;
+    const void *(*fetchSuite)(OfxHandle host, const char *suiteName, int suiteVersion);
+} OfxHost;
+
+typedef struct {
+    const char *pluginApi;
+    int apiVersion;
+    const char *pluginIdentifier;
+    unsigned int pluginVersionMajor;
+    unsigned int pluginVersionMinor;
+    void (*setHost)(OfxHost *host);
+    OfxStatus (*mainEntry)(const char *action, const void *handle, OfxHandle inArgs, OfxHandle outArgs);
+} OfxPlugin;
+
+typedef struct {
+    OfxStatus (*propSetPointer)(OfxHandle, const char *, int, void *);
+    OfxStatus (*propSetString)(OfxHandle, const char *, int, const char *);
+    OfxStatus (*propSetDouble)(OfxHandle, const char *, int, double);
+    OfxStatus (*propSetInt)(OfxHandle, const char *, int, int);
+    OfxStatus (*propSetPointerN)(OfxHandle, const char *, int, void *const *);
+    OfxStatus (*propSetStringN)(OfxHandle, const char *, int, const char *const *);
+    OfxStatus (*propSetDoubleN)(OfxHandle, const char *, int, const double *);
+    OfxStatus (*propSetIntN)(OfxHandle, const char *, int, const int *);
+    OfxStatus (*propGetPointer)(OfxHandle, const char *, int, void **);
+    OfxStatus (*propGetString)(OfxHandle, const char *, int, char **);
+    OfxStatus (*propGetDouble)(OfxHandle, const char *, int, double *);
+    OfxStatus (*propGetInt)(OfxHandle, const char *, int, int *);
+    OfxStatus (*propGetPointerN)(OfxHandle, const char *, int, void **);
+    OfxStatus (*propGetStringN)(OfxHandle, const char *, int, char **);
+    OfxStatus (*propGetDoubleN)(OfxHandle, const char *, int, double *);
+    OfxStatus (*propGetIntN)(OfxHandle, const char *, int, int *);
+    OfxStatus (*propReset)(OfxHandle, const char *);
+    OfxStatus (*propGetDimension)(OfxHandle, const char *, int *);
+} OfxPropertySuiteV1;
+
+typedef struct {
+    OfxStatus (*paramDefine)(OfxHandle, const char *, const char *, OfxHandle *);
+    OfxStatus (*paramGetHandle)(OfxHandle, const char *, OfxHandle *, OfxHandle *);
+    OfxStatus (*paramSetGetPropertySet)(OfxHandle, OfxHandle *);
+    OfxStatus (*paramGetPropertySet)(OfxHandle, OfxHandle *);
+    OfxStatus (*paramGetValue)(OfxHandle, ...);
+    OfxStatus (*paramGetValueAtTime)(OfxHandle, double, ...);
+    OfxStatus (*paramGetDerivative)(OfxHandle, double, ...);
+    OfxStatus (*paramGetIntegral)(OfxHandle, double, double, ...);
+    OfxStatus (*paramSetValue)(OfxHandle, ...);
+    OfxStatus (*paramSetValueAtTime)(OfxHandle, double, ...);
+    OfxStatus (*paramGetNumKeys)(OfxHandle, unsigned int *);
+    OfxStatus (*paramGetKeyTime)(OfxHandle, unsigned int, double *);
+    OfxStatus (*paramGetKeyIndex)(OfxHandle, double, int, int *);
+} OfxParameterSuiteV1;
+
+typedef struct {
+    OfxStatus (*getPropertySet)(OfxHandle, OfxHandle *);
+    OfxStatus (*getParamSet)(OfxHandle, OfxHandle *);
+    OfxStatus (*clipDefine)(OfxHandle, const char *, OfxHandle *);
+    OfxStatus (*clipGetHandle)(OfxHandle, const char *, OfxHandle *, OfxHandle *);
+    OfxStatus (*clipGetPropertySet)(OfxHandle, OfxHandle *);
+    OfxStatus (*clipGetImage)(OfxHandle, double, const void *, OfxHandle *);
+    OfxStatus (*clipReleaseImage)(OfxHandle);
+    OfxStatus (*clipGetRegionOfDefinition)(OfxHandle, double, void *);
+    int (*abort)(OfxHandle);
+    OfxStatus (*imageMemoryAlloc)(OfxHandle, size_t, OfxHandle *);
+    OfxStatus (*imageMemoryFree)(OfxHandle);
+    OfxStatus (*imageMemoryLock)(OfxHandle, void **);
+    OfxStatus (*imageMemoryUnlock)(OfxHandle);
+} OfxImageEffectSuiteV1;
+
+typedef void (*OfxThreadFunctionV1)(unsigned int, unsigned int, void *);
+
+typedef struct {
+    OfxStatus (*multiThread)(OfxThreadFunctionV1, unsigned int, void *);
+    OfxStatus (*multiThreadNumCPUs)(unsigned int *);
+    OfxStatus (*multiThreadIndex)(unsigned int *);
+    int (*multiThreadIsSpawnedThread)(void);
+} OfxMultiThreadSuiteV1;
+
+typedef struct {
+    OfxStatus (*memoryAlloc)(void *, size_t, void **);
+    OfxStatus (*memoryFree)(void *);
+} OfxMemorySuiteV1;
+
+static OfxHost *gHost;
+static OfxPropertySuiteV1 *gProp;
+static OfxParameterSuiteV1 *gParam;
+static OfxImageEffectSuiteV1 *gEffect;
+static OfxMultiThreadSuiteV1 *gThread;
+static OfxMemorySuiteV1 *gMemory;
+
+typedef struct {
+    unsigned char *src;
+    unsigned char *dst;
+    int srcRowBytes;
+    int dstRowBytes;
+    int x1, y1, x2, y2;
+    double gain;
+    int compute;
+} ProcessArgs;
+
+static void setHost(OfxHost *host)
+{
+    gHost = host;
+}
+
+static void processRows(unsigned int index, unsigned int count, void *arg)
+{
+    ProcessArgs *a = arg;
+    int rows = a->y2 - a->y1;
+    int first = a->y1 + rows * index / count;
+    int last = a->y1 + rows * (index + 1) / count;
+
+    for (int y = first; y < last; y++) {
+        unsigned char *s = a->src + (ptrdiff_t)y * a->srcRowBytes;
+        unsigned char *d = a->dst + (ptrdiff_t)y * a->dstRowBytes;
+
+        for (int x = a->x1 * 4; x < a->x2 * 4; x++) {
+            double v = s[x] * a->gain;
+            for (int k = 0; k < a->compute; k++)
+                v = v * 1.0000001;
+            d[x] = v > 255.0 ? 255 : (unsigned char)v;
+        }
+    }
+}
+
+static OfxStatus describe(OfxHandle effect)
+{
+    OfxHandle props;
+
+    gEffect->getPropertySet(effect, &props);
+    gProp->propSetString(props, "OfxPropLabel", 0, "Benchmark Reference");
+    gProp->propSetString(props, "OfxImageEffectPluginPropGrouping", 0, "pyofx");
+    gProp->propSetString(props, "OfxImageEffectPropSupportedContexts", 0, "OfxImageEffectContextFilter");
+    gProp->propSetString(props, "OfxImageEffectPropSupportedContexts", 1, "OfxImageEffectContextGeneral");
+    gProp->propSetString(props, "OfxImageEffectPropSupportedPixelDepths", 0, "OfxBitDepthByte");
+
+    return 0;
+}
+
+static void defineInt(OfxHandle paramSet, const char *type, const char *name, int value)
+{
+    OfxHandle param;
+
+    gParam->paramDefine(paramSet, type, name, &param);
+    gProp->propSetInt(param, "OfxParamPropDefault", 0, value);
+
+    if (strcmp(type, "OfxParamTypeInteger") == 0) {
+        gProp->propSetInt(param, "OfxParamPropMin", 0, 0);
+        gProp->propSetInt(param, "OfxParamPropMax", 0, INT_MAX);
+    }
+}
+
+static OfxStatus describeInContext(OfxHandle effect)
+{
+    OfxHandle clip, paramSet, param;
+
+    gEffect->clipDefine(effect, "Source", &clip);
+    gEffect->clipDefine(effect, "Output", &clip);
+    gEffect->getParamSet(effect, &paramSet);
+
+    gParam->paramDefine(paramSet, "OfxParamTypeDouble", "gain", &param);
+    gProp->propSetDouble(param, "OfxParamPropDefault", 0, 1.0);
+
+    defineInt(paramSet, "OfxParamTypeBoolean", "process", 1);
+    defineInt(paramSet, "OfxParamTypeInteger", "compute", 0);
+    defineInt(paramSet, "OfxParamTypeBoolean", "threads", 1);
+    defineInt(paramSet, "OfxParamTypeInteger", "callbacks", 0);
+    defineInt(paramSet, "OfxParamTypeInteger", "suite", 0);
+    defineInt(paramSet, "OfxParamTypeInteger", "scratch", 0);
+
+    return 0;
+}
+
+static OfxStatus getInt(OfxHandle paramSet, const char *name, int *value)
+{
+    OfxHandle param;
+
+    if (gParam->paramGetHandle(paramSet, name, &param, NULL))
+        return 1;
+    return gParam->paramGetValue(param, value);
+}
+
+static OfxStatus extraCallbacks(OfxHandle effect, OfxHandle paramSet, OfxHandle inArgs, int suite, int count)
+{
+    OfxHandle gainParam, clip;
+    double value;
+    unsigned int cpus;
+    void *memory;
+    OfxStatus status = 0;
+
+    gParam->paramGetHandle(paramSet, "gain", &gainParam, NULL);
+
+    for (int n = 0; n < count && status == 0; n++) {
+        switch (suite) {
+        case 0:
+            status = gProp->propGetDouble(inArgs, "OfxPropTime", 0, &value);
+            break;
+        case 1:
+            status = gParam->paramGetValue(gainParam, &value);
+            break;
+        case 2:
+            status = gEffect->clipGetHandle(effect, "Source", &clip, NULL);
+            break;
+        case 3:
+            status = gThread->multiThreadNumCPUs(&cpus);
+            break;
+        case 4:
+            status = gMemory->memoryAlloc((void *)effect, 64, &memory);
+            if (status == 0)
+                status = gMemory->memoryFree(memory);
+            break;
+        }
+    }
+
+    return status;
+}
+
+static OfxStatus scratchMemory(OfxHandle effect, int bytes)
+{
+    OfxHandle memoryHandle;
+    void *memory;
+
+    if (gEffect->imageMemoryAlloc(effect, (size_t)bytes, &memoryHandle))
+        return 1;
+
+    if (gEffect->imageMemoryLock(memoryHandle, &memory) == 0) {
+        memset(memory, 0, (size_t)bytes);
+        gEffect->imageMemoryUnlock(memoryHandle);
+    }
+
+    return gEffect->imageMemoryFree(memoryHandle);
+}
+
+static OfxStatus render(OfxHandle effect, OfxHandle inArgs)
+{
+    OfxHandle paramSet, gainParam, source, output, sourceImage, outputImage;
+    ProcessArgs args;
+    int window[4], process, threads, callbacks, suite, scratch;
+    double time;
+    unsigned int cpus = 1;
+    OfxStatus status = 0;
+
+    gProp->propGetDouble(inArgs, "OfxPropTime", 0, &time);
+    gProp->propGetIntN(inArgs, "OfxImageEffectPropRenderWindow", 4, window);
+
+    gEffect->getParamSet(effect, &paramSet);
+    gParam->paramGetHandle(paramSet, "gain", &gainParam, NULL);
+    gParam->paramGetValueAtTime(gainParam, time, &args.gain);
+    getInt(paramSet, "process", &process);
+    getInt(paramSet, "compute", &args.compute);
+    getInt(paramSet, "threads", &threads);
+    getInt(paramSet, "callbacks", &callbacks);
+    getInt(paramSet, "suite", &suite);
+    getInt(paramSet, "scratch", &scratch);
+
+    gEffect->clipGetHandle(effect, "Source", &source, NULL);
+    gEffect->clipGetHandle(effect, "Output", &output, NULL);
+
+    if (gEffect->clipGetImage(source, time, NULL, &sourceImage))
+        return 1;
+
+    if (gEffect->clipGetImage(output, time, NULL, &outputImage)) {
+        gEffect->clipReleaseImage(sourceImage);
+        return 1;
+    }
+
+    gProp->propGetPointer(sourceImage, "OfxImagePropData", 0, (void **)&args.src);
+    gProp->propGetInt(sourceImage, "OfxImagePropRowBytes", 0, &args.srcRowBytes);
+    gProp->propGetPointer(outputImage, "OfxImagePropData", 0, (void **)&args.dst);
+    gProp->propGetInt(outputImage, "OfxImagePropRowBytes", 0, &args.dstRowBytes);
+
+    args.x1 = window[0];
+    args.y1 = window[1];
+    args.x2 = window[2];
+    args.y2 = window[3];
+
+    if (callbacks > 0)
+        status = extraCallbacks(effect, paramSet, inArgs, suite, callbacks);
+
+    if (status == 0 && scratch > 0)
+        status = scratchMemory(effect, scratch);
+
+    if (status == 0 && process) {
+        if (threads) {
+            gThread->multiThreadNumCPUs(&cpus);
+            status = gThread->multiThread(processRows, cpus, &args);
+        } else {
+            processRows(0, 1, &args);
+        }
+    }
+
+    gEffect->clipReleaseImage(sourceImage);
+    gEffect->clipReleaseImage(outputImage);
+
+    return status;
+}
+
+static OfxStatus mainEntry(const char *action, const void *handle, OfxHandle inArgs, OfxHandle outArgs)
+{
+    OfxHandle effect = (OfxHandle)handle;
+
+    (void)outArgs;
+
+    if (strcmp(action, "OfxActionLoad") == 0) {
+        gProp = (OfxPropertySuiteV1 *)gHost->fetchSuite(gHost->host, "OfxPropertySuite", 1);
+        gParam = (OfxParameterSuiteV1 *)gHost->fetchSuite(gHost->host, "OfxParameterSuite", 1);
+        gEffect = (OfxImageEffectSuiteV1 *)gHost->fetchSuite(gHost->host, "OfxImageEffectSuite", 1);
+        gThread = (OfxMultiThreadSuiteV1 *)gHost->fetchSuite(gHost->host, "OfxMultiThreadSuite", 1);
+        gMemory = (OfxMemorySuiteV1 *)gHost->fetchSuite(gHost->host, "OfxMemorySuite", 1);
+        return 0;
+    }
+
+    if (strcmp(action, "OfxActionDescribe") == 0)
+        return describe(effect);
+
+    if (strcmp(action, "OfxImageEffectActionDescribeInContext") == 0)
+        return describeInContext(effect);
+
+    if (strcmp(action, "OfxImageEffectActionRender") == 0)
+        return render(effect, inArgs);
+
+    /* kOfxStatReplyDefault, the host's default behaviour is used */
+    return 14;
+}
+
+static OfxPlugin reference = {
+    "OfxImageEffectPluginAPI",
+    1,
+    "pyofx.benchmark.reference",
+    1,
+    0,
+    setHost,
+    mainEntry
+};
+
+OfxExport int OfxGetNumberOfPlugins(void)
+{
+    return 1;
+}
+
+OfxExport OfxPlugin *OfxGetPlugin(int nth)
+{
+    return nth == 0 ? &reference : NULL;
+}
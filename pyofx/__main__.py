@@ -6,21 +6,55 @@
 # and is released under the "MIT License Agreement". Please see the LICENSE
 # file that should have been included as part of this package.
 
+import time
+started = time.perf_counter()
+
 import argparse
+import atexit
 import os
+import sys
 import logging
+import ofx_catalog
 import ofx_host
+import ofx_memory_accountant
+import ofx_render_server
+
+imported = time.perf_counter()
 
 def extant_file(x):
     if not os.path.isfile(x):
         raise argparse.ArgumentTypeError("{0} does not exist".format(x))
     return x
 
+def extant_file_or_pattern(x):
+    # Frame number patterns are checked per frame at render time
+    if '#' in x or '%' in x:
+        return x
+    return extant_file(x)
+
 def extant_dir(x):
     if not os.path.isdir(x):
         raise argparse.ArgumentTypeError("{0} does not exist".format(x))
     return x
 
+def startup_report(times, host):
+    # Printed at exit so it covers every command, including those that exit
+    # early. Seconds are measured from the first line of this script, for
+    # interpreter start up use python -X importtime.
+    now = time.perf_counter()
+    print('Startup report', file=sys.stderr)
+    print('    imports       {:8.1f} ms'.format((times['imported'] - times['started']) * 1000.0), file=sys.stderr)
+    print('    args and host {:8.1f} ms'.format((times['host'] - times['imported']) * 1000.0), file=sys.stderr)
+    print('    command       {:8.1f} ms'.format((now - times['host']) * 1000.0), file=sys.stderr)
+    print('    total         {:8.1f} ms'.format((now - times['started']) * 1000.0), file=sys.stderr)
+    print('    numpy loaded  {}'.format('numpy' in sys.modules), file=sys.stderr)
+    print('    PIL loaded    {}'.format('PIL.Image' in sys.modules), file=sys.stderr)
+
+    if host is not None:
+        state = host.startup_state()
+        print('    bundles       {}'.format(', '.join(state['bundles']) or 'none loaded'), file=sys.stderr)
+        print('    suites        {}'.format(', '.join(state['suites']) or 'none built'), file=sys.stderr)
+
 def valid_filetype(x):
     if x.rsplit('.', 1)[1].lower() not in ['png', 'jpg']:
         raise argparse.ArgumentTypeError("Filetype needs to be PNG or JPG")
@@ -46,6 +80,81 @@ if __name__ == "__main__":
         help='Set logging level {debug|info|warning|error|critical}'
     )
 
+    logging_parser.add_argument(
+        '--startup-report',
+        action='store_true',
+        help='Print import, set up and command times, and what was loaded'
+    )
+
+    # Create the host options parent parser
+    host_parser = argparse.ArgumentParser(
+        add_help=False
+    )
+
+    host_parser.add_argument(
+        '--threads',
+        metavar='',
+        type=int,
+        default=None,
+        help='Number of CPUs reported to plugins, defaults to the CPUs this process may run on'
+    )
+
+    host_parser.add_argument(
+        '--negative-row-bytes',
+        action='store_true',
+        help='Keep images top down in memory and pass plugins a negative row stride instead of flipping'
+    )
+
+    host_parser.add_argument(
+        '--timing',
+        action='store_true',
+        help='Time every plugin action and host callback and print a summary'
+    )
+
+    host_parser.add_argument(
+        '--trace',
+        metavar='',
+        default=None,
+        help='Also write the timings to this file as a Chrome trace'
+    )
+
+    host_parser.add_argument(
+        '--memory-budget',
+        metavar='',
+        type=ofx_memory_accountant.parse_size,
+        default=None,
+        help='Most image and plugin memory this process may hold, as bytes or with a K, M or G suffix'
+    )
+
+    host_parser.add_argument(
+        '--instance-memory-budget',
+        metavar='',
+        type=ofx_memory_accountant.parse_size,
+        default=None,
+        help='Most image and plugin memory each plugin instance may hold'
+    )
+
+    host_parser.add_argument(
+        '--spill',
+        metavar='',
+        choices=['file', 'compress', 'none'],
+        default='file',
+        help='Where unlocked image memory goes when over budget: file, compress or none, default file'
+    )
+
+    # Create the processes parent parser
+    processes_parser = argparse.ArgumentParser(
+        add_help=False
+    )
+
+    processes_parser.add_argument(
+        '-p', '--processes',
+        metavar='',
+        type=int,
+        default=1,
+        help='Split a frame sequence across this many worker processes'
+    )
+
     # Create the directory parent parser
     dir_parser = argparse.ArgumentParser(
         add_help=False
@@ -108,12 +217,12 @@ if __name__ == "__main__":
     filter_subparser = subparsers.add_parser(
         'filter',
         help='Render using filter context and default parameters',
-        parents=[dir_parser, bundle_parser, plugin_parser, logging_parser]
+        parents=[dir_parser, bundle_parser, plugin_parser, host_parser, processes_parser, logging_parser]
     )
 
     filter_subparser.add_argument(
         'infile',
-        type=extant_file,
+        type=extant_file_or_pattern,
         help='Filename of input image'
     )
 
@@ -123,11 +232,26 @@ if __name__ == "__main__":
         help='Filename of output image'
     )
 
+    filter_subparser.add_argument(
+        '-f', '--frames',
+        nargs=2,
+        type=int,
+        metavar=('FIRST', 'LAST'),
+        help='Render a sequence of frames, use # or %%04d in filenames for the frame number'
+    )
+
+    filter_subparser.add_argument(
+        '-s', '--step',
+        type=int,
+        default=1,
+        help='Frame step when rendering a sequence'
+    )
+
     # Add render to subparser
     render_subparser = subparsers.add_parser(
         'render',
         help='Render using JSON file to set parameters',
-        parents=[dir_parser, logging_parser]
+        parents=[dir_parser, host_parser, processes_parser, logging_parser]
     )
 
     render_subparser.add_argument(
@@ -136,6 +260,97 @@ if __name__ == "__main__":
         help='Load parameter settings from JSON file'
     )
 
+    # Create the socket parent parser
+    socket_parser = argparse.ArgumentParser(
+        add_help=False
+    )
+
+    socket_parser.add_argument(
+        '--socket',
+        default=ofx_render_server.DEFAULT_SOCKET,
+        help='Unix socket used by the render server'
+    )
+
+    # Add serve to subparser
+    serve_subparser = subparsers.add_parser(
+        'serve',
+        help='Run a render server that keeps plugins loaded between jobs',
+        parents=[socket_parser, host_parser, logging_parser]
+    )
+
+    # Add submit to subparser
+    submit_subparser = subparsers.add_parser(
+        'submit',
+        help='Send a JSON render job to a running render server',
+        parents=[dir_parser, socket_parser, logging_parser]
+    )
+
+    submit_subparser.add_argument(
+        'json',
+        type=extant_file,
+        help='Load parameter settings from JSON file'
+    )
+
+    # Add catalog to subparser
+    catalog_subparser = subparsers.add_parser(
+        'catalog',
+        help='Describe every bundle on the OFX plugin paths into a plugin index',
+        parents=[logging_parser]
+    )
+
+    catalog_subparser.add_argument(
+        '-p', '--processes',
+        metavar='',
+        type=int,
+        default=1,
+        help='Describe this many bundles at once in worker processes'
+    )
+
+    catalog_subparser.add_argument(
+        'paths',
+        nargs='*',
+        type=extant_dir,
+        help='Directories to search, default OFX_PLUGIN_PATH and the standard OFX location'
+    )
+
+    catalog_subparser.add_argument(
+        '-o', '--index',
+        default=None,
+        help='Plugin index file, default catalog.json in the describe cache directory'
+    )
+
+    # Add find to subparser
+    find_subparser = subparsers.add_parser(
+        'find',
+        help='Search the plugin index without loading any bundles',
+        parents=[logging_parser]
+    )
+
+    find_subparser.add_argument(
+        'pattern',
+        nargs='?',
+        default='*',
+        help='Plugin identifier or label, * and ? wildcards allowed'
+    )
+
+    find_subparser.add_argument(
+        '-c', '--context',
+        default=None,
+        help='Only plugins that support this context, e.g. OfxImageEffectContextFilter'
+    )
+
+    find_subparser.add_argument(
+        '-d', '--details',
+        action='store_true',
+        help='Show each plugin\'s clips and parameters'
+    )
+
+    find_subparser.add_argument(
+        '-i', '--index',
+        default=None,
+        help='Plugin index file, default catalog.json in the describe cache directory'
+    )
+
     args = parser.parse_args()
 
     if args.loglevel == 'debug':
@@ -154,9 +369,51 @@ if __name__ == "__main__":
         level=log_level
     )
 
-    host = ofx_host.OfxHost()
+    times = {'started': started, 'imported': imported, 'host': time.perf_counter()}
+    host = None
+
+    if args.startup_report:
+        atexit.register(lambda: startup_report(times, host))
+
+    if args.command == 'serve':
+        ofx_render_server.OfxRenderServer(
+            args.socket,
+            args.threads,
+            args.negative_row_bytes,
+            args.timing or args.trace is not None,
+            args.trace,
+            args.memory_budget,
+            args.instance_memory_budget,
+            args.spill
+        ).serve()
+        exit()
+    elif args.command == 'submit':
+        exit(ofx_render_server.submit_job(args.dir, args.json, args.socket))
+    elif args.command == 'find':
+        catalog = ofx_catalog.load_catalog(args.index or ofx_catalog.default_index_file())
+        if catalog is not None:
+            ofx_catalog.display_plugins(catalog, args.pattern, args.context, args.details)
+        exit()
+
+    instrument = getattr(args, 'timing', False) or getattr(args, 'trace', None) is not None
+
+    host = ofx_host.OfxHost(
+        getattr(args, 'threads', None),
+        getattr(args, 'negative_row_bytes', False),
+        instrument,
+        getattr(args, 'memory_budget', None),
+        getattr(args, 'instance_memory_budget', None),
+        getattr(args, 'spill', 'file')
+    )
+    times['host'] = time.perf_counter()
+
+    # Reported at exit as failed renders exit early
+    if instrument:
+        atexit.register(host.report_timing, args.trace)
 
-    if args.command == 'list':
+    if args.command == 'catalog':
+        host.build_catalog(args.paths, args.processes, args.index)
+    elif args.command == 'list':
         host.display_plugins(args.dir, args.bundle)
     elif args.command == 'params':
         if args.json is not None:
@@ -164,8 +421,12 @@ if __name__ == "__main__":
         else:
             host.display_params(args.dir, args.bundle, args.plugin)
     elif args.command == 'filter':
-        host.filter_render(args.dir, args.bundle, args.plugin, args.infile, args.outfile)
+        if args.frames is not None:
+            host.filter_render(args.dir, args.bundle, args.plugin, args.infile, args.outfile,
+                               args.frames[0], args.frames[1], args.step, args.processes)
+        else:
+            host.filter_render(args.dir, args.bundle, args.plugin, args.infile, args.outfile)
     elif args.command == 'render':
-        host.json_render(args.dir, args.json)
+        host.json_render(args.dir, args.json, args.processes)
 
 
@@ -0,0 +1,172 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# An animated parameter in the render JSON replaces its value with a list of
+# keys, each segment uses the interpolation of the key that starts it:
+#
+#     "gain": {
+#         "interpolation": "linear",
+#         "keys": [
+#             {"time": 1,  "value": 1.0},
+#             {"time": 10, "value": 2.0, "interpolation": "smooth"},
+#             {"time": 20, "value": 0.5}
+#         ]
+#     }
+#
+# numpy is imported where it is used, inspection commands never need it.
+
+import bisect
+import ctypes
+import logging
+
+INTERPOLATIONS = {
+    'constant': 0,
+    'linear':   1,
+    'smooth':   2
+}
+
+def parse_animation(name, animation, dimensions, discrete=False):
+    import numpy
+
+    if not isinstance(animation, dict) or not animation.get('keys'):
+        logging.error('Animated parameter {} requires a list of keys'.format(name))
+        return None
+
+    default_interpolation = animation.get('interpolation', 'linear')
+    keys = sorted(animation['keys'], key=lambda k: k['time'])
+
+    times = []
+    values = []
+    interpolations = []
+
+    for key in keys:
+        value = key['value'] if isinstance(key['value'], list) else [key['value']]
+
+        if len(value) != dimensions:
+            logging.error('Key at time {} for {} needs {} values'.format(key['time'], name, dimensions))
+            return None
+
+        interpolation = key.get('interpolation', default_interpolation)
+
+        if interpolation not in INTERPOLATIONS:
+            logging.error('{} is not a valid interpolation for {}'.format(interpolation, name))
+            return None
+
+        if times and key['time'] == times[-1]:
+            logging.error('Two keys at time {} for {}'.format(key['time'], name))
+            return None
+
+        times.append(float(key['time']))
+        values.append([float(v) for v in value])
+
+        # Booleans and choices can only step from one key to the next
+        interpolations.append(INTERPOLATIONS['constant'] if discrete else INTERPOLATIONS[interpolation])
+
+    return {
+        'times':          times,
+        'values':         numpy.array(values, dtype=numpy.float64),
+        'interpolations': numpy.array(interpolations, dtype=numpy.int8),
+        'frames':         {}
+    }
+
+def sample_animation(animation, sample_times):
+    # Evaluates the curve at every sample time at once, returning an array of
+    # [len(sample_times), dimensions]. Smooth segments are cubic Hermite with
+    # Catmull-Rom style tangents, held flat outside the first and last keys.
+    import numpy
+
+    times = numpy.array(animation['times'], dtype=numpy.float64)
+    values = animation['values']
+    t = numpy.asarray(sample_times, dtype=numpy.float64)
+
+    if len(times) == 1:
+        return numpy.repeat(values, len(t), axis=0)
+
+    segment = numpy.clip(numpy.searchsorted(times, t, side='right') - 1, 0, len(times) - 2)
+    t0 = times[segment]
+    t1 = times[segment + 1]
+    span = (t1 - t0)[:, None]
+    u = numpy.clip((t - t0) / (t1 - t0), 0.0, 1.0)[:, None]
+
+    v0 = values[segment]
+    v1 = values[segment + 1]
+
+    tangents = numpy.gradient(values, times, axis=0, edge_order=1)
+    m0 = tangents[segment] * span
+    m1 = tangents[segment + 1] * span
+
+    u2 = u * u
+    u3 = u2 * u
+
+    smooth = (2 * u3 - 3 * u2 + 1) * v0 + (u3 - 2 * u2 + u) * m0 + (3 * u2 - 2 * u3) * v1 + (u3 - u2) * m1
+    linear = v0 + u * (v1 - v0)
+
+    mode = animation['interpolations'][segment][:, None]
+    result = numpy.where(mode == INTERPOLATIONS['constant'], v0, numpy.where(mode == INTERPOLATIONS['linear'], linear, smooth))
+
+    return numpy.where((t >= times[-1])[:, None], values[-1], result)
+
+def animation_values(animation, sample_times, value_type):
+    # Samples converted to the lists of ctypes values the parameter suite
+    # hands to plugins
+    import numpy
+
+    samples = sample_animation(animation, sample_times)
+
+    if value_type is ctypes.c_int:
+        samples = numpy.rint(samples).astype(numpy.int64)
+
+    return [[value_type(v) for v in row] for row in samples.tolist()]
+
+def sample_frames(animation, frames, value_type):
+    animation['frames'] = dict(zip(frames, animation_values(animation, frames, value_type)))
+
+def key_index(animation, time, direction):
+    # Matches paramGetKeyIndex, 0 for a key at exactly time, -1 for the
+    # nearest key before it and 1 for the nearest key after it
+    times = animation['times']
+
+    if direction == 0:
+        index = bisect.bisect_left(times, time)
+        return index if index < len(times) and times[index] == time else None
+    elif direction < 0:
+        index = bisect.bisect_left(times, time) - 1
+        return index if index >= 0 else None
+    else:
+        index = bisect.bisect_right(times, time)
+        return index if index < len(times) else None
+
+def derivative(animation, time, step=1.0e-3):
+    samples = sample_animation(animation, [time - step, time + step])
+    return (samples[1] - samples[0]) / (2.0 * step)
+
+def integral(animation, time1, time2, samples_per_frame=16):
+    # Trapezoid rule over the sampled curve, exact for linear segments and
+    # close for the rest at 16 samples a frame
+    import numpy
+
+    count = max(2, int(abs(time2 - time1) * samples_per_frame) + 1)
+    t = numpy.linspace(time1, time2, count)
+    samples = sample_animation(animation, t)
+    return (0.5 * (samples[1:] + samples[:-1]) * numpy.diff(t)[:, None]).sum(axis=0)
+
+def sample_curve(points, low, high, count):
+    # Parametric curves are smooth through their control points, flat outside
+    # the first and last, and zero with no control points at all
+    import numpy
+
+    if not points:
+        return numpy.zeros(count)
+
+    curve = {
+        'times':          [p[0] for p in points],
+        'values':         numpy.array([[p[1]] for p in points], dtype=numpy.float64),
+        'interpolations': numpy.full(len(points), INTERPOLATIONS['smooth'], dtype=numpy.int8)
+    }
+
+    return sample_animation(curve, numpy.linspace(low, high, count))[:, 0]
@@ -0,0 +1,100 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Pixel formats of NumPy arrays handed to the host by Python callers. Arrays
+# are height x width x 3 or 4, top row first, in one of the OFX bit depths.
+# When a plugin does not support the caller's format the pixels are converted
+# to one it does, and the output is converted back again.
+
+import logging
+
+PIXEL_DEPTHS = {
+    'uint8':   'OfxBitDepthByte',
+    'uint16':  'OfxBitDepthShort',
+    'float32': 'OfxBitDepthFloat'
+}
+
+DTYPES = {depth: dtype for dtype, depth in PIXEL_DEPTHS.items()}
+
+COMPONENTS = {
+    4: 'OfxImageComponentRGBA',
+    3: 'OfxImageComponentRGB'
+}
+
+CHANNELS = {components: channels for channels, components in COMPONENTS.items()}
+
+# Most precise first, the order a missing format is replaced in
+DEPTH_PREFERENCE = ['OfxBitDepthFloat', 'OfxBitDepthShort', 'OfxBitDepthByte']
+COMPONENT_PREFERENCE = ['OfxImageComponentRGBA', 'OfxImageComponentRGB']
+
+WHITE = {
+    'OfxBitDepthByte':  255,
+    'OfxBitDepthShort': 65535,
+    'OfxBitDepthFloat': 1.0
+}
+
+def pixel_format(array):
+    # Returns (pixel depth, components) of an array or None if it is not one
+    # the host can render
+    if array.ndim != 3 or array.shape[2] not in COMPONENTS:
+        logging.error('Image array must be height x width x 3 or 4, got {}'.format(array.shape))
+        return None
+
+    if array.dtype.name not in PIXEL_DEPTHS:
+        logging.error('Image array must be uint8, uint16 or float32, got {}'.format(array.dtype.name))
+        return None
+
+    return PIXEL_DEPTHS[array.dtype.name], COMPONENTS[array.shape[2]]
+
+def choose(requested, supported, preference):
+    if requested in supported:
+        return requested
+
+    for candidate in preference:
+        if candidate in supported:
+            return candidate
+
+    return None
+
+def convert(array, depth, components, out=None):
+    # Returns the array in the given format, the array itself when it is
+    # already in it and no output array is given
+    import numpy
+
+    from_depth = PIXEL_DEPTHS[array.dtype.name]
+    channels = CHANNELS[components]
+
+    if out is None and from_depth == depth and array.shape[2] == channels:
+        return array
+
+    if out is None:
+        out = numpy.empty(array.shape[:2] + (channels,), dtype=DTYPES[depth])
+
+    # Drop or add alpha, an added alpha is opaque
+    source = array[:, :, :min(channels, array.shape[2])]
+
+    if channels > array.shape[2]:
+        out[:, :, 3] = WHITE[depth]
+
+    target = out[:, :, :source.shape[2]]
+
+    if from_depth == depth:
+        target[...] = source
+    elif depth == 'OfxBitDepthFloat':
+        numpy.multiply(source, 1.0 / WHITE[from_depth], out=target, casting='unsafe')
+    elif from_depth == 'OfxBitDepthFloat':
+        scaled = numpy.clip(source, 0.0, 1.0) * WHITE[depth]
+        numpy.rint(scaled, out=scaled)
+        target[...] = scaled
+    elif depth == 'OfxBitDepthShort':
+        # 255 * 257 is 65535, every byte value maps to its 16 bit equivalent
+        numpy.multiply(source, 257, out=target, dtype=numpy.uint16)
+    else:
+        target[...] = (source.astype(numpy.uint32) * 255 + 32767) // 65535
+
+    return out
@@ -0,0 +1,177 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# The catalog is a single JSON index of every plugin found on the OFX plugin
+# paths, built from the describe cache so it can be searched without loading
+# any bundles. Each plugin keeps its bundle, version, label, grouping and,
+# per context, its clips and parameter types.
+
+import os
+import json
+import fnmatch
+import logging
+import platform
+import ofx_describe_cache
+
+CATALOG_VERSION = 1
+
+def plugin_paths(paths=None):
+    # Directories named on the command line, otherwise OFX_PLUGIN_PATH
+    # followed by the standard install location, as other OFX hosts search
+    if paths:
+        return [os.path.abspath(p) for p in paths]
+
+    paths = [p for p in os.environ.get('OFX_PLUGIN_PATH', '').split(os.pathsep) if p]
+
+    if platform.system() == 'Windows':
+        paths.append(os.path.join(os.environ.get('CommonProgramFiles', 'C:\\Program Files\\Common Files'), 'OFX', 'Plugins'))
+    elif platform.system() == 'Darwin':
+        paths.append('/Library/OFX/Plugins')
+    else:
+        paths.append('/usr/OFX/Plugins')
+
+    return [os.path.abspath(p) for p in paths]
+
+def find_bundles(paths):
+    # Returns (directory, bundle) for every *.ofx.bundle under the paths in
+    # search order, without looking inside the bundles themselves
+    bundles = []
+
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in [d for d in dirs if d.endswith('.ofx.bundle')]:
+                bundles.append((root, name[:-len('.ofx.bundle')]))
+                dirs.remove(name)
+
+    return bundles
+
+def default_index_file():
+    return os.path.join(ofx_describe_cache.cache_directory(), 'catalog.json')
+
+def _property(properties, key, default=None):
+    if key not in properties or not properties[key][2]:
+        return default
+    return properties[key][2][0]
+
+def summarise_bundle(directory, bundle, entry):
+    # Reduces a describe cache entry to the catalog record of each plugin
+    plugins = {}
+
+    for plugin_id, cached in entry['plugins'].items():
+        describe = cached['describe']
+        record = {
+            'bundle':    bundle,
+            'directory': directory,
+            'version':   '{}.{}'.format(*cached['version']),
+            'contexts':  {}
+        }
+
+        if describe is not None:
+            record['label'] = _property(describe['ctypes'], 'OfxPropLabel', plugin_id)
+            record['grouping'] = _property(describe['ctypes'], 'OfxImageEffectPluginPropGrouping', '')
+
+            for context, descriptor in describe['contexts'].items():
+                record['contexts'][context] = {
+                    'clips': {
+                        name: 'optional' if _property(clip, 'OfxImageClipPropOptional', 0) else 'required'
+                        for name, clip in descriptor['clips'].items()
+                    },
+                    'parameters': {
+                        name: _property(param['ctypes'], 'OfxParamPropType', '').replace('OfxParamType', '')
+                        for name, param in descriptor['parameters'].items()
+                    }
+                }
+
+        plugins[plugin_id] = record
+
+    return plugins
+
+def write_catalog(index_file, paths, summaries):
+    # The first bundle on the search path wins when two define the same
+    # plugin identifier
+    catalog = {
+        'version': CATALOG_VERSION,
+        'paths':   paths,
+        'plugins': {}
+    }
+
+    for plugins in summaries:
+        for plugin_id, record in plugins.items():
+            if plugin_id in catalog['plugins']:
+                logging.warning('{} in {} is hidden by {}'.format(
+                    plugin_id,
+                    os.path.join(record['directory'], record['bundle']),
+                    os.path.join(catalog['plugins'][plugin_id]['directory'], catalog['plugins'][plugin_id]['bundle'])
+                ))
+                continue
+            catalog['plugins'][plugin_id] = record
+
+    os.makedirs(os.path.dirname(os.path.abspath(index_file)), exist_ok=True)
+    temp_file = '{}.{}.tmp'.format(index_file, os.getpid())
+
+    with open(temp_file, 'w') as fp:
+        json.dump(catalog, fp, separators=(',', ':'), sort_keys=True)
+
+    os.replace(temp_file, index_file)
+
+    return catalog
+
+def load_catalog(index_file):
+    try:
+        with open(index_file, 'r') as fp:
+            catalog = json.load(fp)
+    except (OSError, ValueError) as e:
+        logging.error('Could not read plugin catalog {}: {}'.format(index_file, e))
+        return None
+
+    if catalog.get('version') != CATALOG_VERSION:
+        logging.error('Plugin catalog {} is out of date, run the catalog command'.format(index_file))
+        return None
+
+    return catalog
+
+def find_plugins(catalog, pattern='*', context=None):
+    # Matches the pattern against plugin identifiers and labels, ignoring case
+    pattern = pattern.lower()
+    matches = []
+
+    for plugin_id in sorted(catalog['plugins']):
+        record = catalog['plugins'][plugin_id]
+        names = [plugin_id.lower(), record.get('label', '').lower()]
+
+        if not any(fnmatch.fnmatchcase(n, pattern) for n in names):
+            continue
+        if context is not None and context not in record['contexts']:
+            continue
+
+        matches.append((plugin_id, record))
+
+    return matches
+
+def display_plugins(catalog, pattern='*', context=None, details=False):
+    matches = find_plugins(catalog, pattern, context)
+
+    for plugin_id, record in matches:
+        print('{}  v{}  {}'.format(plugin_id, record['version'], os.path.join(record['directory'], record['bundle'] + '.ofx.bundle')))
+
+        if not details:
+            continue
+
+        print('    Label:     {}'.format(record.get('label', '')))
+        print('    Grouping:  {}'.format(record.get('grouping', '')))
+
+        for ctx, descriptor in sorted(record['contexts'].items()):
+            print('    {}'.format(ctx))
+            for name, optional in sorted(descriptor['clips'].items()):
+                print('        Clip       {:<24} {}'.format(name, optional))
+            for name, param_type in sorted(descriptor['parameters'].items()):
+                print('        Parameter  {:<24} {}'.format(name, param_type))
+
+    if not matches:
+        logging.error('No plugins match {}'.format(pattern))
@@ -0,0 +1,127 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Images handed to plugins by clipGetImage. Each is one clip at one time and
+# is counted every time it is given out, the host holds a reference to the
+# frame it connects to a clip for the frame being rendered. Frames at other
+# times are loaded on demand through the clip's source into memory pool
+# blocks, and when the last reference is released the image's handle is
+# dropped and its block goes back to the pool for the next frame.
+
+import ctypes
+import logging
+import threading
+import ofx_ctypes
+
+class OfxClipImages(object):
+    def __init__(self, handles, accountant, pool):
+        self._handles = handles
+        self._accountant = accountant
+        self._pool = pool
+        # Render actions on several threads fetch images at once, and a source
+        # creates the image it loads
+        self._lock = threading.RLock()
+        self._loaded = 0
+        self._freed = 0
+
+    def create(self, clip, time, np_array, image_ctypes, charge=None, block=None):
+        # Returns a new image with one reference. The charge is released and
+        # the block freed when the last reference goes.
+        handle = clip['handle']
+
+        image_handle = ofx_ctypes.CStructOfxHandle(
+            ctypes.c_char_p(b'OfxImage'),
+            handle.bundle,
+            handle.plugin,
+            handle.context,
+            handle.active_uid,
+            handle.name
+        )
+
+        image = {
+            'handle':      image_handle,
+            'numpy_array': np_array,
+            'ctypes':      image_ctypes,
+            'charge':      charge,
+            'block':       block,
+            'clip':        clip,
+            'time':        time,
+            'refs':        1
+        }
+
+        with self._lock:
+            clip['images'].append(image)
+            self._handles[ctypes.addressof(image_handle)] = image
+
+        return image
+
+    def get(self, clip, time):
+        # Returns the clip's image at time with a reference added, or None.
+        # A clip with no source has the one image connected to it at every
+        # time.
+        with self._lock:
+            image = clip['image']
+
+            if not image or (image['time'] != time and clip['source'] is not None):
+                image = next((image for image in clip['images'] if image['time'] == time), None)
+
+            if image is None:
+                if clip['source'] is None:
+                    return None
+
+                image = clip['source'](time)
+                if image is not None:
+                    self._loaded += 1
+                return image
+
+            image['refs'] += 1
+
+            return image
+
+    def release(self, image):
+        with self._lock:
+            if image['refs'] < 1:
+                logging.warning('Image released more times than it was fetched')
+                return
+
+            image['refs'] -= 1
+
+            if image['refs'] == 0:
+                self._free(image)
+
+    def _free(self, image):
+        self._handles.pop(ctypes.addressof(image['handle']), None)
+        image['clip']['images'].remove(image)
+        self._freed += 1
+
+        if image['charge'] is not None:
+            self._accountant.release(*image['charge'])
+
+        if image['block'] is not None:
+            self._pool.free(image['block'], 'frame')
+
+        image['numpy_array'] = None
+
+    def release_all(self, clip):
+        # Frees the images a plugin fetched and did not release, returns how
+        # many there were
+        with self._lock:
+            held = [image for image in clip['images'] if image is not clip['image']]
+
+            for image in held:
+                image['refs'] = 0
+                self._free(image)
+
+            return len(held)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'freed':  self._freed
+            }
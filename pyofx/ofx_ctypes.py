@@ -353,6 +353,68 @@ class CStructOfxParameterSuite(ctypes.Structure):
                  ('paramEditBegin',         cfunc_param_edit_begin),
                  ('paramEditEnd',           cfunc_param_edit_end)]
 
+########################################################################################
+#
+# CTYPE Parametric Parameter Suite functions and structure
+#
+########################################################################################
+
+cfunc_parametric_param_get_value =                  ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_double,
+                                                                     ctypes.POINTER(ctypes.c_double))
+
+cfunc_parametric_param_get_n_control_points =       ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_double,
+                                                                     ctypes.POINTER(ctypes.c_int))
+
+cfunc_parametric_param_get_nth_control_point =      ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_int,
+                                                                     ctypes.POINTER(ctypes.c_double),
+                                                                     ctypes.POINTER(ctypes.c_double))
+
+cfunc_parametric_param_set_nth_control_point =      ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_bool)
+
+cfunc_parametric_param_add_control_point =          ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_double,
+                                                                     ctypes.c_bool)
+
+cfunc_parametric_param_delete_control_point =       ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int,
+                                                                     ctypes.c_int)
+
+cfunc_parametric_param_delete_all_control_points =  ctypes.CFUNCTYPE(ctypes.c_int,
+                                                                     ctypes.c_void_p,
+                                                                     ctypes.c_int)
+
+class CStructOfxParametricParameterSuite(ctypes.Structure):
+     _fields_ = [('parametricParamGetValue',                cfunc_parametric_param_get_value),
+                 ('parametricParamGetNControlPoints',       cfunc_parametric_param_get_n_control_points),
+                 ('parametricParamGetNthControlPoint',      cfunc_parametric_param_get_nth_control_point),
+                 ('parametricParamSetNthControlPoint',      cfunc_parametric_param_set_nth_control_point),
+                 ('parametricParamAddControlPoint',         cfunc_parametric_param_add_control_point),
+                 ('parametricParamDeleteControlPoint',      cfunc_parametric_param_delete_control_point),
+                 ('parametricParamDeleteAllControlPoints',  cfunc_parametric_param_delete_all_control_points)]
+
 ########################################################################################
 #
 # CTYPE Image Effect Suite functions and structure
@@ -401,7 +463,7 @@ cfunc_abort =                         ctypes.CFUNCTYPE(ctypes.c_int,
 
 cfunc_image_memory_alloc =            ctypes.CFUNCTYPE(ctypes.c_int,
                                                        ctypes.c_void_p,
-                                                       ctypes.c_int,
+                                                       ctypes.c_size_t,
                                                        ctypes.POINTER(ctypes.c_void_p))
 
 cfunc_image_memory_free =             ctypes.CFUNCTYPE(ctypes.c_int,
@@ -437,7 +499,7 @@ class CStructOfxImageEffectSuite(ctypes.Structure):
 
 cfunc_memory_alloc = ctypes.CFUNCTYPE(ctypes.c_int,
                                       ctypes.c_void_p,
-                                      ctypes.c_int,
+                                      ctypes.c_size_t,
                                       ctypes.POINTER(ctypes.c_void_p))
 
 cfunc_memory_free =  ctypes.CFUNCTYPE(ctypes.c_int,
@@ -453,7 +515,7 @@ class CStructOfxMemorySuite(ctypes.Structure):
 #
 ########################################################################################
 
-cfunc_thread_function = ctypes.CFUNCTYPE(ctypes.c_int,
+cfunc_thread_function = ctypes.CFUNCTYPE(None,
                                          ctypes.c_uint,
                                          ctypes.c_uint,
                                          ctypes.c_void_p)
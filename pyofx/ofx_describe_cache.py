@@ -0,0 +1,160 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Describe results only depend on the plugin binary, so the list and params
+# commands keep them in a cache file per binary and answer from it without
+# loading the bundle. An entry is used while the binary's size and mtime are
+# unchanged, or when its content hash still matches after they change.
+
+import os
+import json
+import hashlib
+import logging
+import ofx_property_sets
+
+CACHE_VERSION = 2
+
+def cache_directory():
+    return os.environ.get('PYOFX_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pyofx'))
+
+def _cache_filename(binary):
+    key = hashlib.sha1(os.path.abspath(binary).encode('utf-8')).hexdigest()
+    return os.path.join(cache_directory(), 'describe', key + '.json')
+
+def _content_hash(binary):
+    digest = hashlib.sha256()
+
+    with open(binary, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+def _identity(binary, content_hash=None):
+    stat = os.stat(binary)
+
+    return {
+        'path':  os.path.abspath(binary),
+        'size':  stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'hash':  content_hash if content_hash is not None else _content_hash(binary)
+    }
+
+def load(binary):
+    cache_file = _cache_filename(binary)
+
+    try:
+        with open(cache_file, 'r') as fp:
+            entry = json.load(fp)
+        stat = os.stat(binary)
+    except (OSError, ValueError):
+        return None
+
+    if entry.get('version') != CACHE_VERSION:
+        return None
+
+    identity = entry['identity']
+
+    if identity['size'] != stat.st_size or identity['mtime'] != stat.st_mtime_ns:
+        if identity['size'] != stat.st_size or identity['hash'] != _content_hash(binary):
+            return None
+
+        # Same contents with a new mtime, for example after a copy
+        entry['identity'] = _identity(binary, identity['hash'])
+        _write(cache_file, entry)
+
+    return entry
+
+def store(binary, bundle_record):
+    cache_file = _cache_filename(binary)
+    entry = load(binary)
+
+    if entry is None:
+        entry = {
+            'version':  CACHE_VERSION,
+            'identity': _identity(binary),
+            'plugins':  {}
+        }
+
+    for plugin_id, plugin in bundle_record['plugins'].items():
+        if plugin['loaded'] or plugin_id not in entry['plugins']:
+            entry['plugins'][plugin_id] = {
+                'version':  [plugin['pluginVersionMajor'], plugin['pluginVersionMinor']],
+                'describe': _plugin_as_dict(plugin) if plugin['loaded'] else None
+            }
+
+    _write(cache_file, entry)
+
+def _write(cache_file, entry):
+    # Written to a temporary file and renamed so concurrent commands never
+    # read a partial entry
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+
+        with open(temp_file, 'w') as fp:
+            json.dump(entry, fp)
+
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        logging.warning('Could not write describe cache {}: {}'.format(cache_file, e))
+
+def _plugin_as_dict(plugin):
+    return {
+        'ctypes':   plugin['ctypes'].as_dict(),
+        'contexts': {
+            context: {
+                'clips':      {key: clip['ctypes'].as_dict() for key, clip in descriptor['clips'].items()},
+                'parameters': {
+                    key: {'ctypes': param['ctypes'].as_dict(), 'curves': param.get('curves')}
+                    for key, param in descriptor['parameters'].items()
+                }
+            }
+            for context, descriptor in plugin['contexts'].items()
+        }
+    }
+
+def bundle_record(binary, entry):
+    # A stand-in for the bundle record made by OfxHost._load_ofx_binary with
+    # enough of each described plugin to list and save its parameters. It
+    # has no cdll, so nothing can be rendered with it.
+    plugins = {}
+
+    for plugin_id, cached in entry['plugins'].items():
+        plugin = cached['describe']
+
+        plugins[plugin_id] = {
+            'pluginVersionMajor': cached['version'][0],
+            'pluginVersionMinor': cached['version'][1],
+            'loaded':             False,
+            'contexts':           {}
+        }
+
+        if plugin is None:
+            continue
+
+        plugins[plugin_id]['ctypes'] = ofx_property_sets.OfxEffectProperties.from_dict(plugin['ctypes'])
+
+        for context, descriptor in plugin['contexts'].items():
+            parameters = {}
+
+            for key, param in descriptor['parameters'].items():
+                parameters[key] = {'ctypes': ofx_property_sets.OfxParameterProperties.from_dict(param['ctypes'])}
+                if param['curves'] is not None:
+                    parameters[key]['curves'] = param['curves']
+
+            plugins[plugin_id]['contexts'][context] = {
+                'clips':      {key: {'ctypes': ofx_property_sets.OfxClipProperties.from_dict(clip)} for key, clip in descriptor['clips'].items()},
+                'parameters': parameters
+            }
+
+    return {
+        'cdll':     None,
+        'filename': binary,
+        'plugins':  plugins
+    }
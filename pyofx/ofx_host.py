@@ -9,17 +9,27 @@
 import ctypes
 import platform
 import os
+import sys
+import re
 import json
 import uuid
 import logging
-import PIL.Image
-import PIL.ImageOps
-import numpy
+import functools
 
+import ofx_animation
+import ofx_array
+import ofx_catalog
+import ofx_clip_images
 import ofx_ctypes
+import ofx_describe_cache
 import ofx_property_suite
 import ofx_parameter_suite
+import ofx_parametric_parameter_suite
 import ofx_image_effect_suite
+import ofx_instrument
+import ofx_memory_accountant
+import ofx_memory_pool
+import ofx_memory_spill
 import ofx_memory_suite
 import ofx_multi_thread_suite
 import ofx_message_suite
@@ -27,7 +37,7 @@ import ofx_property_sets
 import ofx_status_codes
 
 class OfxHost():
-    def __init__(self):
+    def __init__(self, num_threads=None, negative_row_bytes=False, instrument=False, memory_budget=None, instance_memory_budget=None, spill='file'):
         host_handle = ofx_ctypes.CStructOfxHandle(
             ctypes.c_char_p(b'OfxTypeImageEffectHost'),
             ctypes.c_char_p(b''),
@@ -37,44 +47,96 @@ class OfxHost():
             ctypes.c_char_p(b'pyofx')
         )
 
-        fetch_suite_func = ofx_ctypes.cfunc_fetch_suite(self._fetch_suite)
+        instrumentation = ofx_instrument.OfxInstrumentation() if instrument else None
+
+        if instrumentation is not None:
+            fetch_suite_func = ofx_ctypes.cfunc_fetch_suite(instrumentation.wrap_callback('OfxHost', 'fetch_suite', self._fetch_suite))
+        else:
+            fetch_suite_func = ofx_ctypes.cfunc_fetch_suite(self._fetch_suite)
         host_struct = ofx_ctypes.CStructOfxHost(ctypes.pointer(host_handle), fetch_suite_func)
 
+        accountant = ofx_memory_accountant.OfxMemoryAccountant(memory_budget, instance_memory_budget)
+        memory_pool = ofx_memory_pool.OfxMemoryPool(accountant)
+        memory_spill = ofx_memory_spill.OfxMemorySpill(accountant, memory_pool, spill)
+        handles = {}
+
         self._host = {
             'handle':         host_handle,
             'fetchSuiteFunc': fetch_suite_func,
             'hostStruct':     host_struct,
             'bundles':        {},
             'active':         {'plugins':{}, 'memory':{}},
-            'ctypes':         ofx_property_sets.OfxHostProperties()
+            'warm':           {},
+            'rowOrder':       'top_down' if negative_row_bytes else 'bottom_up',
+            'numThreads':     num_threads,
+            'framePool':      None,
+            'memoryPool':     memory_pool,
+            'accountant':     accountant,
+            'memorySpill':    memory_spill,
+            'clipImages':     ofx_clip_images.OfxClipImages(handles, accountant, memory_pool),
+            'handles':        handles,
+            'instrument':     instrumentation,
+            'ctypes':         None
         }
 
-        self._property_suite = ofx_property_suite.OfxPropertySuite(self._host)
-        self._parameter_suite = ofx_parameter_suite.OfxParameterSuite(self._host)
-        self._image_effect_suite = ofx_image_effect_suite.OfxImageEffectSuite(self._host)
-        self._memory_suite = ofx_memory_suite.OfxMemorySuite(self._host)
-        self._multi_thread_suite = ofx_multi_thread_suite.OfxMultiThreadSuite()
-        self._message_suite = ofx_message_suite.OfxMessageSuite()
+        # Memory the host can free without affecting a render is evicted when
+        # an allocation would go over the memory budget. Spilled blocks go
+        # back to the pool, so the pool is trimmed after spilling.
+        accountant.add_cache('unlocked image memory', memory_spill.spillable_bytes, memory_spill.spill, charged=True)
+        accountant.add_cache('freed plugin memory', memory_pool.pooled, lambda owner, n_bytes: memory_pool.trim())
+        accountant.add_cache('idle staging buffers', self._idle_staging_bytes, self._evict_idle_staging, charged=True)
+
+        # Every handle given to a plugin is registered by address, so the suites
+        # can find what it refers to without decoding the handle's strings
+        self._register_handle(self._host)
+
+        # Suites are built the first time they are needed, commands answered
+        # from the describe cache never build any
+        self._suites = {}
+        self._suite_factories = {
+            'OfxImageEffectSuite':         (ofx_image_effect_suite.OfxImageEffectSuite, (self._host,)),
+            'OfxPropertySuite':            (ofx_property_suite.OfxPropertySuite, (self._host,)),
+            'OfxParameterSuite':           (ofx_parameter_suite.OfxParameterSuite, (self._host,)),
+            'OfxParametricParameterSuite': (ofx_parametric_parameter_suite.OfxParametricParameterSuite, (self._host,)),
+            'OfxMemorySuite':              (ofx_memory_suite.OfxMemorySuite, (self._host,)),
+            'OfxMultiThreadSuite':         (ofx_multi_thread_suite.OfxMultiThreadSuite, (num_threads,)),
+            'OfxMessageSuite':             (ofx_message_suite.OfxMessageSuite, ())
+        }
+
+    def _register_handle(self, record):
+        self._host['handles'][ctypes.addressof(record['handle'])] = record
+
+    def _unregister_handle(self, record):
+        self._host['handles'].pop(ctypes.addressof(record['handle']), None)
+
+    def _suite(self, name):
+        if name not in self._suites:
+            suite_class, args = self._suite_factories[name]
+
+            if self._host['instrument'] is not None:
+                self._suites[name] = self._host['instrument'].build_suite(name, suite_class, args)
+            else:
+                self._suites[name] = suite_class(*args)
+
+        return self._suites[name]
+
+    def _entry_point(self, plugin):
+        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+
+        if self._host['instrument'] is not None:
+            return self._host['instrument'].wrap_action(plugin['handle'].plugin.decode('utf-8'), entry_point)
+
+        return entry_point
 
     def _fetch_suite(self, ctype_handle, ctype_name, ctype_version):
         requested_suite = ctype_name.decode("utf-8")
 
-        if requested_suite == 'OfxImageEffectSuite':
-            return self._image_effect_suite.get_pointer_as_int()
-        elif requested_suite == 'OfxPropertySuite':
-            return self._property_suite.get_pointer_as_int()
-        elif requested_suite == 'OfxParameterSuite':
-            return self._parameter_suite.get_pointer_as_int()
-        elif requested_suite == 'OfxMemorySuite':
-            return self._memory_suite.get_pointer_as_int()
-        elif requested_suite == 'OfxMultiThreadSuite':
-            return self._multi_thread_suite.get_pointer_as_int()
-        elif requested_suite == 'OfxMessageSuite':
-            return self._message_suite.get_pointer_as_int()
-        else:
+        if requested_suite not in self._suite_factories:
             logging.warning('{} is not supported by host'.format(requested_suite))
             return 0
 
+        return self._suite(requested_suite).get_pointer_as_int()
+
     def _list_all_plugins(self, bundle):
         for p in self._host['bundles'][bundle]['plugins']:
             print(p)
@@ -113,6 +175,11 @@ class OfxHost():
                 'width': 1280,
                 'height': 720
             },
+            'frame_range': {
+                'first': 1,
+                'last': 1,
+                'step': 1
+            },
             'image_paths': {
                 'required': {},
                 'optional': {}
@@ -126,9 +193,11 @@ class OfxHost():
             p = params[key]['ctypes'].as_tuple()
             if p[0] is not None:
                 plugin_variables['parameters'][p[0]] = p[1]
+            elif 'curves' in params[key] and params[key]['ctypes'].get_value('OfxParamPropSecret') != 1:
+                plugin_variables['parameters'][params[key]['ctypes'].value_as_string('OfxParamPropScriptName')] = params[key]['curves']
 
         for key in clips:
-            is_optional = clips[key]['ctypes'].get('OfxImageClipPropOptional').value
+            is_optional = clips[key]['ctypes'].get_value('OfxImageClipPropOptional')
             if is_optional == 1:
                 plugin_variables['image_paths']['optional'][key] = None
             else:
@@ -140,35 +209,79 @@ class OfxHost():
         return ofx_status_codes.OFX_STATUS_OK
 
     def _load_plugin_parameters(self, active_uid, update_params):
-        current_params = self._host['active']['plugins'][active_uid]['parameters']
+        # Every setting is checked against the context's schema before any are
+        # applied, and all the problems are reported together
+        instance = self._host['active']['plugins'][active_uid]
+        schema = self._host['bundles'][instance['bundle']]['plugins'][instance['plugin']]['contexts'][instance['context']]['schema']
+        current_params = instance['parameters']
+
+        errors = []
+        updates = []
+
+        unknown = sorted(p for p in update_params if p not in schema)
+        if unknown:
+            errors.append('unknown parameters {}'.format(', '.join(unknown)))
 
         for p in update_params:
-            for cp in current_params:
-                script_name = current_params[cp]['ctypes'].value_as_string('OfxParamPropScriptName')
-                if script_name == p:
-                    param_type = current_params[cp]['ctypes'].value_as_string('OfxParamPropType')
-                    if param_type == 'OfxParamTypeInteger':
-                        current_params[cp]['value'] = [ctypes.c_int(update_params[p])]
-                    elif param_type == 'OfxParamTypeDouble':
-                        current_params[cp]['value'] = [ctypes.c_double(update_params[p])]
-                    elif param_type == 'OfxParamTypeBoolean':
-                        current_params[cp]['value'] = [ctypes.c_int(update_params[p])]
-                    elif param_type == 'OfxParamTypeChoice':
-                        current_params[cp]['value'] = [ctypes.c_int(update_params[p])]
-                    elif param_type == 'OfxParamTypeRGBA':
-                        current_params[cp]['value'] = [ctypes.c_double(d) for d in update_params[p]]
-                    elif param_type == 'OfxParamTypeRGB':
-                        current_params[cp]['value'] = [ctypes.c_double(d) for d in update_params[p]]
-                    elif param_type == 'OfxParamTypeDouble2D':
-                        current_params[cp]['value'] = [ctypes.c_double(d) for d in update_params[p]]
-                    elif param_type == 'OfxParamTypeInteger2D':
-                        current_params[cp]['value'] = [ctypes.c_int(i) for i in update_params[p]]
-                    elif param_type == 'OfxParamTypeDouble3D':
-                        current_params[cp]['value'] = [ctypes.c_double(d) for d in update_params[p]]
-                    elif param_type == 'OfxParamTypeInteger3D':
-                        current_params[cp]['value'] = [ctypes.c_int(i) for i in update_params[p]]
-                    elif param_type == 'OfxParamTypeString':
-                        current_params[cp]['value'] = [ctypes.create_string_buffer(update_params[p].encode('utf-8'))]
+            if p not in schema:
+                continue
+
+            entry = schema[p]
+            value = update_params[p]
+
+            if entry['type'] == 'OfxParamTypeParametric':
+                if not isinstance(value, list) or len(value) != entry['dimensions']:
+                    errors.append('{} needs a list of {} curves'.format(p, entry['dimensions']))
+                elif not all(isinstance(point, list) and len(point) == 2 for curve in value for point in curve):
+                    errors.append('{} control points must be [position, value] pairs'.format(p))
+                else:
+                    updates.append((entry['name'], 'curves', value))
+            elif isinstance(value, dict):
+                if entry['value_type'] is ctypes.c_char_p:
+                    errors.append('{} can not be animated'.format(p))
+                    continue
+
+                key_errors = []
+                for key in value.get('keys', []):
+                    if not isinstance(key, dict) or not isinstance(key.get('time'), (int, float)):
+                        key_errors.append('{} keys need a time and a value'.format(p))
+                        continue
+
+                    error = ofx_parameter_suite.validate_value(entry, key.get('value'))
+                    if error is not None:
+                        key_errors.append('{} key at time {} {}'.format(p, key['time'], error))
+
+                if key_errors:
+                    errors.extend(key_errors)
+                    continue
+
+                animation = ofx_animation.parse_animation(p, value, entry['dimensions'], entry['options'] is not None)
+
+                if animation is None:
+                    errors.append('{} has invalid keys'.format(p))
+                else:
+                    updates.append((entry['name'], 'animation', animation))
+            else:
+                error = ofx_parameter_suite.validate_value(entry, value)
+
+                if error is not None:
+                    errors.append('{} {}'.format(p, error))
+                elif entry['value_type'] is ctypes.c_char_p:
+                    updates.append((entry['name'], 'value', [ctypes.create_string_buffer(value.encode('utf-8'))]))
+                else:
+                    convert = int if entry['value_type'] is ctypes.c_int else float
+                    values = value if isinstance(value, list) else [value]
+                    updates.append((entry['name'], 'value', [entry['value_type'](convert(v)) for v in values]))
+
+        if errors:
+            logging.error('Invalid parameters for {}:\n    {}'.format(instance['plugin'], '\n    '.join(errors)))
+            return ofx_status_codes.OFX_STATUS_ERR_VALUE
+
+        for name, kind, value in updates:
+            if kind == 'curves':
+                self._suite('OfxParametricParameterSuite').load_curves(current_params[name], value)
+            else:
+                current_params[name][kind] = value
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -184,9 +297,36 @@ class OfxHost():
             logging.error('Cannot determin the system')
             return None
 
+    def _unregister_descriptors(self, plugin):
+        # The plugin's context descriptors and the clips and parameters defined
+        # in them. Records restored from the describe cache have no handles.
+        for context_descriptor in plugin['contexts'].values():
+            for record in list(context_descriptor['clips'].values()) + list(context_descriptor['parameters'].values()):
+                if 'handle' in record:
+                    self._unregister_handle(record)
+
+            if 'handle' in context_descriptor:
+                self._unregister_handle(context_descriptor)
+
+    def _unregister_bundle(self, bundle):
+        for plugin in self._host['bundles'][bundle]['plugins'].values():
+            self._unregister_descriptors(plugin)
+
+            if 'handle' in plugin:
+                self._unregister_handle(plugin)
+
     def _load_ofx_binary(self, ofx_dir, bundle):
         filename = self._generate_ofx_binary_filename(ofx_dir, bundle)
         plugin_lib = ctypes.CDLL(filename)
+
+        # The records of a bundle loaded before are replaced
+        if bundle in self._host['bundles']:
+            self._unregister_bundle(bundle)
+
+        # Plugins can only see the host properties once setHost is called
+        if self._host['ctypes'] is None:
+            self._host['ctypes'] = ofx_property_sets.OfxHostProperties()
+
         plugin_count = plugin_lib.OfxGetNumberOfPlugins()
         self._host['bundles'][bundle] = {
             'cdll':          plugin_lib,
@@ -221,16 +361,23 @@ class OfxHost():
                 'pluginVersionMinor': plugin_info.pluginVersionMinor,
                 'setHost':            plugin_info.setHost,
                 'mainEntry':          plugin_info.mainEntry,
+                'loaded':             False,
                 'contexts':           {},
                 'ctypes':             ofx_property_sets.OfxEffectProperties(plugin_id)
             }
 
+            self._register_handle(self._host['bundles'][bundle]['plugins'][plugin_id])
+
         return ofx_status_codes.OFX_STATUS_OK
 
     def _plugin_load_and_describe(self, bundle, plugin_id):
         plugin = self._host['bundles'][bundle]['plugins'][plugin_id]
 
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        # Describing again after an unload replaces the context descriptors
+        self._unregister_descriptors(plugin)
+        plugin['contexts'] = {}
+
+        entry_point = self._entry_point(plugin)
 
         entry_point(
             ctypes.c_char_p(b'OfxActionLoad'),
@@ -272,6 +419,7 @@ class OfxHost():
                 }
 
                 plugin['contexts'][context_string] = context_descriptor
+                self._register_handle(context_descriptor)
 
                 entry_point(
                     ctypes.c_char_p(b'OfxImageEffectActionDescribeInContext'),
@@ -280,11 +428,15 @@ class OfxHost():
                     0
                 )
 
+                context_descriptor['schema'] = ofx_parameter_suite.parameter_schema(context_descriptor['parameters'])
+
+        plugin['loaded'] = True
+
         return ofx_status_codes.OFX_STATUS_OK
 
     def _create_plugin_instance(self, bundle_id, plugin_id, context, width, height):
         plugin = self._host['bundles'][bundle_id]['plugins'][plugin_id]
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        entry_point = self._entry_point(plugin)
 
         active_uid = str(uuid.uuid1())
 
@@ -302,25 +454,34 @@ class OfxHost():
 
         for key in plugin['contexts'][context]['clips']:
             descriptor = plugin['contexts'][context]['clips'][key]
-            clips[key] = self._image_effect_suite.create_clip_instance(descriptor, active_uid)
+            clips[key] = self._suite('OfxImageEffectSuite').create_clip_instance(descriptor, active_uid)
             clips[key]['ctypes'].add_instance_properties()
 
         for key in plugin['contexts'][context]['parameters']:
             descriptor = plugin['contexts'][context]['parameters'][key]
-            parameters[key] = self._parameter_suite.create_parameter_instance(descriptor, active_uid)
+            parameters[key] = self._suite('OfxParameterSuite').create_parameter_instance(descriptor, active_uid)
 
         active_plugin = {
             'handle':     effect_handle,
+            'active_uid': active_uid,
             'mainEntry':  plugin['mainEntry'],
+            'bundle':     bundle_id,
             'plugin':     plugin_id,
             'context':    context,
             'clips':      clips,
             'parameters': parameters,
-            'render':     {'sequence': None, 'action':None},
+            'render':     {'sequence': None, 'action': {}},
             'ctypes':     ofx_property_sets.OfxEffectInstanceProperties(context, width, height)
         }
 
         self._host['active']['plugins'][active_uid] = active_plugin
+        self._register_handle(active_plugin)
+
+        for key in clips:
+            self._register_handle(clips[key])
+
+        for key in parameters:
+            self._register_handle(parameters[key])
 
         entry_point(
             ctypes.c_char_p(b'OfxActionCreateInstance'),
@@ -331,62 +492,334 @@ class OfxHost():
 
         return active_uid
 
-    def _connect_image(self, active_uid, clip_name, filename, width, height):
-        im_frame = PIL.ImageOps.flip(PIL.Image.open(filename))
-        im_frame = im_frame.convert('RGBA')
-        im_frame = im_frame.resize((width, height), PIL.Image.ANTIALIAS)
-        np_frame = numpy.ascontiguousarray(numpy.array(im_frame.getdata()), dtype=numpy.uint8)
-        frame_ptr = np_frame.ctypes.data_as(ctypes.c_void_p).value
+    def _image_to_rgba_buffer(self, image, width, height):
+        # Returns a contiguous uint8 RGBA array in the host's row order. Bottom
+        # up matches OfxImageEffectHostPropNativeOriginBottomLeft directly, top
+        # down keeps the file's row order and is described to the plugin with
+        # a negative OfxImagePropRowBytes.
+        import PIL.Image
+        import numpy
 
-        image_handle = ofx_ctypes.CStructOfxHandle(
-            ctypes.c_char_p(b'OfxImage'),
-            self._host['active']['plugins'][active_uid]['handle'].bundle,
-            self._host['active']['plugins'][active_uid]['handle'].plugin,
-            self._host['active']['plugins'][active_uid]['handle'].context,
-            self._host['active']['plugins'][active_uid]['handle'].active_uid,
-            ctypes.c_char_p(clip_name.encode('utf-8'))
-        )
+        bottom_up = self._host['rowOrder'] == 'bottom_up'
 
-        image_props = {
-            'handle':      image_handle,
-            'numpy_array': np_frame,
-            'ctypes':      ofx_property_sets.OfxImageProperties('source', frame_ptr, width, height)
-        }
+        if isinstance(image, PIL.Image.Image):
+            # RGB images are packed as RGBX, which fills the alpha with 255 in
+            # the same copy
+            if image.mode not in ['RGBA', 'RGB']:
+                image = image.convert('RGBA')
+
+            if image.size != (width, height):
+                image = image.resize((width, height), PIL.Image.LANCZOS)
+
+            packer = 'RGBX' if image.mode == 'RGB' else 'RGBA'
+
+            # The raw encoder with a negative orientation writes the rows bottom
+            # to top, so the flip happens in the single copy out of PIL
+            if bottom_up:
+                return numpy.frombuffer(image.tobytes('raw', packer, 0, -1), dtype=numpy.uint8)
+            else:
+                return numpy.frombuffer(image.tobytes('raw', packer), dtype=numpy.uint8)
+
+        # Any buffer protocol object laid out as height x width x RGB(A) uint8
+        np_image = numpy.asarray(image, dtype=numpy.uint8)
+
+        if np_image.ndim != 3 or np_image.shape[2] not in [3, 4]:
+            logging.error('Image buffer must be height x width x 3 or 4, got {}'.format(np_image.shape))
+            return None
+
+        if np_image.shape[0] != height or np_image.shape[1] != width:
+            return self._image_to_rgba_buffer(PIL.Image.fromarray(np_image), width, height)
+
+        if bottom_up:
+            np_image = np_image[::-1]
 
+        if np_image.shape[2] == 4:
+            return numpy.ascontiguousarray(np_image).reshape(-1)
+
+        rgba = numpy.empty((height, width, 4), dtype=numpy.uint8)
+        rgba[:, :, :3] = np_image
+        rgba[:, :, 3] = 255
+        return rgba.reshape(-1)
+
+    def _attach_image(self, active_uid, clip_name, np_array, image_ctypes, charge=None):
+        # The connected image is the host's reference to the frame being
+        # rendered, its time is set as each frame is rendered
         clip = self._host['active']['plugins'][active_uid]['clips'][clip_name]
-        clip['image'] = image_props
+        clip['image'] = self._host['clipImages'].create(clip, None, np_array, image_ctypes, charge)
+
+        # The clip describes whatever format the image connected to it is in
+        pixel_depth = image_ctypes.get_value('OfxImageEffectPropPixelDepth')
+        components = image_ctypes.get_value('OfxImageEffectPropComponents')
+
+        clip['ctypes'].update('OfxImageEffectPropPixelDepth', pixel_depth, 'str')
+        clip['ctypes'].update('OfxImageEffectPropComponents', components, 'str')
+        clip['ctypes'].update('OfxImageClipPropUnmappedPixelDepth', pixel_depth, 'str')
+        clip['ctypes'].update('OfxImageClipPropUnmappedComponents', components, 'str')
         clip['ctypes'].update('OfxImageClipPropConnected', 1, 'int')
 
         return ofx_status_codes.OFX_STATUS_OK
 
+    def _connect_image(self, active_uid, clip_name, filename, width, height):
+        import PIL.Image
+
+        # Charged before decoding so an image over budget is never read
+        charge = (active_uid, 'input', width * height * 4)
+        if not self._host['accountant'].charge(*charge):
+            return ofx_status_codes.OFX_STATUS_ERR_MEMORY
+
+        # The charge is given back if the image cannot be read
+        try:
+            np_frame = self._image_to_rgba_buffer(PIL.Image.open(filename), width, height)
+        except OSError as e:
+            self._host['accountant'].release(*charge)
+            logging.error('Could not load {} for clip {}: {}'.format(filename, clip_name, e))
+            return ofx_status_codes.OFX_STATUS_FAILED
+        except Exception:
+            self._host['accountant'].release(*charge)
+            raise
+
+        frame_ptr = np_frame.ctypes.data_as(ctypes.c_void_p).value
+
+        return self._attach_image(
+            active_uid,
+            clip_name,
+            np_frame,
+            ofx_property_sets.OfxImageProperties('source', frame_ptr, width, height, self._host['rowOrder']),
+            charge
+        )
+
     def _connect_buffer(self, active_uid, clip_name, width, height):
+        import numpy
+
+        charge = (active_uid, 'output', width * height * 4)
+        if not self._host['accountant'].charge(*charge):
+            return ofx_status_codes.OFX_STATUS_ERR_MEMORY
+
         buffer = numpy.ascontiguousarray(numpy.zeros(width*height*4, numpy.uint8), dtype=numpy.uint8)
         buffer_ptr = buffer.ctypes.data_as(ctypes.c_void_p).value
 
-        buffer_handle = ofx_ctypes.CStructOfxHandle(
-            ctypes.c_char_p(b'OfxImage'),
-            self._host['active']['plugins'][active_uid]['handle'].bundle,
-            self._host['active']['plugins'][active_uid]['handle'].plugin,
-            self._host['active']['plugins'][active_uid]['handle'].context,
-            self._host['active']['plugins'][active_uid]['handle'].active_uid,
-            ctypes.c_char_p(clip_name.encode('utf-8'))
+        return self._attach_image(
+            active_uid,
+            clip_name,
+            buffer,
+            ofx_property_sets.OfxImageProperties('output', buffer_ptr, width, height, self._host['rowOrder']),
+            charge
         )
 
-        buffer_props = {
-            'handle':      buffer_handle,
-            'numpy_array': buffer,
-            'ctypes':      ofx_property_sets.OfxImageProperties('output', buffer_ptr, width, height)
-        }
+    def _array_rows(self, np_array):
+        # Returns a top row first array as the bottom up rows the plugin walks
+        # when it can read them in place, otherwise None. A negative row stride
+        # is only allowed in top down mode and pixels within a row must be packed.
+        rows = np_array[::-1]
+        packed = rows.strides[2] == rows.itemsize and rows.strides[1] == rows.shape[2] * rows.itemsize
+
+        if not packed or (rows.strides[0] < 0 and self._host['rowOrder'] == 'bottom_up'):
+            return None
+
+        return rows
+
+    def _staging_buffer(self, active_uid, clip_name, shape, dtype):
+        # Bottom up buffers kept on the instance for frames that cannot be read
+        # in place, reused by every later frame of the same format. Returns
+        # None when a new buffer would go over the memory budget.
+        import numpy
+
+        staging = self._host['active']['plugins'][active_uid].setdefault('staging', {})
+        buffer = staging.get(clip_name)
+
+        if buffer is not None and buffer.shape == shape and buffer.dtype == dtype:
+            return buffer
+
+        if buffer is not None:
+            self._host['accountant'].release(active_uid, 'staging', buffer.nbytes)
+            del(staging[clip_name])
+
+        n_bytes = int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize
+        if not self._host['accountant'].charge(active_uid, 'staging', n_bytes):
+            return None
+
+        buffer = staging[clip_name] = numpy.empty(shape, dtype=dtype)
+
+        return buffer
+
+    def _release_staging(self, active_uid):
+        staging = self._host['active']['plugins'][active_uid].pop('staging', {})
+
+        for buffer in staging.values():
+            self._host['accountant'].release(active_uid, 'staging', buffer.nbytes)
 
+    def _idle_staging(self):
+        # Instances with no clip connected are not rendering
+        return [
+            active_uid
+            for active_uid, plugin in self._host['active']['plugins'].items()
+            if plugin.get('staging') and not any(clip['image'] for clip in plugin['clips'].values())
+        ]
+
+    def _idle_staging_bytes(self):
+        return sum(
+            buffer.nbytes
+            for active_uid in self._idle_staging()
+            for buffer in self._host['active']['plugins'][active_uid]['staging'].values()
+        )
+
+    def _evict_idle_staging(self, owner, n_bytes):
+        for active_uid in self._idle_staging():
+            if owner is None or owner == active_uid:
+                self._release_staging(active_uid)
+
+    def _connect_array(self, active_uid, clip_name, rows, unique_id='source'):
+        # Connects bottom up rows in a format the clip supports. An image of
+        # the same format already on the clip is pointed at the new rows.
         clip = self._host['active']['plugins'][active_uid]['clips'][clip_name]
-        clip['image'] = buffer_props
-        clip['ctypes'].update('OfxImageClipPropConnected', 1, 'int')
+        image = clip['image']
+
+        # Only an image the plugin no longer holds can be pointed elsewhere
+        if image and image['refs'] == 1 and image['numpy_array'].shape == rows.shape and image['numpy_array'].dtype == rows.dtype:
+            image['numpy_array'] = rows
+            image['ctypes'].update('OfxImagePropData', rows.ctypes.data, 'ptr')
+            image['ctypes'].update('OfxImagePropRowBytes', rows.strides[0], 'int')
+            return ofx_status_codes.OFX_STATUS_OK
+
+        if image:
+            self._disconnect_image(active_uid, clip_name)
+
+        pixel_depth, components = ofx_array.pixel_format(rows)
+        height, width = rows.shape[:2]
+
+        return self._attach_image(
+            active_uid,
+            clip_name,
+            rows,
+            ofx_property_sets.OfxImageProperties(
+                unique_id,
+                rows.ctypes.data,
+                width,
+                height,
+                self._host['rowOrder'],
+                pixel_depth,
+                components,
+                rows.strides[0]
+            )
+        )
 
-        return ofx_status_codes.OFX_STATUS_OK
+    def _feed_array(self, active_uid, clip_name, frame, pixel_depth, components, unique_id='source'):
+        # Connects one top row first frame in the clip's format, read in place
+        # when it can be, otherwise converted and flipped into the clip's
+        # staging buffer in a single pass. Returns the rows connected.
+        rows = None
+
+        if ofx_array.pixel_format(frame) == (pixel_depth, components):
+            rows = self._array_rows(frame)
+
+        if rows is None:
+            rows = self._staging_buffer(
+                active_uid,
+                clip_name,
+                frame.shape[:2] + (ofx_array.CHANNELS[components],),
+                ofx_array.DTYPES[pixel_depth]
+            )
+
+            if rows is None:
+                return None
+
+            if unique_id != 'output':
+                ofx_array.convert(frame[::-1], pixel_depth, components, rows)
+
+        self._connect_array(active_uid, clip_name, rows, unique_id)
+
+        return rows
+
+    def _pool_frame(self, active_uid, shape, dtype):
+        # Returns a frame array in a memory pool block and the block's address,
+        # or (None, None) when it would go over the memory budget
+        import numpy
+
+        n_bytes = int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize
+        address = self._host['memoryPool'].alloc(n_bytes, 'frame', active_uid)
+
+        if address is None:
+            return None, None
+
+        frame = numpy.ctypeslib.as_array((ctypes.c_ubyte * n_bytes).from_address(address))
+
+        return frame.view(dtype).reshape(shape), address
+
+    def _load_file_frame(self, active_uid, clip_name, pattern, width, height, time):
+        # Source of a clip rendered from a file sequence, loads the frame at
+        # time when a plugin fetches one other than the frame being rendered
+        import PIL.Image
+
+        if time != int(time):
+            logging.warning('Clip {} has no frame at time {}'.format(clip_name, time))
+            return None
+
+        try:
+            decoded = PIL.Image.open(self._frame_filename(pattern, int(time)))
+        except OSError as e:
+            logging.warning('Could not load clip {} at time {}: {}'.format(clip_name, time, e))
+            return None
+
+        frame, address = self._pool_frame(active_uid, (width * height * 4,), 'uint8')
+        if frame is None:
+            return None
+
+        frame[...] = self._image_to_rgba_buffer(decoded, width, height)
+
+        return self._host['clipImages'].create(
+            self._host['active']['plugins'][active_uid]['clips'][clip_name],
+            time,
+            frame,
+            ofx_property_sets.OfxImageProperties('source', address, width, height, self._host['rowOrder']),
+            block=address
+        )
+
+    def _load_array_frame(self, active_uid, clip_name, stack, times, pixel_depth, components, time):
+        # Source of a clip rendered from a stack of arrays, the frame at time
+        # is read in place or converted into a pool block
+        if time not in times:
+            logging.warning('Clip {} has no frame at time {}'.format(clip_name, time))
+            return None
+
+        frame = stack[times.index(time)]
+        rows = None
+        address = None
+
+        if ofx_array.pixel_format(frame) == (pixel_depth, components):
+            rows = self._array_rows(frame)
+
+        if rows is None:
+            rows, address = self._pool_frame(active_uid, frame.shape[:2] + (ofx_array.CHANNELS[components],), ofx_array.DTYPES[pixel_depth])
+            if rows is None:
+                return None
+
+            ofx_array.convert(frame[::-1], pixel_depth, components, rows)
+
+        height, width = rows.shape[:2]
+
+        return self._host['clipImages'].create(
+            self._host['active']['plugins'][active_uid]['clips'][clip_name],
+            time,
+            rows,
+            ofx_property_sets.OfxImageProperties(
+                'source',
+                rows.ctypes.data,
+                width,
+                height,
+                self._host['rowOrder'],
+                pixel_depth,
+                components,
+                rows.strides[0]
+            ),
+            block=address
+        )
 
     def _disconnect_image(self, active_uid, clip_name):
         clip = self._host['active']['plugins'][active_uid]['clips'][clip_name]
+        image = clip['image']
         clip['image'] = {}
+        if image:
+            self._host['clipImages'].release(image)
         clip['ctypes'].update('OfxImageClipPropConnected', 0, 'int')
 
         return  ofx_status_codes.OFX_STATUS_OK
@@ -395,24 +828,120 @@ class OfxHost():
         return self._disconnect_image(active_uid, clip_name)
 
     def _save_image(self, active_uid, clip_name, filename, width, height):
+        import PIL.Image
+
         clip = self._host['active']['plugins'][active_uid]['clips'][clip_name]
 
-        if clip['ctypes'].get('OfxImageClipPropConnected').value == 0:
+        if clip['ctypes'].get_value('OfxImageClipPropConnected') == 0:
             return ofx_status_codes.OFX_STATUS_FAILED
 
-        ptr = clip['image']['ctypes'].get('OfxImagePropData').value
-        np_array = numpy.ctypeslib.as_array(ctypes.cast(ptr, ctypes.POINTER(ctypes.c_ubyte)), (height,width,4))
-        im = PIL.ImageOps.flip(PIL.Image.fromarray(np_array))
+        np_array = clip['image']['numpy_array'].reshape(height, width, 4)
+
+        # A top down buffer is already in file order and is saved without a copy
+        if self._host['rowOrder'] == 'bottom_up':
+            np_array = np_array[::-1]
+
+        im = PIL.Image.fromarray(np_array)
         if filename.rsplit('.', 1)[1].lower() in ['jpg']:
             im = im.convert('RGB')
         im.save(filename)
 
         return ofx_status_codes.OFX_STATUS_OK
 
-    def _begin_render_sequence(self, active_uid):
+    def _frame_filename(self, pattern, frame):
+        # Expand a run of '#' or a printf style '%0Nd' into the frame number
+        hashes = re.search(r'#+', pattern)
+        if hashes is not None:
+            padding = hashes.end() - hashes.start()
+            return pattern[:hashes.start()] + str(frame).zfill(padding) + pattern[hashes.end():]
+        elif re.search(r'%0?\d*d', pattern) is not None:
+            return pattern % frame
+        else:
+            return pattern
+
+    def _frame_list(self, first_frame, last_frame, frame_step):
+        if frame_step < 1:
+            logging.critical('Frame step must be 1 or greater')
+            return None
+
+        if last_frame < first_frame:
+            logging.critical('Last frame {} is before first frame {}'.format(last_frame, first_frame))
+            return None
+
+        return list(range(first_frame, last_frame + 1, frame_step))
+
+    def _render_sequence(self, active_uid, inputs, output, frames, frame_step, width, height, frame_range=None):
+        # Inputs is a dict of clip name to filename pattern, output is the filename
+        # pattern for the 'Output' clip. The instance and sequence render are set up
+        # once, only the input images are swapped per frame. Frame range is the
+        # first and last frame of the whole job when only part of it is rendered.
+        animated = self._sample_parameter_animation(active_uid, frames)
+
+        self._begin_render_sequence(active_uid, frames[0], frames[-1], frame_step, frame_range)
+
+        # The images are disconnected and the sequence ended however the render
+        # stops, so a warm instance is left ready for the next job
+        try:
+            status = self._connect_buffer(active_uid, 'Output', width, height)
+
+            # Frames other than the one being rendered are loaded when fetched
+            clips = self._host['active']['plugins'][active_uid]['clips']
+            for clip_name in inputs:
+                clips[clip_name]['source'] = functools.partial(self._load_file_frame, active_uid, clip_name, inputs[clip_name], width, height)
+
+            for frame in frames:
+                if status != ofx_status_codes.OFX_STATUS_OK:
+                    break
+
+                logging.info('Rendering frame {}'.format(frame))
+
+                # paramGetValue returns the value at the frame being rendered
+                for param in animated:
+                    param['value'] = param['animation']['frames'][frame]
+
+                for clip_name in inputs:
+                    status = self._connect_image(active_uid, clip_name, self._frame_filename(inputs[clip_name], frame), width, height)
+                    if status != ofx_status_codes.OFX_STATUS_OK:
+                        break
+
+                if status == ofx_status_codes.OFX_STATUS_OK:
+                    status = self._render(active_uid, width, height, frame)
+
+                # A frame that failed to render is not saved and ends the sequence
+                if status == ofx_status_codes.OFX_STATUS_OK:
+                    self._save_image(active_uid, 'Output', self._frame_filename(output, frame), width, height)
+
+                for clip_name in inputs:
+                    self._disconnect_image(active_uid, clip_name)
+        finally:
+            for clip_name in inputs:
+                self._disconnect_image(active_uid, clip_name)
+
+            self._disconnect_buffer(active_uid, 'Output')
+            self._end_render_sequence(active_uid)
+
+        return status
+
+    def _sample_parameter_animation(self, active_uid, frames):
+        # Every animated parameter is sampled for the whole sequence up front so
+        # that getting a value during render is only a lookup, as is every
+        # parametric curve
+        animated = []
+
+        for param in self._host['active']['plugins'][active_uid]['parameters'].values():
+            if 'curves' in param and param['tables'] is None:
+                self._suite('OfxParametricParameterSuite').sample_curves(param)
+
+            if param['animation'] is not None:
+                self._suite('OfxParameterSuite').sample_parameter_animation(param, frames)
+                animated.append(param)
+
+        return animated
+
+    def _begin_render_sequence(self, active_uid, first_frame, last_frame, frame_step=1, frame_range=None):
         plugin = self._host['active']['plugins'][active_uid]
 
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        entry_point = self._entry_point(plugin)
 
         sequence_render_handle = ofx_ctypes.CStructOfxHandle(
             ctypes.c_char_p(b'OfxSequenceRenderAction'),
@@ -425,10 +954,23 @@ class OfxHost():
 
         sequence_render_props = {
             'handle': sequence_render_handle,
-            'ctypes': ofx_property_sets.OfxSequenceRenderActionProperties()
+            'ctypes': ofx_property_sets.OfxSequenceRenderActionProperties(first_frame, last_frame, frame_step)
         }
 
+        # The effect and its clips span the whole job, the sequence render only
+        # the frames rendered here
+        (first, last) = frame_range if frame_range is not None else (first_frame, last_frame)
+
+        duration = float(last - first + 1)
+        plugin['ctypes'].update('OfxImageEffectInstancePropEffectDuration', duration, 'dbl')
+        for key in plugin['clips']:
+            plugin['clips'][key]['ctypes'].update('OfxImageEffectPropFrameRange', first, 'dbl', 0)
+            plugin['clips'][key]['ctypes'].update('OfxImageEffectPropFrameRange', last, 'dbl', 1)
+            plugin['clips'][key]['ctypes'].update('OfxImageEffectPropUnmappedFrameRange', first, 'dbl', 0)
+            plugin['clips'][key]['ctypes'].update('OfxImageEffectPropUnmappedFrameRange', last, 'dbl', 1)
+
         plugin['render']['sequence'] = sequence_render_props
+        self._register_handle(sequence_render_props)
 
         entry_point(
             ctypes.c_char_p(b'OfxImageEffectActionBeginSequenceRender'),
@@ -439,10 +981,30 @@ class OfxHost():
 
         return ofx_status_codes.OFX_STATUS_OK
 
-    def _render(self, active_uid, width, height):
+    def _render_windows(self, active_uid, width, height):
         plugin = self._host['active']['plugins'][active_uid]
+        effect = self._host['bundles'][plugin['bundle']]['plugins'][plugin['plugin']]['ctypes']
 
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        # Only a fully safe plugin may have several render actions in flight on
+        # one instance, any other renders the whole frame in one action
+        if effect.get_value('OfxImageEffectPluginPropHostFrameThreading') != 1:
+            return [[0, 0, width, height]]
+
+        if effect.value_as_string('OfxImageEffectPluginRenderThreadSafety') != 'OfxImageEffectRenderFullySafe':
+            return [[0, 0, width, height]]
+
+        # Split the frame into horizontal bands of whole rows, one per CPU
+        bands = max(1, min(height, self._host['numThreads'] or ofx_multi_thread_suite.available_cpus()))
+
+        return [
+            [0, height * n // bands, width, height * (n + 1) // bands]
+            for n in range(0, bands)
+        ]
+
+    def _render_window(self, active_uid, width, height, time, render_window, name):
+        plugin = self._host['active']['plugins'][active_uid]
+
+        entry_point = self._entry_point(plugin)
 
         render_handle = ofx_ctypes.CStructOfxHandle(
             ctypes.c_char_p(b'OfxRenderAction'),
@@ -450,31 +1012,70 @@ class OfxHost():
             self._host['active']['plugins'][active_uid]['handle'].plugin,
             self._host['active']['plugins'][active_uid]['handle'].context,
             self._host['active']['plugins'][active_uid]['handle'].active_uid,
-            ctypes.c_char_p(b'render_action')
+            ctypes.c_char_p(name.encode('utf-8'))
         )
 
         render_props = {
             'handle': render_handle,
-            'ctypes': ofx_property_sets.OfxRenderActionProperties(width, height)
+            'ctypes': ofx_property_sets.OfxRenderActionProperties(width, height, time, render_window)
         }
 
-        plugin['render']['action'] = render_props
+        plugin['render']['action'][name] = render_props
+        self._register_handle(render_props)
 
-        entry_point(
+        status = entry_point(
             ctypes.c_char_p(b'OfxImageEffectActionRender'),
             ctypes.pointer(self._host['active']['plugins'][active_uid]['handle']),
             ctypes.pointer(render_handle),
             0
         )
 
-        plugin['render']['action'] = None
+        self._unregister_handle(render_props)
+        del(plugin['render']['action'][name])
+
+        return status
+
+    def _render(self, active_uid, width, height, time):
+        plugin = self._host['active']['plugins'][active_uid]
+
+        # The connected images are the frame at this time
+        for clip in plugin['clips'].values():
+            if clip['image']:
+                clip['image']['time'] = time
+
+        windows = self._render_windows(active_uid, width, height)
+        names = ['render_action_{}'.format(n) for n in range(0, len(windows))]
+
+        # Bands of a frame are rendered at the same time
+        if len(windows) > 1:
+            if self._host['framePool'] is None:
+                import concurrent.futures
+                self._host['framePool'] = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=len(windows),
+                    thread_name_prefix='OfxHostFrameThreading'
+                )
+
+            results = list(self._host['framePool'].map(
+                lambda n: self._render_window(active_uid, width, height, time, windows[n], names[n]),
+                range(0, len(windows))
+            ))
+        else:
+            results = [
+                self._render_window(active_uid, width, height, time, windows[n], names[n])
+                for n in range(0, len(windows))
+            ]
+
+        for status in results:
+            if status not in [ofx_status_codes.OFX_STATUS_OK, ofx_status_codes.OFX_STATUS_REPLY_DEFAULT]:
+                logging.error('Render action failed at time {} with status {}'.format(time, status))
+                return status
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _end_render_sequence(self, active_uid):
         plugin = self._host['active']['plugins'][active_uid]
 
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        entry_point = self._entry_point(plugin)
 
         entry_point(
             ctypes.c_char_p(b'OfxImageEffectActionEndSequenceRender'),
@@ -483,14 +1084,30 @@ class OfxHost():
             0
         )
 
+        self._unregister_handle(plugin['render']['sequence'])
         plugin['render']['sequence'] = None
 
+        self._release_clip_images(active_uid)
+
         return ofx_status_codes.OFX_STATUS_OK
 
+    def _release_clip_images(self, active_uid):
+        # Frames are only loaded on demand during a sequence render, and images
+        # a plugin has not released by its end are freed
+        plugin = self._host['active']['plugins'][active_uid]
+        held = 0
+
+        for clip in plugin['clips'].values():
+            clip['source'] = None
+            held += self._host['clipImages'].release_all(clip)
+
+        if held:
+            logging.warning('Instance {} did not release {} clip images'.format(active_uid, held))
+
     def _destroy_plugin_instance(self, active_uid):
         plugin = self._host['active']['plugins'][active_uid]
 
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        entry_point = self._entry_point(plugin)
 
         entry_point(
             ctypes.c_char_p(b'OfxActionDestroyInstance'),
@@ -499,13 +1116,32 @@ class OfxHost():
             0
         )
 
+        for key in plugin['clips']:
+            if plugin['clips'][key]['image']:
+                self._disconnect_image(active_uid, key)
+
+        self._release_clip_images(active_uid)
+
+        for key in plugin['clips']:
+            self._unregister_handle(plugin['clips'][key])
+
+        for key in plugin['parameters']:
+            self._unregister_handle(plugin['parameters'][key])
+
+        self._release_staging(active_uid)
+
+        held = self._host['accountant'].held(active_uid)
+        if held:
+            logging.warning('Instance {} did not free {} bytes of plugin memory'.format(active_uid, held))
+
+        self._unregister_handle(plugin)
         del(self._host['active']['plugins'][active_uid])
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _unload_plugin(self, bundle, plugin_id):
         plugin = self._host['bundles'][bundle]['plugins'][plugin_id]
-        entry_point = ofx_ctypes.cfunc_plugin_entry_point(plugin['mainEntry'])
+        entry_point = self._entry_point(plugin)
 
         entry_point(
             ctypes.c_char_p(b'OfxActionUnload'),
@@ -514,89 +1150,648 @@ class OfxHost():
             0
         )
 
+        plugin['loaded'] = False
+
         return ofx_status_codes.OFX_STATUS_OK
 
     def display_plugins(self, directory, bundle):
-        self._load_ofx_binary(directory, bundle)
+        self._describe_cached(directory, bundle)
         self._list_all_plugins(bundle)
 
     def display_params(self, directory, bundle, plugin):
         context = 'OfxImageEffectContextGeneral'
-        self._load_ofx_binary(directory, bundle)
-        self._plugin_load_and_describe(bundle, plugin)
-        self._list_plugin_parameters(bundle, plugin, context)
+        if self._describe_cached(directory, bundle, plugin) == ofx_status_codes.OFX_STATUS_OK:
+            self._list_plugin_parameters(bundle, plugin, context)
 
     def params_to_json(self, directory, bundle, plugin, json_file):
         context = 'OfxImageEffectContextGeneral'
+        if self._describe_cached(directory, bundle, plugin) == ofx_status_codes.OFX_STATUS_OK:
+            self._save_plugin_parameters(bundle, plugin, context, json_file)
+
+    def _describe_cached(self, directory, bundle, plugin=None):
+        # The inspection commands answer from the describe cache when it has
+        # the plugin, otherwise the bundle is loaded and described as normal
+        # and the results added to the cache
+        filename = self._generate_ofx_binary_filename(directory, bundle)
+        entry = ofx_describe_cache.load(filename)
+
+        if entry is not None and (plugin is None or entry['plugins'].get(plugin, {}).get('describe') is not None):
+            logging.info('Using cached describe for {}'.format(filename))
+            self._host['bundles'][bundle] = ofx_describe_cache.bundle_record(filename, entry)
+            return ofx_status_codes.OFX_STATUS_OK
+
         self._load_ofx_binary(directory, bundle)
-        self._plugin_load_and_describe(bundle, plugin)
-        self._save_plugin_parameters(bundle, plugin, context, json_file)
 
-    def filter_render(self, directory, bundle, plugin, infile, outfile):
-        context = 'OfxImageEffectContextFilter'
+        if plugin is not None:
+            if plugin not in self._host['bundles'][bundle]['plugins']:
+                logging.error('{} is not a plugin in {}'.format(plugin, bundle))
+                return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        input_frame = PIL.Image.open(infile)
-        (width, height) = input_frame.size
+            self._plugin_load_and_describe(bundle, plugin)
+
+        ofx_describe_cache.store(filename, self._host['bundles'][bundle])
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def describe_bundle(self, directory, bundle):
+        # Returns the describe cache entry for a bundle with every plugin in
+        # it described, loading the bundle only when the cache is incomplete
+        filename = self._generate_ofx_binary_filename(directory, bundle)
+        entry = ofx_describe_cache.load(filename)
+
+        if entry is not None and all(p['describe'] is not None for p in entry['plugins'].values()):
+            return entry
 
         self._load_ofx_binary(directory, bundle)
-        self._plugin_load_and_describe(bundle, plugin)
-        active_uid = self._create_plugin_instance(bundle, plugin, context, width, height)
-        self._begin_render_sequence(active_uid)
-        self._connect_image(active_uid, 'Source', infile, width, height)
-        self._connect_buffer(active_uid, 'Output', width, height)
-        self._render(active_uid, width, height)
-        self._save_image(active_uid, 'Output', outfile, width, height)
-        self._disconnect_image(active_uid, 'Source')
-        self._disconnect_buffer(active_uid, 'Output')
-        self._end_render_sequence(active_uid)
-        self._destroy_plugin_instance(active_uid)
-        self._unload_plugin(bundle, plugin)
 
-    def json_render(self, directory, json_file):
-        with open(json_file, 'r') as fp:
-            settings = json.load(fp)
+        for plugin in self._host['bundles'][bundle]['plugins']:
+            self._plugin_load_and_describe(bundle, plugin)
+
+        ofx_describe_cache.store(filename, self._host['bundles'][bundle])
+
+        for plugin in self._host['bundles'][bundle]['plugins']:
+            self._unload_plugin(bundle, plugin)
+
+        return ofx_describe_cache.load(filename)
+
+    def build_catalog(self, paths=None, processes=1, index_file=None):
+        paths = ofx_catalog.plugin_paths(paths)
+        index_file = index_file or ofx_catalog.default_index_file()
+        summaries = {}
+        jobs = []
+
+        # Bundles already in the describe cache are summarised here, the rest
+        # are described in worker processes so one bundle's load and describe
+        # actions never share a process with another's
+        for directory, bundle in ofx_catalog.find_bundles(paths):
+            filename = self._generate_ofx_binary_filename(directory, bundle)
+
+            if not os.path.isfile(filename):
+                logging.warning('{} has no binary for this platform'.format(filename))
+                continue
+
+            entry = ofx_describe_cache.load(filename)
+
+            if entry is not None and all(p['describe'] is not None for p in entry['plugins'].values()):
+                summaries[(directory, bundle)] = ofx_catalog.summarise_bundle(directory, bundle, entry)
+            else:
+                jobs.append((directory, bundle))
+
+        logging.info('Describing {} of {} bundles'.format(len(jobs), len(jobs) + len(summaries)))
 
+        if jobs:
+            import multiprocessing
+            with multiprocessing.get_context('spawn').Pool(max(1, min(processes, len(jobs)))) as pool:
+                for job, summary in zip(jobs, pool.imap(_catalog_worker, jobs)):
+                    if summary is not None:
+                        summaries[job] = summary
+
+        # Keep search path order so the first bundle with an identifier wins
+        ordered = [summaries[b] for b in ofx_catalog.find_bundles(paths) if b in summaries]
+        catalog = ofx_catalog.write_catalog(index_file, paths, ordered)
+
+        print('{} plugins in {} bundles written to {}'.format(len(catalog['plugins']), len(ordered), index_file))
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def memory_usage(self):
+        # Bytes held by kind and by instance, cached, the peak and the budgets,
+        # how much image memory has been spilled and restored and how many
+        # clip images were loaded on demand and freed
+        usage = self._host['accountant'].report()
+        usage['spill'] = self._host['memorySpill'].stats()
+        usage['images'] = self._host['clipImages'].stats()
+        return usage
+
+    def report_timing(self, trace_file=None):
+        if self._host['instrument'] is None:
+            return
+
+        self._host['instrument'].print_summary()
+
+        if trace_file is not None:
+            self._host['instrument'].write_trace(trace_file)
+
+    def startup_state(self):
+        return {
+            'bundles': sorted(b for b in self._host['bundles'] if self._host['bundles'][b]['cdll'] is not None),
+            'suites':  sorted(self._suites)
+        }
+
+    def _prepare_plugin(self, directory, bundle, plugin):
+        # Only dlopen and describe the first time a bundle/plugin is used,
+        # bundles restored from the describe cache still need loading
+        if bundle not in self._host['bundles'] or self._host['bundles'][bundle]['cdll'] is None:
+            self._load_ofx_binary(directory, bundle)
+
+        if plugin not in self._host['bundles'][bundle]['plugins']:
+            logging.error('{} is not a plugin in {}'.format(plugin, bundle))
+            return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
+
+        if not self._host['bundles'][bundle]['plugins'][plugin]['loaded']:
+            self._plugin_load_and_describe(bundle, plugin)
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _reset_plugin_parameters(self, active_uid):
+        parameters = self._host['active']['plugins'][active_uid]['parameters']
+
+        for key in parameters:
+            parameters[key]['animation'] = None
+            if parameters[key]['ctypes'].contains('OfxParamPropDefault'):
+                parameters[key]['value'] = parameters[key]['ctypes'].get('OfxParamPropDefault')
+            if 'curves' in parameters[key]:
+                parameters[key]['curves'] = [[list(point) for point in curve] for curve in parameters[key]['default_curves']]
+                parameters[key]['tables'] = None
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _render_settings(self, active_uid, settings):
         for i in settings['image_paths']['required']:
             if settings['image_paths']['required'][i] is None:
                 logging.critical('Required image path for \'{}\' is not set in JSON file'.format(i))
-                exit()
+                return ofx_status_codes.OFX_STATUS_FAILED
 
         width = settings['frame_size']['width']
         height = settings['frame_size']['height']
 
-        self._load_ofx_binary(directory, settings['bundle'])
-        self._plugin_load_and_describe(settings['bundle'], settings['plugin'])
-        active_uid = self._create_plugin_instance(settings['bundle'], settings['plugin'], settings['context'], width, height)
-        self._load_plugin_parameters(active_uid, settings['parameters'])
-        self._begin_render_sequence(active_uid)
+        frame_range = settings.get('frame_range', {'first': 1, 'last': 1, 'step': 1})
+        frame_step = frame_range.get('step', 1)
+        frames = self._frame_list(frame_range['first'], frame_range['last'], frame_step)
+
+        if frames is None:
+            return ofx_status_codes.OFX_STATUS_FAILED
+
+        # A worker process renders only its share of the job's frames
+        job_range = (frames[0], frames[-1])
+        frames = settings.get('render_frames', frames)
 
+        inputs = {}
         for i in settings['image_paths']['required']:
-            if i == 'Output':
-                self._connect_buffer(active_uid, 'Output', width, height)
-            else:
-                self._connect_image(active_uid, i, settings['image_paths']['required'][i], width, height)
+            if i != 'Output':
+                inputs[i] = settings['image_paths']['required'][i]
 
         for i in settings['image_paths']['optional']:
             if settings['image_paths']['optional'][i] is not None:
-                self._connect_image(active_uid, i, settings['image_paths']['optional'][i], width, height)
+                inputs[i] = settings['image_paths']['optional'][i]
 
-        self._render(active_uid, width, height)
+        status = self._load_plugin_parameters(active_uid, settings['parameters'])
 
-        self._save_image(active_uid, 'Output', settings['image_paths']['required']['Output'], width, height)
+        if status != ofx_status_codes.OFX_STATUS_OK:
+            return status
 
-        for i in settings['image_paths']['required']:
-            if i == 'Output':
-                self._disconnect_buffer(active_uid, i)
-            else:
-                self._disconnect_image(active_uid, i)
+        return self._render_sequence(active_uid, inputs, settings['image_paths']['required']['Output'], frames, frame_step, width, height, job_range)
 
-        for i in settings['image_paths']['optional']:
-            if settings['image_paths']['optional'][i] is not None:
-                self._disconnect_image(active_uid, i)
+    def _render_job(self, directory, settings):
+        width = settings['frame_size']['width']
+        height = settings['frame_size']['height']
 
-        self._end_render_sequence(active_uid)
+        self._load_ofx_binary(directory, settings['bundle'])
+        self._plugin_load_and_describe(settings['bundle'], settings['plugin'])
+        active_uid = self._create_plugin_instance(settings['bundle'], settings['plugin'], settings['context'], width, height)
+        status = self._render_settings(active_uid, settings)
         self._destroy_plugin_instance(active_uid)
         self._unload_plugin(settings['bundle'], settings['plugin'])
 
+        return status
+
+    def _parallel_render_job(self, directory, settings, processes):
+        frame_range = settings.get('frame_range', {'first': 1, 'last': 1, 'step': 1})
+        frame_step = frame_range.get('step', 1)
+        frames = self._frame_list(frame_range['first'], frame_range['last'], frame_step)
+
+        if frames is None:
+            return ofx_status_codes.OFX_STATUS_FAILED
+
+        status = self._prepare_plugin(directory, settings['bundle'], settings['plugin'])
+        if status != ofx_status_codes.OFX_STATUS_OK:
+            return status
+
+        # Every worker process has its own instances, so the render thread safety
+        # only matters inside a process. A plugin that needs its frames rendered
+        # in order on one instance has to stay in this process.
+        effect = self._host['bundles'][settings['bundle']]['plugins'][settings['plugin']]['ctypes']
+        sequential = effect.get_value('OfxImageEffectInstancePropSequentialRender')
+        self.release_warm()
+
+        processes = min(processes, len(frames))
+
+        if sequential == 1 or processes < 2:
+            logging.info('Rendering {} frames in a single process'.format(len(frames)))
+            return self._render_job(directory, settings)
+
+        # Contiguous chunks keep any per instance caches useful within a worker
+        jobs = []
+        for n in range(0, processes):
+            chunk = frames[len(frames) * n // processes:len(frames) * (n + 1) // processes]
+            chunk_settings = dict(settings)
+            chunk_settings['render_frames'] = chunk
+            jobs.append((
+                directory,
+                chunk_settings,
+                self._host['numThreads'] or max(1, ofx_multi_thread_suite.available_cpus() // processes),
+                self._host['rowOrder'],
+                self._host['instrument'] is not None,
+                self._host['accountant'].budgets(),
+                self._host['memorySpill'].stats()['mode']
+            ))
+
+        logging.info('Rendering {} frames across {} processes'.format(len(frames), processes))
+
+        # Spawn rather than fork, the parent has already loaded the plugin binary
+        import multiprocessing
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            results = pool.map(_render_job_worker, jobs)
+
+        # Worker timings are merged so one report covers every process
+        for status, timings in results:
+            if timings is not None:
+                self._host['instrument'].merge(timings)
+
+        for status, timings in results:
+            if status != ofx_status_codes.OFX_STATUS_OK:
+                return status
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def filter_render(self, directory, bundle, plugin, infile, outfile, first_frame=1, last_frame=None, frame_step=1, processes=1):
+        import PIL.Image
+
+        if last_frame is None:
+            last_frame = first_frame
+
+        frames = self._frame_list(first_frame, last_frame, frame_step)
+
+        if frames is None:
+            sys.exit(ofx_status_codes.OFX_STATUS_FAILED)
+
+        input_frame = PIL.Image.open(self._frame_filename(infile, frames[0]))
+        (width, height) = input_frame.size
+
+        settings = {
+            'bundle':      bundle,
+            'plugin':      plugin,
+            'context':     'OfxImageEffectContextFilter',
+            'parameters':  {},
+            'frame_size':  {'width': width, 'height': height},
+            'frame_range': {'first': first_frame, 'last': last_frame, 'step': frame_step},
+            'image_paths': {'required': {'Source': infile, 'Output': outfile}, 'optional': {}}
+        }
+
+        if processes > 1:
+            status = self._parallel_render_job(directory, settings, processes)
+        else:
+            status = self._render_job(directory, settings)
+
+        # The status is the exit code, so scripts can tell the render failed
+        if status != ofx_status_codes.OFX_STATUS_OK:
+            sys.exit(status)
+
+    def json_render(self, directory, json_file, processes=1):
+        with open(json_file, 'r') as fp:
+            settings = json.load(fp)
+
+        if processes > 1:
+            status = self._parallel_render_job(directory, settings, processes)
+        else:
+            status = self._render_job(directory, settings)
+
+        # The status is the exit code, so scripts can tell the render failed
+        if status != ofx_status_codes.OFX_STATUS_OK:
+            sys.exit(status)
+
+    def warm_render(self, directory, settings):
+        # Render a job using bundles, descriptors and instances kept from
+        # previous jobs. Instances are keyed on everything that is baked in
+        # when they are created.
+        width = settings['frame_size']['width']
+        height = settings['frame_size']['height']
+
+        status = self._prepare_plugin(directory, settings['bundle'], settings['plugin'])
+        if status != ofx_status_codes.OFX_STATUS_OK:
+            return status
+
+        key = (settings['bundle'], settings['plugin'], settings['context'], width, height)
+
+        if key not in self._host['warm']:
+            self._host['warm'][key] = self._create_plugin_instance(
+                settings['bundle'],
+                settings['plugin'],
+                settings['context'],
+                width,
+                height
+            )
+
+        active_uid = self._host['warm'][key]
+        self._reset_plugin_parameters(active_uid)
+
+        return self._render_settings(active_uid, settings)
+
+    def _locate_plugin(self, plugin, directory=None, bundle=None):
+        # Returns the directory and bundle of a plugin, looking in the loaded
+        # bundles and then the catalog when they are not given
+        if bundle is not None:
+            if directory is None and self._host['bundles'].get(bundle, {}).get('cdll') is None:
+                logging.error('No directory given for bundle {}'.format(bundle))
+                return None
+            return directory, bundle
+
+        for name, record in self._host['bundles'].items():
+            if record['cdll'] is not None and plugin in record['plugins']:
+                return directory, name
+
+        catalog = ofx_catalog.load_catalog(ofx_catalog.default_index_file())
+
+        if catalog is None or plugin not in catalog['plugins']:
+            logging.error('{} is not in the plugin catalog'.format(plugin))
+            return None
+
+        return catalog['plugins'][plugin]['directory'], catalog['plugins'][plugin]['bundle']
+
+    def _string_values(self, props, key):
+        return [props.get_value(key, n) for n in range(0, props.length(key) or 0)]
+
+    def _render_context(self, plugin_record, inputs, context):
+        contexts = plugin_record['contexts']
+
+        if context is not None:
+            if context not in contexts:
+                logging.error('{} does not support {}'.format(plugin_record['handle'].plugin.decode('utf-8'), context))
+                return None
+            return context
+
+        # A filter when only a source is given, otherwise the general context
+        preference = ['OfxImageEffectContextGeneral']
+        if set(inputs) <= set(['Source']):
+            preference.insert(0, 'OfxImageEffectContextFilter')
+
+        for candidate in preference + sorted(contexts):
+            if candidate in contexts:
+                return candidate
+
+        logging.error('{} has no described contexts'.format(plugin_record['handle'].plugin.decode('utf-8')))
+        return None
+
+    def _array_instance(self, plugin, inputs, out, directory, bundle, context):
+        # Finds the plugin, checks the first frame of every input and the
+        # output against its clips and picks the formats it renders in.
+        # Returns the warm instance and formats, or None.
+        for name in inputs:
+            if ofx_array.pixel_format(inputs[name]) is None:
+                logging.error('Input for clip {} cannot be rendered'.format(name))
+                return None
+
+        if out is not None and ofx_array.pixel_format(out) is None:
+            return None
+
+        located = self._locate_plugin(plugin, directory, bundle)
+        if located is None:
+            return None
+
+        directory, bundle = located
+
+        if self._prepare_plugin(directory, bundle, plugin) != ofx_status_codes.OFX_STATUS_OK:
+            return None
+
+        plugin_record = self._host['bundles'][bundle]['plugins'][plugin]
+        context = self._render_context(plugin_record, inputs, context)
+        if context is None:
+            return None
+
+        clips = plugin_record['contexts'][context]['clips']
+
+        for name in inputs:
+            if name not in clips or name == 'Output':
+                logging.error('{} is not an input clip of {} in {}'.format(name, plugin, context))
+                return None
+
+        for name in clips:
+            if name != 'Output' and name not in inputs and not clips[name]['ctypes'].get_value('OfxImageClipPropOptional'):
+                logging.error('Required clip {} has no input'.format(name))
+                return None
+
+        # The caller's format is the first input's, or the output array's. The
+        # plugin renders every clip at one bit depth as it may not support
+        # mixed depths.
+        reference = out if out is not None else next(iter(inputs.values()), None)
+        if reference is None:
+            logging.error('An input or an output array is needed to set the frame size')
+            return None
+
+        caller_depth, caller_components = ofx_array.pixel_format(reference)
+
+        supported_depths = self._string_values(plugin_record['ctypes'], 'OfxImageEffectPropSupportedPixelDepths') or ['OfxBitDepthByte']
+        pixel_depth = ofx_array.choose(caller_depth, supported_depths, ofx_array.DEPTH_PREFERENCE)
+
+        if pixel_depth is None:
+            logging.error('{} supports none of the bit depths {}'.format(plugin, ', '.join(ofx_array.PIXEL_DEPTHS.values())))
+            return None
+
+        formats = {}
+        for name in list(inputs) + ['Output']:
+            requested = ofx_array.pixel_format(inputs[name])[1] if name in inputs else caller_components
+            supported = self._string_values(clips[name]['ctypes'], 'OfxImageEffectPropSupportedComponents') or ['OfxImageComponentRGBA']
+            formats[name] = ofx_array.choose(requested, supported, ofx_array.COMPONENT_PREFERENCE)
+
+            if formats[name] is None:
+                logging.error('Clip {} supports none of the components {}'.format(name, ', '.join(ofx_array.COMPONENTS.values())))
+                return None
+
+        (height, width) = reference.shape[:2]
+        key = (bundle, plugin, context, width, height)
+
+        if key not in self._host['warm']:
+            self._host['warm'][key] = self._create_plugin_instance(bundle, plugin, context, width, height)
+
+        return {
+            'active_uid': self._host['warm'][key],
+            'width':      width,
+            'height':     height,
+            'depth':      pixel_depth,
+            'formats':    formats,
+            'caller':     (caller_depth, caller_components)
+        }
+
+    def render(self, plugin, inputs, params=None, time=1, directory=None, bundle=None, context=None, out=None):
+        # Renders one frame from NumPy arrays held by the caller and returns the
+        # output clip as an array, without any file decode or encode. Inputs is
+        # a dict of clip name to height x width x 3 or 4 array of uint8, uint16
+        # or float32, top row first. Params are as in a render JSON file. The
+        # output is in the format of the first input, or of out when given, and
+        # is written into out when it is given. Returns None on failure.
+        import numpy
+
+        stacks = {name: numpy.asarray(array)[numpy.newaxis] for name, array in inputs.items()}
+        result = self.render_batch(plugin, stacks, params, [time], directory, bundle, context, None if out is None else out[numpy.newaxis])
+
+        if result is None:
+            return None
+
+        return out if out is not None else result[0]
+
+    def render_batch(self, plugin, frames, params=None, times=None, directory=None, bundle=None, context=None, out=None):
+        # Renders a stack of frames x height x width x channels arrays on one
+        # instance inside one sequence render, as render does for a single
+        # frame. Frames is the Source stack or a dict of clip name to stack.
+        # Params is a dict for every frame or a list of one per frame, times
+        # default to 1 to N. Returns a stack of output frames, or out filled.
+        import numpy
+
+        if not isinstance(frames, dict):
+            frames = {'Source': frames}
+
+        stacks = {name: numpy.asarray(stack) for name, stack in frames.items()}
+
+        for name in stacks:
+            if stacks[name].ndim != 4:
+                logging.error('Input for clip {} must be frames x height x width x channels, got {}'.format(name, stacks[name].shape))
+                return None
+
+        if out is not None and out.ndim != 4:
+            logging.error('Output must be frames x height x width x channels, got {}'.format(out.shape))
+            return None
+
+        shapes = set(stack.shape[:3] for stack in stacks.values())
+        if out is not None:
+            shapes.add(out.shape[:3])
+
+        if len(shapes) != 1:
+            logging.error('Inputs and output must all have the same number and size of frames, got {}'.format(sorted(shapes)))
+            return None
+
+        (count, height, width) = shapes.pop()
+
+        if count == 0:
+            logging.error('No frames to render')
+            return None
+
+        times = list(range(1, count + 1)) if times is None else list(times)
+        params = [params or {}] * count if params is None or isinstance(params, dict) else list(params)
+
+        if len(times) != count or len(params) != count:
+            logging.error('{} frames need {} times and parameter sets, got {} and {}'.format(count, count, len(times), len(params)))
+            return None
+
+        job = self._array_instance(
+            plugin,
+            {name: stack[0] for name, stack in stacks.items()},
+            None if out is None else out[0],
+            directory,
+            bundle,
+            context
+        )
+
+        if job is None:
+            return None
+
+        active_uid = job['active_uid']
+        caller_depth, caller_components = job['caller']
+        output_components = job['formats']['Output']
+
+        if out is None:
+            out = numpy.empty((count, height, width, ofx_array.CHANNELS[caller_components]), dtype=ofx_array.DTYPES[caller_depth])
+
+        # Each set of parameters is loaded once and its animation sampled at
+        # every time it is used, so shared parameters cost nothing per frame
+        times_by_params = {}
+        for frame_params, time in zip(params, times):
+            times_by_params.setdefault(id(frame_params), []).append(time)
+
+        loaded = None
+        animated = []
+        sequence = False
+        status = ofx_status_codes.OFX_STATUS_OK
+
+        # The sequence is ended and the images disconnected however the batch
+        # stops, so the warm instance is left ready for the next call
+        try:
+            for n in range(0, count):
+                if params[n] is not loaded:
+                    self._reset_plugin_parameters(active_uid)
+                    status = self._load_plugin_parameters(active_uid, params[n])
+                    if status != ofx_status_codes.OFX_STATUS_OK:
+                        break
+
+                    animated = self._sample_parameter_animation(active_uid, times_by_params[id(params[n])])
+                    loaded = params[n]
+
+                # paramGetValue returns the value at the frame being rendered
+                for param in animated:
+                    param['value'] = param['animation']['frames'][times[n]]
+
+                if not sequence:
+                    self._begin_render_sequence(active_uid, min(times), max(times))
+                    sequence = True
+
+                    clips = self._host['active']['plugins'][active_uid]['clips']
+                    for name in stacks:
+                        clips[name]['source'] = functools.partial(
+                            self._load_array_frame, active_uid, name, stacks[name], times, job['depth'], job['formats'][name]
+                        )
+
+                fed = [self._feed_array(active_uid, name, stacks[name][n], job['depth'], job['formats'][name]) for name in stacks]
+                output_rows = self._feed_array(active_uid, 'Output', out[n], job['depth'], output_components, 'output')
+
+                if output_rows is None or any(rows is None for rows in fed):
+                    status = ofx_status_codes.OFX_STATUS_ERR_MEMORY
+                    break
+
+                status = self._render(active_uid, width, height, times[n])
+                if status != ofx_status_codes.OFX_STATUS_OK:
+                    break
+
+                # Output rendered into the staging buffer is flipped and converted
+                # into the caller's frame
+                if not numpy.may_share_memory(output_rows, out):
+                    ofx_array.convert(output_rows[::-1], caller_depth, caller_components, out[n])
+        finally:
+            if sequence:
+                self._end_render_sequence(active_uid)
+
+            for name in list(stacks) + ['Output']:
+                self._disconnect_image(active_uid, name)
+
+        if status != ofx_status_codes.OFX_STATUS_OK:
+            return None
+
+        return out
+
+    def release_warm(self):
+        for key in self._host['warm']:
+            self._destroy_plugin_instance(self._host['warm'][key])
+        self._host['warm'] = {}
+
+        for bundle in self._host['bundles']:
+            for plugin_id in self._host['bundles'][bundle]['plugins']:
+                if self._host['bundles'][bundle]['plugins'][plugin_id]['loaded']:
+                    self._unload_plugin(bundle, plugin_id)
+
+        self._host['memoryPool'].trim()
+
+def _catalog_worker(job):
+    # Runs in a pool worker process and describes every plugin in one bundle
+    directory, bundle = job
+
+    try:
+        entry = OfxHost().describe_bundle(directory, bundle)
+    except Exception as e:
+        logging.error('Could not describe {}: {}'.format(os.path.join(directory, bundle), e))
+        return None
+
+    if entry is None:
+        logging.error('Could not describe {}'.format(os.path.join(directory, bundle)))
+        return None
+
+    return ofx_catalog.summarise_bundle(directory, bundle, entry)
+
+def _render_job_worker(job):
+    # Runs in a pool worker process, loads the bundle once and renders its
+    # share of the frames on a single instance
+    directory, settings, num_threads, row_order, instrument, budgets, spill = job
+    host = OfxHost(num_threads, row_order == 'top_down', instrument, budgets[0], budgets[1], spill)
+    status = host._render_job(directory, settings)
 
+    if instrument:
+        return status, host._host['instrument'].export()
 
+    return status, None
@@ -7,7 +7,6 @@
 # file that should have been included as part of this package.
 
 import ctypes
-import copy
 import logging
 import ofx_ctypes
 import ofx_property_sets
@@ -65,7 +64,9 @@ class OfxImageEffectSuite():
         return {
             'handle': clip_handle,
             'image' : None,
-            'ctypes': copy.deepcopy(clip_descriptor['ctypes'])
+            'images': [],
+            'source': None,
+            'ctypes': clip_descriptor['ctypes'].copy_on_write()
         }
 
     def _get_property_set_callback(self, ctype_image_effect_handle, ctype_property_handle):
@@ -79,7 +80,12 @@ class OfxImageEffectSuite():
         return ofx_status_codes.OFX_STATUS_OK
 
     def _clip_define_callback(self, ctype_image_effect_handle, ctype_name, ctype_property_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_image_effect_handle)
+        context_descriptor = self._host['handles'].get(ctype_image_effect_handle)
+
+        if context_descriptor is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        handle = context_descriptor['handle']
 
         clip_handle = ofx_ctypes.CStructOfxHandle(
             ctypes.c_char_p(b'OfxTypeClip'),
@@ -90,26 +96,31 @@ class OfxImageEffectSuite():
             ctype_name
         )
 
-        bundle = handle.bundle.decode("utf-8")
-        plugin = handle.plugin.decode("utf-8")
-        context = handle.context.decode("utf-8")
         name = ctype_name.decode("utf-8")
 
-        self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['clips'][name] = {
+        context_descriptor['clips'][name] = {
             'handle': clip_handle,
             'ctypes': ofx_property_sets.OfxClipProperties(clip_name=name)
         }
 
+        self._host['handles'][ctypes.addressof(clip_handle)] = context_descriptor['clips'][name]
+
         ctype_property_handle.contents.value = ctypes.cast(ctypes.pointer(clip_handle), ctypes.c_void_p).value
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _clip_get_handle_callback(self, ctype_image_effect_handle, ctype_name, ctype_clip_handle, ctype_property_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_image_effect_handle)
-        active_uid = handle.active_uid.decode("utf-8")
+        active_plugin = self._host['handles'].get(ctype_image_effect_handle)
+
+        if active_plugin is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
         name = ctype_name.decode("utf-8")
 
-        clip_handle = self._host['active']['plugins'][active_uid]['clips'][name]['handle']
+        if name not in active_plugin['clips']:
+            return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
+
+        clip_handle = active_plugin['clips'][name]['handle']
 
         ctype_clip_handle.contents.value = ctypes.cast(ctypes.pointer(clip_handle), ctypes.c_void_p).value
 
@@ -124,24 +135,33 @@ class OfxImageEffectSuite():
         return ofx_status_codes.OFX_STATUS_OK
 
     def _clip_get_image_callback(self, ctype_clip_handle, ctype_time, ctype_region, ctype_image_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_clip_handle)
-        active_uid = handle.active_uid.decode("utf-8")
-        name = handle.name.decode("utf-8")
+        clip = self._host['handles'].get(ctype_clip_handle)
 
-        clip = self._host['active']['plugins'][active_uid]['clips'][name]
+        if clip is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if clip['ctypes'].get('OfxImageClipPropConnected').value == 0:
+        if clip['ctypes'].get_value('OfxImageClipPropConnected') == 0:
             return ofx_status_codes.OFX_STATUS_FAILED
 
-        image_handle = clip['image']['handle']
+        # Every image fetched must be released with clipReleaseImage
+        image = self._host['clipImages'].get(clip, ctype_time)
+
+        if image is None:
+            ctype_image_handle.contents.value = None
+            return ofx_status_codes.OFX_STATUS_FAILED
 
-        ctype_image_handle.contents.value = ctypes.cast(ctypes.pointer(image_handle), ctypes.c_void_p).value
+        ctype_image_handle.contents.value = ctypes.addressof(image['handle'])
 
         return ofx_status_codes.OFX_STATUS_OK
 
-    def _clip_release_image_callback(self, imageHandle):
-        # Currently only uses the one image that'll be caught by garbage collection on exit
-        # Will need to be changed once more than one frame is rendered
+    def _clip_release_image_callback(self, ctype_image_handle):
+        image = self._host['handles'].get(ctype_image_handle)
+
+        if image is None or 'refs' not in image:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        self._host['clipImages'].release(image)
+
         return ofx_status_codes.OFX_STATUS_OK
 
     def _abort_callback(self, imageEffect):
@@ -149,11 +169,18 @@ class OfxImageEffectSuite():
         return ofx_status_codes.OFX_STATUS_OK
 
     def _image_memory_alloc_callback(self, ctype_instance_handle, ctype_n_bytes, ctype_memory_handle):
-        buffer = (ctypes.c_byte * ctype_n_bytes)()
-        pointer = ctypes.addressof(buffer)
+        # The memory is charged to the instance it is allocated for, if any
+        active_plugin = self._host['handles'].get(ctype_instance_handle) if ctype_instance_handle else None
+        instance = active_plugin.get('active_uid') if active_plugin is not None else None
+
+        pointer = self._host['memoryPool'].alloc(ctype_n_bytes, 'image', instance)
+
+        if pointer is None:
+            ctype_memory_handle.contents.value = None
+            return ofx_status_codes.OFX_STATUS_ERR_MEMORY
 
-        if ctype_instance_handle:
-            handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_instance_handle)
+        if active_plugin is not None:
+            handle = active_plugin['handle']
 
             memory_handle = ofx_ctypes.CStructOfxHandle(
                 ctypes.c_char_p(b'OfxImageMemoryHandle'),
@@ -173,33 +200,47 @@ class OfxImageEffectSuite():
                 ctypes.c_char_p(str(pointer).encode('utf-8'))
             )
 
-        self._host['active']['memory'][str(pointer)] = {
+        memory = {
             'handle':     memory_handle,
-            'buffer':     buffer,
             'lock_count': 0,
             'pointer':    pointer,
-            'size':       ctype_n_bytes
+            'size':       ctype_n_bytes,
+            'instance':   instance
         }
 
-        ctype_memory_handle.contents.value = ctypes.cast(ctypes.pointer(memory_handle), ctypes.c_void_p).value
+        self._host['active']['memory'][ctypes.addressof(memory_handle)] = memory
+        self._host['memorySpill'].add(ctypes.addressof(memory_handle), memory)
+
+        ctype_memory_handle.contents.value = ctypes.addressof(memory_handle)
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _image_memory_lock_callback(self, ctype_memory_handle, ctype_return_ptr):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_memory_handle)
-        name = handle.name.decode('utf-8')
+        memory = self._host['active']['memory'].get(ctype_memory_handle)
+
+        if memory is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        ctype_return_ptr.contents.value = self._host['active']['memory'][name]['pointer']
-        self._host['active']['memory'][name]['lock_count'] += 1
+        # Unlocked memory may have been spilled, and is restored here
+        pointer = self._host['memorySpill'].lock(ctype_memory_handle, memory)
+
+        if pointer is None:
+            ctype_return_ptr.contents.value = None
+            return ofx_status_codes.OFX_STATUS_ERR_MEMORY
+
+        ctype_return_ptr.contents.value = pointer
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _image_memory_free_callback(self, ctype_memory_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_memory_handle)
-        name = handle.name.decode('utf-8')
+        memory = self._host['active']['memory'].get(ctype_memory_handle)
 
-        if self._host['active']['memory'][name]['lock_count'] < 1:
-            del(self._host['active']['memory'][name])
+        if memory is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        if memory['lock_count'] < 1:
+            del(self._host['active']['memory'][ctype_memory_handle])
+            self._host['memorySpill'].free(ctype_memory_handle, memory)
         else:
             logging.warning('Trying to delete imageMemory that is still locked')
             return ofx_status_codes.OFX_STATUS_FAILED
@@ -207,11 +248,12 @@ class OfxImageEffectSuite():
         return ofx_status_codes.OFX_STATUS_OK
 
     def _image_memory_unlock_callback(self, ctype_memory_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_memory_handle)
-        name = handle.name.decode('utf-8')
+        memory = self._host['active']['memory'].get(ctype_memory_handle)
+
+        if memory is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if self._host['active']['memory'][name]['lock_count'] > 0:
-            self._host['active']['memory'][name]['lock_count'] -= 1
+        self._host['memorySpill'].unlock(ctype_memory_handle, memory)
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -0,0 +1,189 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Opt in timing of every plugin action and host suite callback. Suites are
+# built with each of their *_callback methods wrapped before the ctypes
+# callbacks are made from them, so an uninstrumented host pays nothing.
+#
+# Time spent in callbacks made on the thread running an action is also added
+# to that action as host time, the rest of the action is the plugin's own
+# work. Callbacks from multiThread worker threads are timed but are not
+# added to any action.
+
+import os
+import sys
+import json
+import time
+import threading
+
+MAX_EVENTS = 1000000
+
+class OfxInstrumentation(object):
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._origin_us = time.time() * 1.0e6
+        self._lock = threading.Lock()
+        self._thread = threading.local()
+        self._events = []
+        self._dropped = 0
+        self._stats = {}
+
+    def _timestamp(self, perf_time):
+        return self._origin_us + (perf_time - self._origin) * 1.0e6
+
+    def _record(self, category, name, detail, start, end, host_time=0.0):
+        key = (category, name, detail)
+        duration = end - start
+
+        with self._lock:
+            stats = self._stats.get(key)
+
+            if stats is None:
+                self._stats[key] = [1, duration, duration, host_time]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = max(stats[2], duration)
+                stats[3] += host_time
+
+            # Every call is counted, the trace itself is capped so a long
+            # render does not exhaust memory
+            if len(self._events) < MAX_EVENTS:
+                self._events.append((
+                    category,
+                    name,
+                    detail,
+                    self._timestamp(start),
+                    duration * 1.0e6,
+                    os.getpid(),
+                    threading.get_ident(),
+                    host_time * 1.0e6
+                ))
+            else:
+                self._dropped += 1
+
+    def wrap_action(self, plugin_id, entry_point):
+        def timed_action(action, handle, in_args, out_args):
+            stack = getattr(self._thread, 'stack', None)
+
+            if stack is None:
+                stack = self._thread.stack = []
+
+            stack.append(0.0)
+            start = time.perf_counter()
+
+            try:
+                return entry_point(action, handle, in_args, out_args)
+            finally:
+                end = time.perf_counter()
+                self._record('action', action.value.decode('utf-8'), plugin_id, start, end, stack.pop())
+
+        return timed_action
+
+    def wrap_callback(self, suite_name, callback_name, callback):
+        def timed_callback(*args):
+            start = time.perf_counter()
+
+            try:
+                return callback(*args)
+            finally:
+                end = time.perf_counter()
+
+                # Property, parameter and clip names are the first string
+                # argument of the callbacks that take one
+                detail = next((a.decode('utf-8', 'replace') for a in args if isinstance(a, bytes)), '')
+                self._record(suite_name, callback_name, detail, start, end)
+
+                stack = getattr(self._thread, 'stack', None)
+                if stack:
+                    stack[-1] += end - start
+
+        return timed_callback
+
+    def build_suite(self, suite_name, suite_class, args):
+        # Instance attributes shadow the class's callback methods, so the
+        # suite's __init__ makes its ctypes callbacks from the timed wrappers
+        suite = suite_class.__new__(suite_class)
+
+        for name in dir(suite_class):
+            if name.startswith('_') and name.endswith('_callback'):
+                setattr(suite, name, self.wrap_callback(suite_name, name[1:-len('_callback')], getattr(suite, name)))
+
+        suite.__init__(*args)
+
+        return suite
+
+    def export(self):
+        # Plain data that can be returned from a worker process and merged
+        with self._lock:
+            return {
+                'events':  list(self._events),
+                'dropped': self._dropped,
+                'stats':   {key: list(stats) for key, stats in self._stats.items()}
+            }
+
+    def merge(self, data):
+        with self._lock:
+            room = MAX_EVENTS - len(self._events)
+            self._events.extend(data['events'][:room])
+            self._dropped += data['dropped'] + max(0, len(data['events']) - room)
+
+            for key, (count, total, longest, host_time) in data['stats'].items():
+                stats = self._stats.setdefault(key, [0, 0.0, 0.0, 0.0])
+                stats[0] += count
+                stats[1] += total
+                stats[2] = max(stats[2], longest)
+                stats[3] += host_time
+
+    def write_trace(self, filename):
+        # Chrome trace event format, load in chrome://tracing or Perfetto
+        trace_events = []
+
+        for category, name, detail, ts, dur, pid, tid, host_time in self._events:
+            args = {'detail': detail} if detail else {}
+            if category == 'action':
+                args['host_us'] = host_time
+
+            trace_events.append({
+                'name': name,
+                'cat':  category,
+                'ph':   'X',
+                'ts':   ts,
+                'dur':  dur,
+                'pid':  pid,
+                'tid':  tid,
+                'args': args
+            })
+
+        with open(filename, 'w') as fp:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, fp)
+
+    def print_summary(self, file=sys.stderr):
+        actions = sorted(((k, v) for k, v in self._stats.items() if k[0] == 'action'), key=lambda i: -i[1][1])
+        callbacks = sorted(((k, v) for k, v in self._stats.items() if k[0] != 'action'), key=lambda i: -i[1][1])
+
+        print('{:<72} {:>8} {:>11} {:>10} {:>10} {:>11} {:>11}'.format(
+            'Action', 'Count', 'Total ms', 'Mean ms', 'Max ms', 'Host ms', 'Plugin ms'), file=file)
+
+        for (category, name, detail), (count, total, longest, host_time) in actions:
+            print('{:<72} {:>8} {:>11.3f} {:>10.3f} {:>10.3f} {:>11.3f} {:>11.3f}'.format(
+                '{} {}'.format(name, detail)[:72], count, total * 1000.0, total * 1000.0 / count, longest * 1000.0, host_time * 1000.0, (total - host_time) * 1000.0), file=file)
+
+        print('', file=file)
+        print('{:<72} {:>8} {:>11} {:>10} {:>10}'.format('Callback', 'Count', 'Total ms', 'Mean us', 'Max us'), file=file)
+
+        for (category, name, detail), (count, total, longest, host_time) in callbacks:
+            label = '{} {}'.format(category.replace('Ofx', '').replace('Suite', ''), name)
+            if detail:
+                label = '{} {}'.format(label, detail)
+
+            print('{:<72} {:>8} {:>11.3f} {:>10.2f} {:>10.2f}'.format(
+                label[:72], count, total * 1000.0, total * 1.0e6 / count, longest * 1.0e6), file=file)
+
+        if self._dropped:
+            print('\n{} events were left out of the trace'.format(self._dropped), file=file)
@@ -0,0 +1,157 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Counts every byte of image and plugin memory the host holds, by instance
+# and by kind: input and output images, staging buffers, image memory and
+# memory suite blocks. Caches register the bytes they hold and how to free
+# them. A charge that would take the process or an instance over its budget
+# first evicts from the caches in the order they were added until it fits,
+# and if it still does not fit it is refused so the caller can fail with
+# kOfxStatErrMemory.
+
+import re
+import logging
+import threading
+
+SIZE_SUFFIXES = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+def parse_size(text):
+    # A number of bytes with an optional K, M, G or T suffix, as in 512M
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', str(text), re.IGNORECASE)
+
+    if match is None:
+        raise ValueError('{} is not a size, use a number of bytes with an optional K, M, G or T suffix'.format(text))
+
+    return int(float(match.group(1)) * SIZE_SUFFIXES[match.group(2).upper()])
+
+def format_size(n_bytes):
+    for suffix in ['T', 'G', 'M', 'K']:
+        if n_bytes >= SIZE_SUFFIXES[suffix]:
+            return '{:.1f}{}'.format(n_bytes / SIZE_SUFFIXES[suffix], suffix)
+    return '{}'.format(n_bytes)
+
+class OfxMemoryAccountant(object):
+    def __init__(self, budget=None, instance_budget=None):
+        self._budget = budget
+        self._instance_budget = instance_budget
+        # Eviction frees cache memory that may itself be counted here, and
+        # the image memory suite holds this lock while it moves blocks
+        self.lock = threading.RLock()
+        self._held = {}
+        self._owners = {}
+        self._total = 0
+        self._peak = 0
+        self._refused = 0
+        self._caches = []
+
+    def budgets(self):
+        return self._budget, self._instance_budget
+
+    def add_cache(self, name, cached_bytes, evict, charged=False):
+        # cached_bytes() returns the bytes the cache holds, evict(owner, n_bytes)
+        # frees at least n_bytes if it can, only the owner's when one is given.
+        # A charged cache's bytes are already counted as held.
+        self._caches.append((name, cached_bytes, evict, charged))
+
+    def cached(self):
+        return sum(cached_bytes() for name, cached_bytes, evict, charged in self._caches if not charged)
+
+    def usage(self):
+        return self._total + self.cached()
+
+    def _excess(self, owner, n_bytes):
+        # Bytes that must be freed for n_bytes to fit, and whose they must be
+        if self._instance_budget is not None and owner is not None:
+            excess = self._owners.get(owner, 0) + n_bytes - self._instance_budget
+            if excess > 0:
+                return owner, excess
+
+        if self._budget is not None:
+            excess = self.usage() + n_bytes - self._budget
+            if excess > 0:
+                return None, excess
+
+        return None, 0
+
+    def evict(self):
+        # Empties every cache
+        with self.lock:
+            for name, cached_bytes, evict, charged in self._caches:
+                size = cached_bytes()
+                if size:
+                    evict(None, size)
+
+    def charge(self, owner, kind, n_bytes, force=False):
+        # Returns False when the bytes cannot be held within the budgets.
+        # Forced charges are memory already allocated and always succeed.
+        with self.lock:
+            excess_owner, excess = self._excess(owner, n_bytes)
+
+            for name, cached_bytes, evict, charged in self._caches:
+                if excess <= 0 or force:
+                    break
+
+                size = cached_bytes()
+                if size:
+                    logging.info('Evicting up to {} from {}'.format(format_size(excess), name))
+                    evict(excess_owner, excess)
+                    excess_owner, excess = self._excess(owner, n_bytes)
+
+            if excess > 0 and not force:
+                self._refused += 1
+                logging.error('Cannot allocate {} of {} memory for {}, the process holds {} of {} and the instance {} of {}'.format(
+                    format_size(n_bytes),
+                    kind,
+                    owner or 'the host',
+                    format_size(self.usage()),
+                    format_size(self._budget) if self._budget is not None else 'unlimited',
+                    format_size(self._owners.get(owner, 0)),
+                    format_size(self._instance_budget) if self._instance_budget is not None else 'unlimited'
+                ))
+                return False
+
+            key = (owner, kind)
+            self._held[key] = self._held.get(key, 0) + n_bytes
+            self._owners[owner] = self._owners.get(owner, 0) + n_bytes
+            self._total += n_bytes
+            self._peak = max(self._peak, self._total)
+
+        return True
+
+    def release(self, owner, kind, n_bytes):
+        with self.lock:
+            key = (owner, kind)
+            self._held[key] = self._held.get(key, 0) - n_bytes
+            self._owners[owner] = self._owners.get(owner, 0) - n_bytes
+            self._total -= n_bytes
+
+            if self._held[key] <= 0:
+                del(self._held[key])
+            if self._owners[owner] <= 0:
+                del(self._owners[owner])
+
+    def held(self, owner=None):
+        with self.lock:
+            return self._owners.get(owner, 0)
+
+    def report(self):
+        with self.lock:
+            kinds = {}
+            for (owner, kind), n_bytes in self._held.items():
+                kinds[kind] = kinds.get(kind, 0) + n_bytes
+
+            return {
+                'budget':          self._budget,
+                'instance_budget': self._instance_budget,
+                'held':            self._total,
+                'cached':          {name: cached_bytes() for name, cached_bytes, evict, charged in self._caches},
+                'peak':            self._peak,
+                'refused':         self._refused,
+                'kinds':           kinds,
+                'instances':       {owner: n_bytes for owner, n_bytes in self._owners.items() if owner is not None}
+            }
@@ -0,0 +1,140 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Memory handed to plugins by the image memory and memory suites. Blocks are
+# 64 byte aligned, not cleared, and rounded up to a size class so a block
+# freed in one frame is reused for an allocation of a similar size in the
+# next. Blocks are found by their integer address. Blocks in use are charged
+# to the memory accountant, freed blocks kept for reuse are a cache it can
+# evict.
+
+import logging
+import threading
+
+ALIGNMENT = 64
+
+# Freed blocks kept for reuse, beyond this they are released
+POOL_RETAIN = 1 << 30
+
+def size_class(n_bytes):
+    # Four classes per power of two, so at most a quarter of a block is unused
+    if n_bytes <= ALIGNMENT:
+        return ALIGNMENT
+
+    step = max(ALIGNMENT, 1 << (n_bytes.bit_length() - 3))
+    return (n_bytes + step - 1) & ~(step - 1)
+
+class OfxMemoryPool(object):
+    def __init__(self, accountant=None, retain=POOL_RETAIN):
+        self._accountant = accountant
+        self._retain = retain
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._free = {}
+        self._allocated = 0
+        self._pooled = 0
+        self._reused = 0
+
+    def _new_block(self, block_size):
+        # numpy.empty leaves the memory uninitialised, a ctypes array would
+        # clear it. The spare bytes allow the start to be aligned.
+        import numpy
+
+        owner = numpy.empty(block_size + ALIGNMENT - 1, dtype=numpy.uint8)
+        address = (owner.ctypes.data + ALIGNMENT - 1) & ~(ALIGNMENT - 1)
+
+        return {
+            'address':  address,
+            'owner':    owner,
+            'size':     block_size,
+            'tag':      None,
+            'instance': None
+        }
+
+    def alloc(self, n_bytes, tag, instance=None):
+        # Returns the address of a block of at least n_bytes, or None. The tag
+        # says which suite the block belongs to so it can only be freed there,
+        # the instance is who the block is charged to.
+        block_size = size_class(n_bytes)
+
+        with self._lock:
+            free = self._free.get(block_size)
+            block = None
+
+            if free:
+                block = free.pop()
+                self._pooled -= block_size
+                self._reused += 1
+
+        # Charged outside the pool's lock as the accountant may trim the pool.
+        # A reused block stops being cached as it is charged, so its bytes are
+        # never counted twice.
+        if self._accountant is not None and not self._accountant.charge(instance, tag, block_size):
+            return None
+
+        if block is None:
+            try:
+                block = self._new_block(block_size)
+            except MemoryError:
+                logging.error('Could not allocate {} bytes'.format(n_bytes))
+                if self._accountant is not None:
+                    self._accountant.release(instance, tag, block_size)
+                return None
+
+        block['tag'] = tag
+        block['instance'] = instance
+
+        with self._lock:
+            self._blocks[block['address']] = block
+            self._allocated += block_size
+
+        return block['address']
+
+    def free(self, address, tag):
+        with self._lock:
+            block = self._blocks.get(address)
+
+            if block is None or block['tag'] != tag:
+                return False
+
+            del(self._blocks[address])
+            self._allocated -= block['size']
+            instance = block['instance']
+            block['tag'] = None
+            block['instance'] = None
+
+            if self._pooled + block['size'] <= self._retain:
+                self._free.setdefault(block['size'], []).append(block)
+                self._pooled += block['size']
+
+        if self._accountant is not None:
+            self._accountant.release(instance, tag, block['size'])
+
+        return True
+
+    def pooled(self):
+        return self._pooled
+
+    def size(self, address):
+        block = self._blocks.get(address)
+        return None if block is None else block['size']
+
+    def trim(self):
+        # Releases every freed block kept for reuse
+        with self._lock:
+            self._free = {}
+            self._pooled = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'allocated': self._allocated,
+                'pooled':    self._pooled,
+                'blocks':    len(self._blocks),
+                'reused':    self._reused
+            }
@@ -0,0 +1,208 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Image memory a plugin has unlocked may be moved by the host, its address is
+# only fixed while it is locked. When the memory accountant needs room the
+# blocks unlocked longest ago are spilled, compressed in memory or written to
+# a temporary spill file, and their pool blocks freed. The next
+# imageMemoryLock restores the contents into a new block.
+#
+# Every change to a block's lock count, address or spill state is made
+# holding the accountant's lock, the lock eviction already runs under.
+
+import zlib
+import ctypes
+import logging
+import tempfile
+import ofx_memory_pool
+
+SPILL_MODES = ['file', 'compress', 'none']
+
+# In compress mode a block that does not compress to under this fraction of
+# its size is written to the spill file instead
+COMPRESSED_MAX = 0.75
+
+class OfxMemorySpill(object):
+    def __init__(self, accountant, pool, mode='file', directory=None):
+        if mode not in SPILL_MODES:
+            raise ValueError('{} is not a spill mode, use one of {}'.format(mode, ', '.join(SPILL_MODES)))
+
+        self._accountant = accountant
+        self._pool = pool
+        self._mode = mode
+        self._directory = directory
+        self._unlocked = {}
+        self._sequence = 0
+        self._file = None
+        self._file_size = 0
+        self._extents = {}
+        self._compressed = 0
+        self._spilled = 0
+        self._restored = 0
+
+    def spillable_bytes(self):
+        if self._mode == 'none':
+            return 0
+        return sum(memory['size'] for memory in self._unlocked.values())
+
+    def _spill_file(self):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix='pyofx-spill-', dir=self._directory)
+        return self._file
+
+    def _write(self, memory):
+        # Returns where the block's contents went, None when they could not
+        # be kept and the block must stay in memory
+        data = (ctypes.c_char * memory['size']).from_address(memory['pointer'])
+
+        if self._mode == 'compress':
+            compressed = zlib.compress(data, 1)
+            if len(compressed) < memory['size'] * COMPRESSED_MAX:
+                self._compressed += len(compressed)
+                self._accountant.charge(memory['instance'], 'spilled', len(compressed), force=True)
+                return ('compress', compressed)
+
+        # Freed extents of the same size class are reused before the file grows
+        extent_size = ofx_memory_pool.size_class(memory['size'])
+        free = self._extents.get(extent_size)
+        offset = free.pop() if free else self._file_size
+
+        try:
+            spill_file = self._spill_file()
+            spill_file.seek(offset)
+            spill_file.write(data)
+        except OSError as e:
+            logging.error('Could not write image memory to the spill file: {}'.format(e))
+            if offset != self._file_size:
+                free.append(offset)
+            return None
+
+        self._file_size = max(self._file_size, offset + extent_size)
+
+        return ('file', offset, extent_size)
+
+    def _read(self, memory):
+        spilled = memory['spilled']
+        data = (ctypes.c_char * memory['size']).from_address(memory['pointer'])
+
+        if spilled[0] == 'compress':
+            ctypes.memmove(data, zlib.decompress(spilled[1]), memory['size'])
+        else:
+            self._file.seek(spilled[1])
+            self._file.readinto(data)
+
+        self._discard(memory)
+
+    def _discard(self, memory):
+        spilled = memory.pop('spilled', None)
+
+        if spilled is None:
+            return
+
+        if spilled[0] == 'compress':
+            self._compressed -= len(spilled[1])
+            self._accountant.release(memory['instance'], 'spilled', len(spilled[1]))
+        else:
+            self._extents.setdefault(spilled[2], []).append(spilled[1])
+
+    def spill(self, owner, n_bytes):
+        # Eviction callback, spills blocks unlocked longest ago until n_bytes
+        # have been freed. Compressed blocks stay in memory and only free what
+        # compression saved.
+        if self._mode == 'none':
+            return
+
+        freed = 0
+
+        with self._accountant.lock:
+            for key, memory in sorted(self._unlocked.items(), key=lambda item: item[1]['unlocked']):
+                if freed >= n_bytes:
+                    break
+
+                if owner is not None and memory['instance'] != owner:
+                    continue
+
+                # Memory never locked has nothing in it worth keeping
+                if memory['written']:
+                    spilled = self._write(memory)
+                    if spilled is None:
+                        break
+                    memory['spilled'] = spilled
+
+                self._pool.free(memory['pointer'], 'image')
+                memory['pointer'] = None
+                del(self._unlocked[key])
+                freed += memory['size']
+                self._spilled += 1
+
+                if memory.get('spilled', ('file',))[0] == 'compress':
+                    freed -= len(memory['spilled'][1])
+
+            if freed:
+                logging.info('Spilled {} bytes of unlocked image memory'.format(freed))
+
+    def lock(self, key, memory):
+        # Returns the block's address, restoring it first if it was spilled,
+        # or None when there is no memory to restore it into
+        with self._accountant.lock:
+            if memory['pointer'] is None:
+                pointer = self._pool.alloc(memory['size'], 'image', memory['instance'])
+                if pointer is None:
+                    return None
+
+                memory['pointer'] = pointer
+                if 'spilled' in memory:
+                    self._read(memory)
+                    self._restored += 1
+
+            self._unlocked.pop(key, None)
+            memory['lock_count'] += 1
+            memory['written'] = True
+
+            return memory['pointer']
+
+    def unlock(self, key, memory):
+        with self._accountant.lock:
+            if memory['lock_count'] > 0:
+                memory['lock_count'] -= 1
+
+            if memory['lock_count'] == 0 and memory['pointer'] is not None:
+                self._sequence += 1
+                memory['unlocked'] = self._sequence
+                self._unlocked[key] = memory
+
+    def add(self, key, memory):
+        # Newly allocated memory is unlocked, and so can be spilled at once
+        with self._accountant.lock:
+            self._sequence += 1
+            memory['unlocked'] = self._sequence
+            memory['written'] = False
+            self._unlocked[key] = memory
+
+    def free(self, key, memory):
+        with self._accountant.lock:
+            self._unlocked.pop(key, None)
+            self._discard(memory)
+
+            if memory['pointer'] is not None:
+                self._pool.free(memory['pointer'], 'image')
+                memory['pointer'] = None
+
+    def stats(self):
+        return {
+            'mode':       self._mode,
+            'spilled':    self._spilled,
+            'restored':   self._restored,
+            'compressed': self._compressed,
+            'file_size':  self._file_size
+        }
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -12,7 +12,7 @@ import ofx_status_codes
 
 class OfxMemorySuite(object):
     def __init__(self, host):
-        self._host = {}
+        self._host = host
 
         self._memory_alloc = ofx_ctypes.cfunc_memory_alloc(self._memory_alloc_callback)
         self._memory_free =  ofx_ctypes.cfunc_memory_free(self._memory_free_callback)
@@ -26,48 +26,22 @@ class OfxMemorySuite(object):
         return ctypes.cast(ctypes.pointer(self._suite), ctypes.c_void_p).value
 
     def _memory_alloc_callback(self, ctype_instance_handle, ctype_n_bytes, ctype_memory_pointer):
-        buffer = (ctypes.c_byte * ctype_n_bytes)()
-        pointer = ctypes.addressof(buffer)
+        # The memory is charged to the instance it is allocated for, if any
+        active_plugin = self._host['handles'].get(ctype_instance_handle) if ctype_instance_handle else None
+        instance = active_plugin.get('active_uid') if active_plugin is not None else None
 
-        if ctype_instance_handle:
-            handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_instance_handle)
+        pointer = self._host['memoryPool'].alloc(ctype_n_bytes, 'memory', instance)
 
-            memory_handle = ofx_ctypes.CStructOfxHandle(
-                ctypes.c_char_p(b'OfxImageMemoryHandle'),
-                handle.bundle,
-                handle.plugin,
-                handle.context,
-                handle.active_uid,
-                ctypes.c_char_p(str(pointer).encode('utf-8'))
-            )
-        else:
-            memory_handle = ofx_ctypes.CStructOfxHandle(
-                ctypes.c_char_p(b'OfxImageMemoryHandle'),
-                ctypes.c_char_p(b''),
-                ctypes.c_char_p(b''),
-                ctypes.c_char_p(b''),
-                ctypes.c_char_p(b''),
-                ctypes.c_char_p(str(pointer).encode('utf-8'))
-            )
-
-        self._host['active']['memory'][str(pointer)] = {
-            'handle': memory_handle,
-            'buffer': buffer,
-            'lock_count': 0,
-            'pointer': pointer,
-            'size': ctype_n_bytes
-        }
+        if pointer is None:
+            ctype_memory_pointer.contents.value = None
+            return ofx_status_codes.OFX_STATUS_ERR_MEMORY
 
         ctype_memory_pointer.contents.value = pointer
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _memory_free_callback(self, ctype_memory_pointer):
-        if ctype_memory_pointer in self._host['active']['memory']:
-            del(self._host['active']['memory'][ctype_memory_pointer])
+        if self._host['memoryPool'].free(ctype_memory_pointer, 'memory'):
             return ofx_status_codes.OFX_STATUS_OK
         else:
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
-
-
-
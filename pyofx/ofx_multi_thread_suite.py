@@ -6,16 +6,30 @@
 # and is released under the "MIT License Agreement". Please see the LICENSE
 # file that should have been included as part of this package.
 
+import os
 import ctypes
 import uuid
 import threading
 import ofx_ctypes
 import ofx_status_codes
 
+def available_cpus():
+    # Respect the process affinity mask (taskset, cgroup cpusets) where the OS has one
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
 class OfxMultiThreadSuite(object):
-    def __init__(self):
+    def __init__(self, num_cpus=None):
         self._active_mutex = {}
 
+        if num_cpus is None or num_cpus < 1:
+            num_cpus = available_cpus()
+
+        self._num_cpus = num_cpus
+        self._pool = None
+        self._thread_state = threading.local()
+
         self._multi_thread =                   ofx_ctypes.cfunc_multi_thread(self._multi_thread_callback)
         self._multi_thread_num_cpus =          ofx_ctypes.cfunc_multi_thread_num_cpus(self._multi_thread_num_cpus_callback)
         self._multi_thread_index =             ofx_ctypes.cfunc_multi_thread_index(self._multi_thread_index_callback)
@@ -41,29 +55,75 @@ class OfxMultiThreadSuite(object):
     def get_pointer_as_int(self):
         return ctypes.cast(ctypes.pointer(self._suite), ctypes.c_void_p).value
 
+    def _get_pool(self):
+        # Worker threads are created once and reused by every multiThread call.
+        # ctypes releases the GIL while the plugin's thread function runs.
+        if self._pool is None:
+            import concurrent.futures
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._num_cpus,
+                thread_name_prefix='OfxMultiThread'
+            )
+        return self._pool
+
+    def _run_thread_function(self, thread_func, thread_index, thread_max, ctype_args):
+        self._thread_state.index = thread_index
+        self._thread_state.spawned = True
+
+        try:
+            thread_func(
+                ctypes.c_uint(thread_index),
+                ctypes.c_uint(thread_max),
+                ctypes.c_void_p(ctype_args)
+            )
+        finally:
+            self._thread_state.index = 0
+            self._thread_state.spawned = False
+
     def _multi_thread_callback(self, ctype_function, ctype_n_threads, ctype_args):
         thread_func = ofx_ctypes.cfunc_thread_function(ctype_function)
 
-        thread_func(
-            ctypes.c_uint(0),
-            ctypes.c_uint(1),
-            ctypes.c_void_p(ctype_args)
-        )
+        n_threads = ctype_n_threads if ctype_n_threads > 0 else self._num_cpus
+
+        # Nested calls from a spawned thread run inline, queueing them on the
+        # pool could deadlock with the outer call waiting on the same workers
+        if n_threads == 1 or getattr(self._thread_state, 'spawned', False):
+            # multiThreadIndex gives each inline call its own index, and the
+            # calling thread's index afterwards
+            outer_index = getattr(self._thread_state, 'index', 0)
+
+            try:
+                for i in range(0, n_threads):
+                    self._thread_state.index = i
+                    thread_func(ctypes.c_uint(i), ctypes.c_uint(n_threads), ctypes.c_void_p(ctype_args))
+            finally:
+                self._thread_state.index = outer_index
+        else:
+            pool = self._get_pool()
+            futures = [
+                pool.submit(self._run_thread_function, thread_func, i, n_threads, ctype_args)
+                for i in range(0, n_threads)
+            ]
+
+            # OfxThreadFunctionV1 returns nothing, the call is done when every
+            # thread has
+            for future in futures:
+                future.result()
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _multi_thread_num_cpus_callback(self, ctype_n_cpus):
-        ctype_n_cpus.contents.value = 1
+        ctype_n_cpus.contents.value = self._num_cpus
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _multi_thread_index_callback(self, ctype_index):
-        ctype_index.contents.value = 0
+        ctype_index.contents.value = getattr(self._thread_state, 'index', 0)
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _multi_thread_is_spawned_thread_callback(self):
-        return 0
+        return 1 if getattr(self._thread_state, 'spawned', False) else 0
 
     def _mutex_create_callback(self, ctype_mutex_handle, ctype_lock_count):
         uid = str(uuid.uuid1())
@@ -78,7 +138,7 @@ class OfxMultiThreadSuite(object):
 
         mutex_semaphore = threading.Semaphore(ctype_lock_count)
 
-        self._active_mutex[uid] = {
+        self._active_mutex[ctypes.addressof(mutex_handle)] = {
             'handle': mutex_handle,
             'semaphore': mutex_semaphore
         }
@@ -88,41 +148,29 @@ class OfxMultiThreadSuite(object):
         return ofx_status_codes.OFX_STATUS_OK
 
     def _mutex_destroy_callback(self, ctype_mutex_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_mutex_handle)
-        name = handle.name.decode("utf-8")
-
-        if name in self._active_mutex:
-            del(self._active_mutex[name])
+        if ctype_mutex_handle in self._active_mutex:
+            del(self._active_mutex[ctype_mutex_handle])
             return ofx_status_codes.OFX_STATUS_OK
         else:
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
     def _mutex_lock_callback(self, ctype_mutex_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_mutex_handle)
-        name = handle.name.decode("utf-8")
-
-        if name in self._active_mutex:
-            self._active_mutex[name]['semaphore'].acquire()
+        if ctype_mutex_handle in self._active_mutex:
+            self._active_mutex[ctype_mutex_handle]['semaphore'].acquire()
             return ofx_status_codes.OFX_STATUS_OK
         else:
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
     def _mutex_unlock_callback(self, ctype_mutex_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_mutex_handle)
-        name = handle.name.decode("utf-8")
-
-        if name in self._active_mutex:
-            self._active_mutex[name]['semaphore'].release()
+        if ctype_mutex_handle in self._active_mutex:
+            self._active_mutex[ctype_mutex_handle]['semaphore'].release()
             return ofx_status_codes.OFX_STATUS_OK
         else:
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
     def _mutex_try_lock_callback(self, ctype_mutex_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_mutex_handle)
-        name = handle.name.decode("utf-8")
-
-        if name in self._active_mutex:
-            if self._active_mutex[name]['semaphore'].acquire(blocking=False):
+        if ctype_mutex_handle in self._active_mutex:
+            if self._active_mutex[ctype_mutex_handle]['semaphore'].acquire(blocking=False):
                 return ofx_status_codes.OFX_STATUS_OK
             else:
                 return ofx_status_codes.OFX_STATUS_FAILED
@@ -7,13 +7,199 @@
 # file that should have been included as part of this package.
 
 import ctypes
-import copy
 import logging
 import platform
+import ofx_animation
 import ofx_ctypes
 import ofx_property_sets
 import ofx_status_codes
 
+# paramSetValue's variadic args arrive as four doubles, four pointer sized and
+# four int sized args. Integers passed through varargs land in the pointer
+# sized slots on Linux and macOS but in the int slots on Windows.
+SET_VALUE_INT_ARGS = 8 if platform.system() == 'Windows' else 4
+SET_VALUE_DOUBLE_ARGS = 0
+SET_VALUE_POINTER_ARGS = 4
+
+VALUE_ACCESSORS = {
+    'OfxParamTypeInteger':    (ctypes.c_int,    1),
+    'OfxParamTypeDouble':     (ctypes.c_double, 1),
+    'OfxParamTypeBoolean':    (ctypes.c_int,    1),
+    'OfxParamTypeChoice':     (ctypes.c_int,    1),
+    'OfxParamTypeRGBA':       (ctypes.c_double, 4),
+    'OfxParamTypeRGB':        (ctypes.c_double, 3),
+    'OfxParamTypeDouble2D':   (ctypes.c_double, 2),
+    'OfxParamTypeInteger2D':  (ctypes.c_int,    2),
+    'OfxParamTypeDouble3D':   (ctypes.c_double, 3),
+    'OfxParamTypeInteger3D':  (ctypes.c_int,    3),
+    'OfxParamTypePushButton': (ctypes.c_int,    1),
+    'OfxParamTypeCustom':     (ctypes.c_char_p, 1),
+    'OfxParamTypeString':     (ctypes.c_char_p, 1)
+}
+
+# Parameter types the render JSON can set
+LOADABLE_PARAMS = [
+    'OfxParamTypeInteger',
+    'OfxParamTypeDouble',
+    'OfxParamTypeBoolean',
+    'OfxParamTypeChoice',
+    'OfxParamTypeRGBA',
+    'OfxParamTypeRGB',
+    'OfxParamTypeDouble2D',
+    'OfxParamTypeInteger2D',
+    'OfxParamTypeDouble3D',
+    'OfxParamTypeInteger3D',
+    'OfxParamTypeString',
+    'OfxParamTypeParametric'
+]
+
+def parameter_schema(parameters):
+    # Index of a described context's loadable parameters by script name, with
+    # what is needed to validate a value from the render JSON
+    schema = {}
+
+    for key in parameters:
+        properties = parameters[key]['ctypes']
+        param_type = properties.get_value('OfxParamPropType')
+
+        if param_type not in LOADABLE_PARAMS:
+            continue
+
+        entry = {
+            'name':       key,
+            'type':       param_type,
+            'value_type': None,
+            'dimensions': 1,
+            'min':        None,
+            'max':        None,
+            'options':    None
+        }
+
+        if param_type == 'OfxParamTypeParametric':
+            entry['dimensions'] = properties.get_value('OfxParamPropParametricDimension')
+        else:
+            entry['value_type'], entry['dimensions'] = VALUE_ACCESSORS[param_type]
+
+        if properties.contains('OfxParamPropMin'):
+            entry['min'] = [properties.get_value('OfxParamPropMin', i) for i in range(0, properties.length('OfxParamPropMin'))]
+            entry['max'] = [properties.get_value('OfxParamPropMax', i) for i in range(0, properties.length('OfxParamPropMax'))]
+
+        if param_type == 'OfxParamTypeChoice':
+            entry['options'] = properties.length('OfxParamPropChoiceOption')
+        elif param_type == 'OfxParamTypeBoolean':
+            entry['options'] = 2
+
+        schema[properties.get_value('OfxParamPropScriptName')] = entry
+
+    return schema
+
+def validate_value(entry, value):
+    # Returns a description of what is wrong with value, or None
+    dimensions = entry['dimensions']
+
+    if dimensions == 1 and isinstance(value, list):
+        return 'needs a single value'
+
+    values = value if isinstance(value, list) else [value]
+
+    if len(values) != dimensions:
+        return 'needs a list of {} values'.format(dimensions)
+
+    if entry['value_type'] is ctypes.c_char_p:
+        return None if isinstance(value, str) else 'needs a string'
+
+    for index, v in enumerate(values):
+        if not isinstance(v, (int, float)):
+            return '{} is not a number'.format(v)
+
+        if entry['value_type'] is ctypes.c_int and not float(v).is_integer():
+            return '{} is not an integer'.format(v)
+
+        if entry['min'] is not None and not entry['min'][index] <= v <= entry['max'][index]:
+            return '{} is outside {} to {}'.format(v, entry['min'][index], entry['max'][index])
+
+        if entry['options'] is not None and not 0 <= v < entry['options']:
+            return '{} is not a valid choice'.format(v)
+
+    return None
+
+def _value_accessors(param):
+    # Everything paramGetValue and paramSetValue need to know about a
+    # parameter is fixed once it is instanced, so pick the typed accessors up
+    # front and leave the callbacks a single call. The accessors read
+    # param['value'] and param['animation'] on each call as loading settings
+    # replaces them.
+    param_type = param['ctypes'].get_value('OfxParamPropType')
+
+    if param_type not in VALUE_ACCESSORS:
+        def unsupported(vargs):
+            logging.error('{} is not a valid type for paramGetValue/paramSetValue ({})'.format(param_type, param['handle'].name.decode('utf-8')))
+            return ofx_status_codes.OFX_STATUS_FAILED
+
+        def unsupported_at_time(time, vargs):
+            return unsupported(vargs)
+
+        return unsupported, unsupported_at_time, unsupported
+
+    value_type, dimensions = VALUE_ACCESSORS[param_type]
+
+    if value_type is ctypes.c_char_p:
+        # Hand back the address of the value's own buffer so the string
+        # outlives the call
+        def get_value(vargs):
+            ctypes.cast(vargs, ctypes.POINTER(ctypes.c_void_p))[0] = ctypes.addressof(param['value'][0])
+            return ofx_status_codes.OFX_STATUS_OK
+
+        def get_value_at_time(time, vargs):
+            return get_value(vargs)
+
+        def set_value(vargs):
+            param['value'] = [ctypes.create_string_buffer(ctypes.c_char_p(vargs[SET_VALUE_POINTER_ARGS]).value or b'')]
+            return ofx_status_codes.OFX_STATUS_OK
+
+        return get_value, get_value_at_time, set_value
+
+    value_pointer = ctypes.POINTER(value_type)
+    first = SET_VALUE_DOUBLE_ARGS if value_type is ctypes.c_double else SET_VALUE_INT_ARGS
+
+    if dimensions == 1:
+        def write_value(vargs, value):
+            ctypes.cast(vargs, value_pointer)[0] = value[0].value
+
+        def set_value(vargs):
+            param['value'] = [value_type(vargs[first] or 0)]
+            return ofx_status_codes.OFX_STATUS_OK
+    else:
+        def write_value(vargs, value):
+            va_list = ctypes.cast(vargs, value_pointer)
+            for index in range(0, dimensions):
+                va_list[index] = value[index].value
+
+        def set_value(vargs):
+            param['value'] = [value_type(v or 0) for v in vargs[first:first + dimensions]]
+            return ofx_status_codes.OFX_STATUS_OK
+
+    def get_value(vargs):
+        write_value(vargs, param['value'])
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def get_value_at_time(time, vargs):
+        animation = param['animation']
+
+        if animation is None:
+            value = param['value']
+        else:
+            # Frames in the sequence were sampled before it started, other
+            # times such as motion blur sub-frames are sampled on demand
+            value = animation['frames'].get(time)
+            if value is None:
+                value = ofx_animation.animation_values(animation, [time], value_type)[0]
+
+        write_value(vargs, value)
+        return ofx_status_codes.OFX_STATUS_OK
+
+    return get_value, get_value_at_time, set_value
+
 class OfxParameterSuite(object):
     def __init__(self, host):
         self._host = host
@@ -73,24 +259,41 @@ class OfxParameterSuite(object):
             handle.name
         )
 
+        # The value list starts out holding views of the descriptor's defaults,
+        # setting a value replaces the list element rather than writing to it
         if parameter_descriptor['ctypes'].contains('OfxParamPropDefault'):
-            value = copy.deepcopy(parameter_descriptor['ctypes'].get('OfxParamPropDefault'))
+            value = parameter_descriptor['ctypes'].get('OfxParamPropDefault')
         else:
             value = None
 
-        return {
-            'handle': parameter_handle,
-            'value':  value,
-            'ctypes': copy.deepcopy(parameter_descriptor['ctypes'])
+        param = {
+            'handle':    parameter_handle,
+            'value':     value,
+            'animation': None,
+            'ctypes':    parameter_descriptor['ctypes'].copy_on_write()
         }
 
+        param['get_value'], param['get_value_at_time'], param['set_value'] = _value_accessors(param)
+
+        if 'curves' in parameter_descriptor:
+            param['default_curves'] = parameter_descriptor['curves']
+            param['curves'] = [[list(point) for point in curve] for curve in parameter_descriptor['curves']]
+            param['tables'] = None
+
+        return param
+
+    def sample_parameter_animation(self, param, frames):
+        value_type, dimensions = VALUE_ACCESSORS[param['ctypes'].get_value('OfxParamPropType')]
+        ofx_animation.sample_frames(param['animation'], frames, value_type)
+
 
     def _param_define_callback(self, ctype_image_effect_handle, ctype_param_type, ctype_name, ctype_property_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_image_effect_handle)
+        context_descriptor = self._host['handles'].get(ctype_image_effect_handle)
 
-        bundle = handle.bundle.decode("utf-8")
-        plugin = handle.plugin.decode("utf-8")
-        context = handle.context.decode("utf-8")
+        if context_descriptor is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        handle = context_descriptor['handle']
         name = ctype_name.decode("utf-8")
         param_type = ctype_param_type.decode("utf-8")
 
@@ -103,25 +306,34 @@ class OfxParameterSuite(object):
             ctype_name
         )
 
-        self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['parameters'][name] = {
+        context_descriptor['parameters'][name] = {
             'handle': param_handle,
             'ctypes': ofx_property_sets.OfxParameterProperties(name, param_type)
         }
 
+        # Plugins add the default control points to the descriptor
+        if param_type == 'OfxParamTypeParametric':
+            context_descriptor['parameters'][name]['curves'] = []
+            context_descriptor['parameters'][name]['tables'] = None
+
+        self._host['handles'][ctypes.addressof(param_handle)] = context_descriptor['parameters'][name]
+
         ctype_property_handle.contents.value = ctypes.cast(ctypes.pointer(param_handle), ctypes.c_void_p).value
 
         return ofx_status_codes.OFX_STATUS_OK
 
     def _param_get_handle_callback(self, ctype_image_effect_handle, ctype_name, ctype_param_handle, ctype_property_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_image_effect_handle)
+        active_plugin = self._host['handles'].get(ctype_image_effect_handle)
+
+        if active_plugin is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        active_uid = handle.active_uid.decode("utf-8")
         name = ctype_name.decode("utf-8")
 
-        if name not in self._host['active']['plugins'][active_uid]['parameters']:
+        if name not in active_plugin['parameters']:
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        param_handle = self._host['active']['plugins'][active_uid]['parameters'][name]['handle']
+        param_handle = active_plugin['parameters'][name]['handle']
 
         ctype_param_handle.contents.value = ctypes.cast(ctypes.pointer(param_handle), ctypes.c_void_p).value
 
@@ -143,192 +355,147 @@ class OfxParameterSuite(object):
     # This is a horrendous hack to deal with variadic args in function call.
     # Seems to work on Linux, may crash spectacularly on other platforms 
     def _param_get_value_callback(self, ctype_param_handle, vargs):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_param_handle)
-
-        active_uid = handle.active_uid.decode("utf-8")
-        name = handle.name.decode("utf-8")
-
-        param = self._host['active']['plugins'][active_uid]['parameters'][name]
-
-        ofx_property_type = ctypes.cast(param['ctypes'].get('OfxParamPropType'), ctypes.c_char_p).value.decode('utf-8')
- 
-        if ofx_property_type == 'OfxParamTypeInteger':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_int))
-            va_list[0] = param['value'][0].value
-        elif ofx_property_type == 'OfxParamTypeDouble':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_double))
-            va_list[0] = param['value'][0].value
-        elif ofx_property_type == 'OfxParamTypeBoolean':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_int))
-            va_list[0] = param['value'][0].value
-        elif ofx_property_type == 'OfxParamTypeChoice':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_int))
-            va_list[0] = param['value'][0].value
-        elif ofx_property_type == 'OfxParamTypeRGBA':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_double))
-            va_list[0] = param['value'][0].value
-            va_list[1] = param['value'][1].value
-            va_list[2] = param['value'][2].value
-            va_list[3] = param['value'][3].value
-        elif ofx_property_type == 'OfxParamTypeRGB':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_double))
-            va_list[0] = param['value'][0].value
-            va_list[1] = param['value'][1].value
-            va_list[2] = param['value'][2].value
-        elif ofx_property_type == 'OfxParamTypeDouble2D':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_double))
-            va_list[0] = param['value'][0].value
-            va_list[1] = param['value'][1].value
-        elif ofx_property_type == 'OfxParamTypeInteger2D':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_int))
-            va_list[0] = param['value'][0].value
-            va_list[1] = param['value'][1].value
-        elif ofx_property_type == 'OfxParamTypeDouble3D':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_double))
-            va_list[0] = param['value'][0].value
-            va_list[1] = param['value'][1].value
-            va_list[2] = param['value'][2].value
-        elif ofx_property_type == 'OfxParamTypeInteger3D':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_int))
-            va_list[0] = param['value'][0].value
-            va_list[1] = param['value'][1].value
-            va_list[2] = param['value'][2].value
-        elif ofx_property_type == 'OfxParamTypePushButton':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_int))
-            va_list[0] = param['value'][0].value
-        elif ofx_property_type == 'OfxParamTypeCustom':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_char_p))
-            va_list[0] = param['value'][0].value
-        elif ofx_property_type == 'OfxParamTypeString':
-            va_list = ctypes.cast(vargs, ctypes.POINTER(ctypes.c_char_p))
-            va_list[0] = param['value'][0].value
-        else:
-            logging.error('{} is not a valid type for paramGetValue ({})'.format(ofx_property_type, name))
-            return ofx_status_codes.OFX_STATUS_FAILED
+        param = self._host['handles'].get(ctype_param_handle)
 
-        return ofx_status_codes.OFX_STATUS_OK
+        # Descriptors have no value to get or set
+        if param is None or 'get_value' not in param:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        return param['get_value'](vargs)
 
     def _param_get_value_at_time_callback(self, ctype_param_handle, ctype_time, vargs):
-        # Currently parameters don't animate so we just send back paramGetValue
-        return self._param_get_value_callback(ctype_param_handle, vargs)
+        param = self._host['handles'].get(ctype_param_handle)
+
+        # Descriptors have no value to get or set
+        if param is None or 'get_value_at_time' not in param:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        return param['get_value_at_time'](ctype_time, vargs)
 
     # This is a horrendous hack to deal with variadic args in function call.
     # Seems to work on Linux, may crash spectacularly on other platforms 
-    def _param_set_value_callback(self, ctype_param_handle, d_arg_1, d_arg_2, d_arg_3, d_arg_4,
-                                                            p_arg_1, p_arg_2, p_arg_3, p_arg_4,
-                                                            i_arg_1, i_arg_2, i_arg_3, i_arg_4):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_param_handle)
-
-        active_uid = handle.active_uid.decode("utf-8")
-        name = handle.name.decode("utf-8")
-
-        param = self._host['active']['plugins'][active_uid]['parameters'][name]
-
-        ofx_property_type = ctypes.cast(param['ctypes'].get('OfxParamPropType'), ctypes.c_char_p).value.decode('utf-8')
-
-        if ofx_property_type == 'OfxParamTypeInteger':
-            if platform.system() == 'Windows':
-                param['value'][0] = ctypes.c_int(i_arg_1)
-            else:
-                param['value'][0] = ctypes.c_int(p_arg_1)
-        elif ofx_property_type == 'OfxParamTypeDouble':
-            param['value'][0] = ctypes.c_double(d_arg_1)
-        elif ofx_property_type == 'OfxParamTypeBoolean':
-            if platform.system() == 'Windows':
-                param['value'][0] = ctypes.c_int(i_arg_1)
-            else:
-                param['value'][0] = ctypes.c_int(p_arg_1)
-        elif ofx_property_type == 'OfxParamTypeChoice':
-            if platform.system() == 'Windows':
-                param['value'][0] = ctypes.c_int(i_arg_1)
-            else:
-                param['value'][0] = ctypes.c_int(p_arg_1)
-        elif ofx_property_type == 'OfxParamTypeRGBA':
-            param['value'][0] = ctypes.c_double(d_arg_1)
-            param['value'][1] = ctypes.c_double(d_arg_2)
-            param['value'][2] = ctypes.c_double(d_arg_3)
-            param['value'][3] = ctypes.c_double(d_arg_4)
-        elif ofx_property_type == 'OfxParamTypeRGB':
-            param['value'][0] = ctypes.c_double(d_arg_1)
-            param['value'][1] = ctypes.c_double(d_arg_2)
-            param['value'][2] = ctypes.c_double(d_arg_3)
-        elif ofx_property_type == 'OfxParamTypeDouble2D':
-            param['value'][0] = ctypes.c_double(d_arg_1)
-            param['value'][1] = ctypes.c_double(d_arg_2)
-        elif ofx_property_type == 'OfxParamTypeInteger2D':
-            if platform.system() == 'Windows':
-                param['value'][0] = ctypes.c_int(i_arg_1)
-                param['value'][1] = ctypes.c_int(i_arg_2)
-            else:
-                param['value'][0] = ctypes.c_int(p_arg_1)
-                param['value'][0] = ctypes.c_int(p_arg_2)
-        elif ofx_property_type == 'OfxParamTypeDouble3D':
-            param['value'][0] = ctypes.c_double(d_arg_1)
-            param['value'][1] = ctypes.c_double(d_arg_2)
-            param['value'][2] = ctypes.c_double(d_arg_3)
-        elif ofx_property_type == 'OfxParamTypeInteger3D':
-            if platform.system() == 'Windows':
-                param['value'][0] = ctypes.c_int(i_arg_1)
-                param['value'][1] = ctypes.c_int(i_arg_2)
-                param['value'][2] = ctypes.c_int(i_arg_3)
-            else:
-                param['value'][0] = ctypes.c_int(p_arg_1)
-                param['value'][0] = ctypes.c_int(p_arg_2)
-                param['value'][0] = ctypes.c_int(p_arg_3)
-        elif ofx_property_type == 'OfxParamTypePushButton':
-            if platform.system() == 'Windows':
-                param['value'][0] = ctypes.c_int(i_arg_1)
-            else:
-                param['value'][0] = ctypes.c_int(p_arg_1)
-        elif ofx_property_type == 'OfxParamTypeCustom':
-            param['value'][0] = ctypes.create_string_buffer(ctypes.c_char_p(p_arg_1).value)
-        elif ofx_property_type == 'OfxParamTypeString':
-            param['value'][0] = ctypes.create_string_buffer(ctypes.c_char_p(p_arg_1).value)
-        else:
-            logging.error('{} is not a valid type for paramSetValue ({})'.format(ofx_property_type, name))
-            return ofx_status_codes.OFX_STATUS_FAILED
+    def _param_set_value_callback(self, ctype_param_handle, *vargs):
+        param = self._host['handles'].get(ctype_param_handle)
 
-        return ofx_status_codes.OFX_STATUS_OK
+        # Descriptors have no value to get or set
+        if param is None or 'set_value' not in param:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        return param['set_value'](vargs)
 
-    def _param_set_value_at_time_callback(self, ctype_param_handle, ctype_time, d_arg_1, d_arg_2, d_arg_3, d_arg_4,
-                                                                                p_arg_1, p_arg_2, p_arg_3, p_arg_4,
-                                                                                i_arg_1, i_arg_2, i_arg_3, i_arg_4):
-        # Currently parameters don't animate so we just send back paramSetValue
-        return self._param_set_value_callback(ctype_param_handle, d_arg_1, d_arg_2, d_arg_3, d_arg_4,
-                                                                  p_arg_1, p_arg_2, p_arg_3, p_arg_4,
-                                                                  i_arg_1, i_arg_2, i_arg_3, i_arg_4)
+    def _param_set_value_at_time_callback(self, ctype_param_handle, ctype_time, *vargs):
+        # The time is ignored and the value set as paramSetValue does. Keys are
+        # left unchanged, so on an animated parameter the value only lasts
+        # until the next frame is rendered.
+        return self._param_set_value_callback(ctype_param_handle, *vargs)
+
+    def _double_param(self, ctype_param_handle):
+        # Derivatives and integrals are only defined for double valued params
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None or 'get_value' not in param:
+            return None, 0
+
+        value_type, dimensions = VALUE_ACCESSORS.get(param['ctypes'].get_value('OfxParamPropType'), (None, 0))
+
+        if value_type is not ctypes.c_double:
+            return None, 0
+
+        return param, dimensions
 
     def _param_get_derivative_callback(self, ctype_param_handle, ctype_time, ctype_vargs):
-        # Parametric parameters are not supported
-        return ofx_status_codes.OFX_STATUS_FAILED
+        param, dimensions = self._double_param(ctype_param_handle)
+
+        if param is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        if param['animation'] is None:
+            values = [0.0] * dimensions
+        else:
+            values = ofx_animation.derivative(param['animation'], ctype_time).tolist()
+
+        va_list = ctypes.cast(ctype_vargs, ctypes.POINTER(ctypes.c_double))
+        for index in range(0, dimensions):
+            va_list[index] = values[index]
+
+        return ofx_status_codes.OFX_STATUS_OK
 
     def _param_get_integral_callback(self, ctype_param_handle, ctype_time1, ctype_time2, ctype_vargs):
-        # Parametric parameters are not supported
-        return ofx_status_codes.OFX_STATUS_FAILED
+        param, dimensions = self._double_param(ctype_param_handle)
+
+        if param is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        if param['animation'] is None:
+            values = [v.value * (ctype_time2 - ctype_time1) for v in param['value']]
+        else:
+            values = ofx_animation.integral(param['animation'], ctype_time1, ctype_time2).tolist()
+
+        va_list = ctypes.cast(ctype_vargs, ctypes.POINTER(ctypes.c_double))
+        for index in range(0, dimensions):
+            va_list[index] = values[index]
+
+        return ofx_status_codes.OFX_STATUS_OK
 
     def _param_get_num_keys_callback(self, ctype_param_handle, ctype_number_of_keys):
-        # Nothing animates so always 0 keys
-        ctype_number_of_keys.contents.value = 0
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        animation = param.get('animation')
+        ctype_number_of_keys.contents.value = 0 if animation is None else len(animation['times'])
         return ofx_status_codes.OFX_STATUS_OK
 
     def _param_get_key_time_callback(self, ctype_param_handle, ctype_keys, ctype_time):
-        # Nothing animates so always time 0
-        ctype_time.contents.value = 0
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        animation = param.get('animation')
+
+        if animation is None or ctype_keys >= len(animation['times']):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        ctype_time.contents.value = animation['times'][ctype_keys]
         return ofx_status_codes.OFX_STATUS_OK
 
     def _param_get_key_index_callback(self, ctype_param_handle, ctype_time, ctype_direction, ctype_index):
-        # No keys to return
-        ctype_index.contents.value = -1
-        return ofx_status_codes.OFX_STATUS_OK
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        animation = param.get('animation')
+        index = None if animation is None else ofx_animation.key_index(animation, ctype_time, ctype_direction)
 
-    def _param_delete_key_callback(self, paramHandle, time):
-        # No keys to delete
+        if index is None:
+            ctype_index.contents.value = -1
+            return ofx_status_codes.OFX_STATUS_FAILED
+
+        ctype_index.contents.value = index
         return ofx_status_codes.OFX_STATUS_OK
 
-    def _param_delete_all_keys_callback(self, paramHandle):
-        # No keys to delete
+    def _delete_keys(self, ctype_param_handle):
+        # Keys come from the render job and plugins cannot change them, a
+        # parameter that does not animate has none to delete
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        if param.get('animation') is not None:
+            return ofx_status_codes.OFX_STATUS_FAILED
+
         return ofx_status_codes.OFX_STATUS_OK
 
+    def _param_delete_key_callback(self, ctype_param_handle, ctype_time):
+        return self._delete_keys(ctype_param_handle)
+
+    def _param_delete_all_keys_callback(self, ctype_param_handle):
+        return self._delete_keys(ctype_param_handle)
+
     def _param_copy_callback(self, paramTo, paramFrom, dstOffset, frameRange):
         # No UI so this shouldn't get called
         return ofx_status_codes.OFX_STATUS_OK
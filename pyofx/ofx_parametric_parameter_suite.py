@@ -0,0 +1,186 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Parametric parameters hold a list of [position, value] control points per
+# curve in param['curves']. Curves plugins call parametricParamGetValue for
+# every pixel bucket, so each curve is sampled into a lookup table when its
+# control points change and the callback only interpolates the table.
+
+import ctypes
+import logging
+import ofx_animation
+import ofx_ctypes
+import ofx_status_codes
+
+TABLE_SIZE = 1024
+
+class OfxParametricParameterSuite(object):
+    def __init__(self, host):
+        self._host = host
+
+        self._get_value =                  ofx_ctypes.cfunc_parametric_param_get_value(self._get_value_callback)
+        self._get_n_control_points =       ofx_ctypes.cfunc_parametric_param_get_n_control_points(self._get_n_control_points_callback)
+        self._get_nth_control_point =      ofx_ctypes.cfunc_parametric_param_get_nth_control_point(self._get_nth_control_point_callback)
+        self._set_nth_control_point =      ofx_ctypes.cfunc_parametric_param_set_nth_control_point(self._set_nth_control_point_callback)
+        self._add_control_point =          ofx_ctypes.cfunc_parametric_param_add_control_point(self._add_control_point_callback)
+        self._delete_control_point =       ofx_ctypes.cfunc_parametric_param_delete_control_point(self._delete_control_point_callback)
+        self._delete_all_control_points =  ofx_ctypes.cfunc_parametric_param_delete_all_control_points(self._delete_all_control_points_callback)
+
+        self._suite = ofx_ctypes.CStructOfxParametricParameterSuite(
+            self._get_value,
+            self._get_n_control_points,
+            self._get_nth_control_point,
+            self._set_nth_control_point,
+            self._add_control_point,
+            self._delete_control_point,
+            self._delete_all_control_points
+        )
+
+    def get_pointer_as_int(self):
+        return ctypes.cast(ctypes.pointer(self._suite), ctypes.c_void_p).value
+
+    def load_curves(self, param, curves):
+        dimension = param['ctypes'].get_value('OfxParamPropParametricDimension')
+
+        if not isinstance(curves, list) or len(curves) != dimension:
+            logging.error('{} needs a list of {} curves'.format(param['handle'].name.decode('utf-8'), dimension))
+            return ofx_status_codes.OFX_STATUS_ERR_VALUE
+
+        param['curves'] = [sorted([float(p[0]), float(p[1])] for p in curve) for curve in curves]
+        param['tables'] = None
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def sample_curves(self, param):
+        low = param['ctypes'].get_value('OfxParamPropParametricRange', 0)
+        high = param['ctypes'].get_value('OfxParamPropParametricRange', 1)
+
+        # Each table is stored with the scale from a parametric position to a
+        # table index so the lookup is a multiply and a lerp
+        param['tables'] = [
+            (low, (TABLE_SIZE - 1) / (high - low), ofx_animation.sample_curve(curve, low, high, TABLE_SIZE).tolist())
+            for curve in param['curves']
+        ]
+
+    def _get_curve(self, ctype_param_handle, ctype_curve_index):
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None or 'curves' not in param:
+            return None, ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        if not 0 <= ctype_curve_index < param['ctypes'].get_value('OfxParamPropParametricDimension'):
+            return None, ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        # Plugins may set the dimension after defining the parameter
+        while len(param['curves']) <= ctype_curve_index:
+            param['curves'].append([])
+
+        return param, ofx_status_codes.OFX_STATUS_OK
+
+    def _get_value_callback(self, ctype_param_handle, ctype_curve_index, ctype_time, ctype_position, ctype_value):
+        param = self._host['handles'].get(ctype_param_handle)
+
+        if param is None or 'curves' not in param:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
+
+        if param['tables'] is None:
+            self.sample_curves(param)
+
+        if not 0 <= ctype_curve_index < len(param['tables']):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        low, scale, table = param['tables'][ctype_curve_index]
+        x = (ctype_position - low) * scale
+
+        if x <= 0.0:
+            ctype_value.contents.value = table[0]
+        elif x >= TABLE_SIZE - 1:
+            ctype_value.contents.value = table[-1]
+        else:
+            index = int(x)
+            ctype_value.contents.value = table[index] + (x - index) * (table[index + 1] - table[index])
+
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _get_n_control_points_callback(self, ctype_param_handle, ctype_curve_index, ctype_time, ctype_count):
+        param, status = self._get_curve(ctype_param_handle, ctype_curve_index)
+
+        if param is None:
+            return status
+
+        ctype_count.contents.value = len(param['curves'][ctype_curve_index])
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _get_nth_control_point_callback(self, ctype_param_handle, ctype_curve_index, ctype_time, ctype_nth, ctype_key, ctype_value):
+        param, status = self._get_curve(ctype_param_handle, ctype_curve_index)
+
+        if param is None:
+            return status
+
+        curve = param['curves'][ctype_curve_index]
+
+        if not 0 <= ctype_nth < len(curve):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        ctype_key.contents.value = curve[ctype_nth][0]
+        ctype_value.contents.value = curve[ctype_nth][1]
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _set_nth_control_point_callback(self, ctype_param_handle, ctype_curve_index, ctype_time, ctype_nth, ctype_key, ctype_value, ctype_add_key):
+        # Control points do not animate, so the time and add key are ignored
+        param, status = self._get_curve(ctype_param_handle, ctype_curve_index)
+
+        if param is None:
+            return status
+
+        curve = param['curves'][ctype_curve_index]
+
+        if not 0 <= ctype_nth < len(curve):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        curve[ctype_nth] = [ctype_key, ctype_value]
+        curve.sort()
+        param['tables'] = None
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _add_control_point_callback(self, ctype_param_handle, ctype_curve_index, ctype_time, ctype_key, ctype_value, ctype_add_key):
+        param, status = self._get_curve(ctype_param_handle, ctype_curve_index)
+
+        if param is None:
+            return status
+
+        curve = param['curves'][ctype_curve_index]
+        curve.append([ctype_key, ctype_value])
+        curve.sort()
+        param['tables'] = None
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _delete_control_point_callback(self, ctype_param_handle, ctype_curve_index, ctype_nth):
+        param, status = self._get_curve(ctype_param_handle, ctype_curve_index)
+
+        if param is None:
+            return status
+
+        curve = param['curves'][ctype_curve_index]
+
+        if not 0 <= ctype_nth < len(curve):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        del curve[ctype_nth]
+        param['tables'] = None
+        return ofx_status_codes.OFX_STATUS_OK
+
+    def _delete_all_control_points_callback(self, ctype_param_handle, ctype_curve_index):
+        param, status = self._get_curve(ctype_param_handle, ctype_curve_index)
+
+        if param is None:
+            return status
+
+        param['curves'][ctype_curve_index] = []
+        param['tables'] = None
+        return ofx_status_codes.OFX_STATUS_OK
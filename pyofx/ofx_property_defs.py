@@ -895,7 +895,8 @@ OFX_PROPERTY_DEFS = {
             'OfxParamTypeCustom',
             'OfxParamTypeGroup',
             'OfxParamTypePage',
-            'OfxParamTypePushButton'
+            'OfxParamTypePushButton',
+            'OfxParamTypeParametric'
             ]
     },
     'kOfxParamPropUseHostOverlayHandle': {
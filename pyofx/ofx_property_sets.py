@@ -7,59 +7,188 @@
 # file that should have been included as part of this package.
 
 import ctypes
+import copy
 import logging
 import ofx_property_defs
 
+class OfxProperty(object):
+    # One property's values held in a single contiguous ctypes array, so N
+    # dimensional gets and sets are one memmove. Strings live in their own
+    # buffers and the array holds their addresses, which is the char** layout
+    # propGetStringN hands back.
+    __slots__ = ('property_type', 'is_list', 'count', 'values', 'strings')
+
+    CTYPES = {
+        'int': ctypes.c_int,
+        'dbl': ctypes.c_double,
+        'ptr': ctypes.c_ulonglong,
+        'str': ctypes.c_void_p
+    }
+
+    def __init__(self, property_type, values, is_list):
+        self.property_type = property_type
+        self.is_list = is_list
+        self.count = 0
+        self.values = (OfxProperty.CTYPES[property_type] * max(1, len(values)))()
+        self.strings = [] if property_type == 'str' else None
+
+        for index, value in enumerate(values):
+            self.set_value(index, value)
+
+    def __deepcopy__(self, memo):
+        return OfxProperty(
+            self.property_type,
+            [self.get_value(i) for i in range(0, self.count)],
+            self.is_list
+        )
+
+    def _convert(self, value):
+        if self.property_type == 'int':
+            return int(value)
+        elif self.property_type == 'dbl':
+            return float(value)
+        elif self.property_type == 'ptr':
+            return int(value) if value else 0
+        elif isinstance(value, bytes):
+            return value
+        elif value is None:
+            return b''
+        else:
+            return str(value).encode('utf-8')
+
+    def _grow(self, count):
+        if count <= len(self.values):
+            return
+
+        values = (OfxProperty.CTYPES[self.property_type] * max(count, 2 * len(self.values)))()
+        ctypes.memmove(values, self.values, ctypes.sizeof(self.values))
+        self.values = values
+
+    def set_value(self, index, value):
+        # An index past the end appends, as propSet calls are allowed to grow
+        # variable dimension properties one element at a time
+        if index >= self.count:
+            index = self.count
+            self._grow(index + 1)
+            self.count += 1
+            if self.strings is not None:
+                self.strings.append(None)
+
+        value = self._convert(value)
+
+        if self.strings is None:
+            self.values[index] = value
+        else:
+            buffer = self.strings[index]
+            if buffer is not None and len(value) < len(buffer):
+                buffer.value = value
+            else:
+                buffer = ctypes.create_string_buffer(value)
+                self.strings[index] = buffer
+                self.values[index] = ctypes.addressof(buffer)
+
+        return index
+
+    def get_value(self, index=0):
+        if self.strings is None:
+            return self.values[index]
+        else:
+            return self.strings[index].value.decode('utf-8')
+
+    def element(self, index=0):
+        if self.strings is None:
+            return OfxProperty.CTYPES[self.property_type].from_buffer(
+                self.values,
+                index * ctypes.sizeof(OfxProperty.CTYPES[self.property_type])
+            )
+        else:
+            return self.strings[index]
+
+    def address(self, index=0):
+        if self.strings is None:
+            return ctypes.addressof(self.values) + index * ctypes.sizeof(OfxProperty.CTYPES[self.property_type])
+        else:
+            return ctypes.addressof(self.strings[index])
+
+    def read_n(self, count, address, property_type):
+        if property_type == self.property_type:
+            ctypes.memmove(address, self.values, count * ctypes.sizeof(OfxProperty.CTYPES[property_type]))
+        else:
+            convert = float if property_type == 'dbl' else int
+            destination = ctypes.cast(address, ctypes.POINTER(OfxProperty.CTYPES[property_type]))
+            for index in range(0, count):
+                destination[index] = convert(self.values[index])
+
+    def write_n(self, count, address, property_type):
+        if property_type == self.property_type and self.strings is None:
+            self._grow(count)
+            ctypes.memmove(self.values, address, count * ctypes.sizeof(OfxProperty.CTYPES[property_type]))
+            self.count = max(self.count, count)
+        else:
+            source = ctypes.cast(address, ctypes.POINTER(ctypes.c_char_p if property_type == 'str' else OfxProperty.CTYPES[property_type]))
+            for index in range(0, count):
+                self.set_value(index, source[index])
+
 class OfxPropertySet(object):
     def __init__(self):
         self._data = {}
+        self._shared = set()
 
-    def ptr(self, key, index=None):
-        if key in self._data:
-            if isinstance(self._data[key], list) and index is not None:
-                if 0 <= index < len(self._data[key]):
-                    return ctypes.addressof(self._data[key][index])
-                else:
-                    logging.error('Index {} out of range in {}'.format(index, key))
-                    return None
-            else:
-                return ctypes.addressof(self._data[key])
-        else:
+    def copy_on_write(self):
+        # Instances start out sharing every property with their descriptor,
+        # whichever side writes to a shared property first clones it
+        copied = self.__class__.__new__(self.__class__)
+        copied._data = dict(self._data)
+        copied._shared = set(self._data)
+        self._shared.update(self._data)
+        return copied
+
+    def _writable(self, key):
+        prop = self._data[key]
+
+        if key in self._shared:
+            prop = copy.deepcopy(prop)
+            self._data[key] = prop
+            self._shared.discard(key)
+
+        return prop
+
+    def _property(self, key, index):
+        prop = self._data.get(key)
+
+        if prop is None:
             logging.error('{} not in property set'.format(key))
             return None
 
+        if not 0 <= index < prop.count:
+            logging.error('Index {} out of range in {}'.format(index, key))
+            return None
+
+        return prop
+
+    def ptr(self, key, index=None):
+        index = 0 if index is None else index
+        prop = self._property(key, index)
+        return None if prop is None else prop.address(index)
+
     def length(self, key):
         if key in self._data:
-            field = self._data[key]
-            if isinstance(field, list):
-                return len(field)
-            else:
-                return 1
+            return self._data[key].count
         else:
             logging.error('{} not in property set'.format(key))
             return None
 
     def update(self, key, property_value, property_type, index=None):
-        if property_type == 'int':
-            new_value = ctypes.c_int(int(property_value))
-        elif property_type == 'dbl':
-            new_value = ctypes.c_double(float(property_value))
-        elif property_type == 'str':
-            new_value = ctypes.create_string_buffer(property_value.encode('utf-8'))
-        elif property_type == 'ptr':
-            new_value = ctypes.c_ulonglong(int(property_value))
-        else:
+        if property_type not in OfxProperty.CTYPES:
             logging.error('{} invalid type'.format(property_type))
             return False
 
         if key in self._data:
-            if isinstance(self._data[key], list) and index is not None:
-                if 0 <= index < len(self._data[key]):
-                    self._data[key][index] = new_value
-                else:
-                    self._data[key].append(new_value)
-            else:
-                self._data[key] = new_value
+            try:
+                self._writable(key).set_value(0 if index is None else index, property_value)
+            except (TypeError, ValueError):
+                logging.error('{} is not a valid value for {}'.format(property_value, key))
+                return False
 
             return True
         else:
@@ -67,42 +196,68 @@ class OfxPropertySet(object):
             return False
 
     def get(self, key, index=None):
-        if key in self._data:
-            if isinstance(self._data[key], list) and index is not None:
-                if 0 <= index < len(self._data[key]):
-                    return self._data[key][index]
-                else:
-                    logging.error('Index {} out of range in {}'.format(index, key))
-                    return None
-            else:
-                return self._data[key]
-        else:
+        if key not in self._data:
             logging.error('{} not in property set'.format(key))
             return None
 
-    def value_as_string(self, key, index=None):
-        if key in self._data:
-            if isinstance(self._data[key], list) and index is not None:
-                if 0 <= index < len(self._data[key]):
-                    if 'c_char_Array' in str(type(self._data[key][index])):
-                        return ctypes.cast(self._data[key][index].value, ctypes.c_char_p).value.decode('utf-8')
-                    else:
-                        return str(self._data[key][index].value)
-                else:
-                    logging.error('Index {} out of range in {}'.format(index, key))
-                    return None
-            else:
-                if 'c_char_Array' in str(type(self._data[key])):
-                    return ctypes.cast(self._data[key].value, ctypes.c_char_p).value.decode('utf-8')
-                else:
-                    return str(self._data[key].value)
-        else:
+        prop = self._data[key]
+
+        if index is None:
+            if prop.is_list:
+                return [prop.element(i) for i in range(0, prop.count)]
+            index = 0
+
+        prop = self._property(key, index)
+        return None if prop is None else prop.element(index)
+
+    def get_value(self, key, index=0):
+        prop = self._property(key, index)
+        return None if prop is None else prop.get_value(index)
+
+    def get_n(self, key, count, address, property_type):
+        prop = self._property(key, count - 1) if count > 0 else self._data.get(key)
+
+        if prop is None:
+            return False
+
+        prop.read_n(count, address, property_type)
+        return True
+
+    def set_n(self, key, count, address, property_type):
+        if key not in self._data:
             logging.error('{} not in property set'.format(key))
-            return None
+            return False
+
+        self._writable(key).write_n(count, address, property_type)
+        return True
+
+    def value_as_string(self, key, index=None):
+        index = 0 if index is None else index
+        prop = self._property(key, index)
+        return None if prop is None else str(prop.get_value(index))
 
     def contains(self, key):
         return key in self._data
 
+    def as_dict(self):
+        # Plain data for the describe cache. Pointers are only meaningful in
+        # the process that set them so they are not kept.
+        return {
+            key: [
+                prop.property_type,
+                prop.is_list,
+                [0 if prop.property_type == 'ptr' else prop.get_value(i) for i in range(0, prop.count)]
+            ]
+            for key, prop in self._data.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        restored = cls.__new__(cls)
+        restored._data = {key: OfxProperty(t, values, is_list) for key, (t, is_list, values) in data.items()}
+        restored._shared = set()
+        return restored
+
     def add(self, key, property_value=None, property_type=None, replace=False):
         if key in self._data and not replace:
             logging.error('{} already in property set'.format(key))
@@ -155,28 +310,16 @@ class OfxPropertySet(object):
                     logging.error('{} not a valid value for {} property'.format(new_value, key))
                     return False
 
+        if new_type not in OfxProperty.CTYPES:
+            logging.error('{} invalid type for property'.format(new_type))
+            return False
+
         if isinstance(new_value, list):
-            if new_type == 'int':
-                self._data[key] = [ctypes.c_int(int(i)) for i in new_value]
-            elif new_type == 'dbl':
-                self._data[key] = [ctypes.c_double(float(i)) for i in new_value]
-            elif new_type == 'str':
-                self._data[key] = [ctypes.create_string_buffer(i.encode('utf-8')) for i in new_value]
-            else:
-                logging.error('{} invalid type for multi dimensional property'.format(new_type))
-                return False
+            self._data[key] = OfxProperty(new_type, new_value, True)
         else:
-            if new_type == 'int':
-                self._data[key] = ctypes.c_int(int(new_value))
-            elif new_type == 'dbl':
-                self._data[key] = ctypes.c_double(float(new_value))
-            elif new_type == 'str':
-                self._data[key] = ctypes.create_string_buffer(new_value.encode('utf-8'))
-            elif new_type == 'ptr':
-                self._data[key] = ctypes.c_ulonglong(int(new_value))
-            else:
-                logging.error('{} invalid type for single dimension property'.format(new_type))
-                return False
+            self._data[key] = OfxProperty(new_type, [new_value], False)
+
+        self._shared.discard(key)
 
         return True
 
@@ -186,6 +329,7 @@ class OfxHostProperties(OfxPropertySet):
 
         self.add('OfxPropType', 'OfxTypeImageEffectHost'),
         self.add('OfxImageEffectPropSupportedComponents', ['OfxImageComponentRGBA', 'OfxImageComponentRGB'])
+        self.add('OfxImageEffectPropSupportedPixelDepths', ['OfxBitDepthByte', 'OfxBitDepthShort', 'OfxBitDepthFloat'])
         self.add('OfxImageEffectPropSupportedContexts', ['OfxImageEffectContextFilter','OfxImageEffectContextGeneral'])
         self.add('OfxParamHostPropPageRowColumnCount', [10, 20])
         self.add('OfxPropName', 'pyOfx')
@@ -233,6 +377,7 @@ class OfxEffectProperties(OfxPropertySet):
         self.add('OfxImageEffectPluginPropSingleInstance')
         self.add('OfxImageEffectPluginRenderThreadSafety')
         self.add('OfxImageEffectPluginPropHostFrameThreading')
+        self.add('OfxImageEffectInstancePropSequentialRender')
         self.add('OfxImageEffectPluginPropOverlayInteractV1')
         self.add('OfxImageEffectPropSupportsMultiResolution')
         self.add('OfxImageEffectPropSupportsTiles')
@@ -271,7 +416,7 @@ class OfxEffectInstanceProperties(OfxPropertySet):
 
 class OfxClipProperties(OfxPropertySet):
     def brief_details(self):
-        clip_is_optional = int(self._data['OfxImageClipPropOptional'].value) != 0
+        clip_is_optional = int(self.get_value('OfxImageClipPropOptional')) != 0
         return '{:20} {}'.format(
             self.value_as_string('OfxPropName'),
             'Optional' if  clip_is_optional else 'Required'
@@ -308,19 +453,31 @@ class OfxClipProperties(OfxPropertySet):
         self.add('OfxImageClipPropContinuousSamples', 0)
 
 class OfxImageProperties(OfxPropertySet):
-    def __init__(self, unique_id, data_ptr, width, height):
+    def __init__(self, unique_id, data_ptr, width, height, row_order='bottom_up',
+                 pixel_depth='OfxBitDepthByte', components='OfxImageComponentRGBA', row_bytes=None):
         super().__init__()
 
+        # With row bytes given the data pointer is already the start of the
+        # bottom row, otherwise it is a packed RGBA byte buffer in row order
+        if row_bytes is None:
+            row_bytes = width * 4
+
+            # For a top down buffer the data pointer is the start of the bottom
+            # row and the plugin walks up through memory with negative row bytes
+            if row_order == 'top_down':
+                data_ptr = data_ptr + (height - 1) * row_bytes
+                row_bytes = -row_bytes
+
         self.add('OfxPropType', 'OfxTypeImage')
-        self.add('OfxImageEffectPropPixelDepth', 'OfxBitDepthByte')
-        self.add('OfxImageEffectPropComponents', 'OfxImageComponentRGBA')
+        self.add('OfxImageEffectPropPixelDepth', pixel_depth)
+        self.add('OfxImageEffectPropComponents', components)
         self.add('OfxImageEffectPropPreMultiplication', 'OfxImageUnPreMultiplied')
         self.add('OfxImageEffectPropRenderScale', [1.0, 1.0])
         self.add('OfxImagePropPixelAspectRatio', 1.0)
         self.add('OfxImagePropData', data_ptr)
         self.add('OfxImagePropBounds', [0, 0, width, height])
         self.add('OfxImagePropRegionOfDefinition', [0, 0, width, height])
-        self.add('OfxImagePropRowBytes', width * 4)
+        self.add('OfxImagePropRowBytes', row_bytes)
         self.add('OfxImagePropField', 'OfxImageFieldNone')
         self.add('OfxImagePropUniqueIdentifier', unique_id)
 
@@ -344,7 +501,8 @@ class OfxParameterProperties(OfxPropertySet):
         'OfxParamTypeInteger3D',
         'OfxParamTypeString',
         'OfxParamTypeCustom',
-        'OfxParamTypePushButton'
+        'OfxParamTypePushButton',
+        'OfxParamTypeParametric'
         ]
 
     def _is_value_param(self):
@@ -355,66 +513,66 @@ class OfxParameterProperties(OfxPropertySet):
         if not self._is_value_param():
             return (None, None)
 
-        if self._data['OfxParamPropSecret'].value == 1:
+        if self.get_value('OfxParamPropSecret') == 1:
             return (None, None)
 
         param_type = self.value_as_string('OfxParamPropType')
 
         if param_type == 'OfxParamTypeInteger':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    int(self._data['OfxParamPropDefault'][0].value)
+                    int(self.get_value('OfxParamPropDefault', 0))
                    )
         elif param_type == 'OfxParamTypeDouble':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    float(self._data['OfxParamPropDefault'][0].value)
+                    float(self.get_value('OfxParamPropDefault', 0))
                    )
         elif param_type == 'OfxParamTypeBoolean':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    int(self._data['OfxParamPropDefault'][0].value)
+                    int(self.get_value('OfxParamPropDefault', 0))
                    )
         elif param_type == 'OfxParamTypeChoice':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    int(self._data['OfxParamPropDefault'][0].value)
+                    int(self.get_value('OfxParamPropDefault', 0))
                    )
         elif param_type == 'OfxParamTypeRGBA':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    [float(self._data['OfxParamPropDefault'][0].value),
-                     float(self._data['OfxParamPropDefault'][1].value),
-                     float(self._data['OfxParamPropDefault'][2].value),
-                     float(self._data['OfxParamPropDefault'][3].value)
+                    [float(self.get_value('OfxParamPropDefault', 0)),
+                     float(self.get_value('OfxParamPropDefault', 1)),
+                     float(self.get_value('OfxParamPropDefault', 2)),
+                     float(self.get_value('OfxParamPropDefault', 3))
                     ]
                    )
         elif param_type == 'OfxParamTypeRGB':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    [float(self._data['OfxParamPropDefault'][0].value),
-                     float(self._data['OfxParamPropDefault'][1].value),
-                     float(self._data['OfxParamPropDefault'][2].value)
+                    [float(self.get_value('OfxParamPropDefault', 0)),
+                     float(self.get_value('OfxParamPropDefault', 1)),
+                     float(self.get_value('OfxParamPropDefault', 2))
                     ]
                    )
         elif param_type == 'OfxParamTypeDouble2D':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    [float(self._data['OfxParamPropDefault'][0].value),
-                     float(self._data['OfxParamPropDefault'][1].value)
+                    [float(self.get_value('OfxParamPropDefault', 0)),
+                     float(self.get_value('OfxParamPropDefault', 1))
                     ]
                    )
         elif param_type == 'OfxParamTypeInteger2D':
             return (self.value_as_string('OfxParamPropScriptName'),
-                    [int(self._data['OfxParamPropDefault'][0].value),
-                     int(self._data['OfxParamPropDefault'][1].value)
+                    [int(self.get_value('OfxParamPropDefault', 0)),
+                     int(self.get_value('OfxParamPropDefault', 1))
                     ]
                    )
         elif param_type == 'OfxParamTypeDouble3D':
              return (self.value_as_string('OfxParamPropScriptName'),
-                     [float(self._data['OfxParamPropDefault'][0].value),
-                      float(self._data['OfxParamPropDefault'][1].value),
-                      float(self._data['OfxParamPropDefault'][2].value)
+                     [float(self.get_value('OfxParamPropDefault', 0)),
+                      float(self.get_value('OfxParamPropDefault', 1)),
+                      float(self.get_value('OfxParamPropDefault', 2))
                      ]
                     )
         elif param_type == 'OfxParamTypeInteger3D':
              return (self.value_as_string('OfxParamPropScriptName'),
-                     [int(self._data['OfxParamPropDefault'][0].value),
-                      int(self._data['OfxParamPropDefault'][1].value),
-                      int(self._data['OfxParamPropDefault'][2].value)
+                     [int(self.get_value('OfxParamPropDefault', 0)),
+                      int(self.get_value('OfxParamPropDefault', 1)),
+                      int(self.get_value('OfxParamPropDefault', 2))
                      ]
                     )
         elif param_type == 'OfxParamTypeString':
@@ -428,7 +586,7 @@ class OfxParameterProperties(OfxPropertySet):
         if not self._is_value_param():
             return None
 
-        if self._data['OfxParamPropSecret'].value == 1:
+        if self.get_value('OfxParamPropSecret') == 1:
             return None
 
         param_type = self.value_as_string('OfxParamPropType')
@@ -437,23 +595,23 @@ class OfxParameterProperties(OfxPropertySet):
             return '{:20} {:10} {:>10}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Integer',
-                int(self._data['OfxParamPropDefault'][0].value)
+                int(self.get_value('OfxParamPropDefault', 0))
                 )
         elif param_type == 'OfxParamTypeDouble':
             return '{:20} {:10} {:>14.3f}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Double',
-                float(self._data['OfxParamPropDefault'][0].value)
+                float(self.get_value('OfxParamPropDefault', 0))
                 )
         elif param_type == 'OfxParamTypeBoolean':
             return '{:20} {:10} {:>10}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Boolean',
-                int(self._data['OfxParamPropDefault'][0].value),
+                int(self.get_value('OfxParamPropDefault', 0)),
                 )
         elif param_type == 'OfxParamTypeChoice':
-            number_of_choices = len(self._data['OfxParamPropChoiceOption'])
-            active_choice = int(self._data['OfxParamPropDefault'][0].value)
+            number_of_choices = self.length('OfxParamPropChoiceOption')
+            active_choice = int(self.get_value('OfxParamPropDefault', 0))
             desc_string = '{:20} {:10} {:>10}'.format(
                           self.value_as_string('OfxParamPropScriptName'),
                           'Choice',
@@ -468,48 +626,48 @@ class OfxParameterProperties(OfxPropertySet):
             return '{:20} {:10} {:>14.3f}\n{:>46.3f}\n{:>46.3f}\n{:>46.3f}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'RGBA',
-                float(self._data['OfxParamPropDefault'][0].value),
-                float(self._data['OfxParamPropDefault'][1].value),
-                float(self._data['OfxParamPropDefault'][2].value),
-                float(self._data['OfxParamPropDefault'][3].value)
+                float(self.get_value('OfxParamPropDefault', 0)),
+                float(self.get_value('OfxParamPropDefault', 1)),
+                float(self.get_value('OfxParamPropDefault', 2)),
+                float(self.get_value('OfxParamPropDefault', 3))
                 )
         elif param_type == 'OfxParamTypeRGB':
             return '{:20} {:10} {:>14.3f}\n{:>46.3f}\n{:>46.3f}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'RGB',
-                float(self._data['OfxParamPropDefault'][0].value),
-                float(self._data['OfxParamPropDefault'][1].value),
-                float(self._data['OfxParamPropDefault'][2].value)
+                float(self.get_value('OfxParamPropDefault', 0)),
+                float(self.get_value('OfxParamPropDefault', 1)),
+                float(self.get_value('OfxParamPropDefault', 2))
                 )
         elif param_type == 'OfxParamTypeDouble2D':
             return '{:20} {:10} {:>14.3f}\n{:>46.3f}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Double 2D',
-                float(self._data['OfxParamPropDefault'][0].value),
-                float(self._data['OfxParamPropDefault'][1].value)
+                float(self.get_value('OfxParamPropDefault', 0)),
+                float(self.get_value('OfxParamPropDefault', 1))
                 )
         elif param_type == 'OfxParamTypeInteger2D':
             return '{:20} {:10} {:>10}\n{:>42}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Integer 2D',
-                int(self._data['OfxParamPropDefault'][0].value),
-                int(self._data['OfxParamPropDefault'][1].value)
+                int(self.get_value('OfxParamPropDefault', 0)),
+                int(self.get_value('OfxParamPropDefault', 1))
                 )
         elif param_type == 'OfxParamTypeDouble3D':
              return '{:20} {:10} {:>14.3f}\n{:>46.3f}\n{:>46.3f}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Double 3D',
-                float(self._data['OfxParamPropDefault'][0].value),
-                float(self._data['OfxParamPropDefault'][1].value),
-                float(self._data['OfxParamPropDefault'][2].value)
+                float(self.get_value('OfxParamPropDefault', 0)),
+                float(self.get_value('OfxParamPropDefault', 1)),
+                float(self.get_value('OfxParamPropDefault', 2))
                 )
         elif param_type == 'OfxParamTypeInteger3D':
              return '{:20} {:10} {:>10}\n{:>42}\n{:>42}'.format(
                 self.value_as_string('OfxParamPropScriptName'),
                 'Integer 3D',
-                int(self._data['OfxParamPropDefault'][0].value),
-                int(self._data['OfxParamPropDefault'][1].value),
-                int(self._data['OfxParamPropDefault'][2].value)
+                int(self.get_value('OfxParamPropDefault', 0)),
+                int(self.get_value('OfxParamPropDefault', 1)),
+                int(self.get_value('OfxParamPropDefault', 2))
                 )
         elif param_type == 'OfxParamTypeString':
             return '{:20} {:10}        {}'.format(
@@ -517,6 +675,12 @@ class OfxParameterProperties(OfxPropertySet):
                 'String',
                 self.value_as_string('OfxParamPropDefault', 0)
                 )
+        elif param_type == 'OfxParamTypeParametric':
+            return '{:20} {:10} {:>10}'.format(
+                self.value_as_string('OfxParamPropScriptName'),
+                'Parametric',
+                int(self.get_value('OfxParamPropParametricDimension'))
+                )
 
         return None
 
@@ -600,6 +764,9 @@ class OfxParameterProperties(OfxPropertySet):
         elif param_type == 'OfxParamTypePushButton':
             self._not_group_or_page_params()
             self._value_params(1, 'int')
+        elif param_type == 'OfxParamTypeParametric':
+            self._not_group_or_page_params()
+            self._parametric_params()
         elif param_type == 'OfxParamTypeGroup':
             self._group_params()
         elif param_type == 'OfxParamTypePage':
@@ -683,16 +850,30 @@ class OfxParameterProperties(OfxPropertySet):
         self.add('OfxParamPropCustomCallbackV1')
         return
 
+    def _parametric_params(self):
+        self.add('OfxParamPropAnimates', 0)
+        self.add('OfxParamPropIsAnimating', 0)
+        self.add('OfxParamPropPersistant')
+        self.add('OfxParamPropEvaluateOnChange')
+        self.add('OfxParamPropPluginMayWrite')
+        self.add('OfxParamPropCacheInvalidation', 'OfxParamInvalidateValueChange')
+        self.add('OfxParamPropCanUndo')
+        self.add('OfxParamPropParametricDimension')
+        self.add('OfxParamPropParametricRange', [0.0, 1.0])
+        self.add('OfxParamPropParametricUIColour', [0.0, 0.0, 0.0])
+        self.add('OfxParamPropParametricInteractBackground')
+        return
+
     def _page_params(self):
         self.add('OfxParamPropPageChild')
         return
 
 class OfxSequenceRenderActionProperties(OfxPropertySet):
-    def __init__(self):
+    def __init__(self, first_frame, last_frame, frame_step):
         super().__init__()
 
-        self.add('OfxImageEffectPropFrameRange', [0.0, 1.0])
-        self.add('OfxImageEffectPropFrameStep', 1.0)
+        self.add('OfxImageEffectPropFrameRange', [float(first_frame), float(last_frame)])
+        self.add('OfxImageEffectPropFrameStep', float(frame_step))
         self.add('OfxPropIsInteractive', 0)
         self.add('OfxImageEffectPropRenderScale', [1.0, 1.0])
         self.add('OfxImageEffectPropSequentialRenderStatus', 1)
@@ -702,12 +883,15 @@ class OfxSequenceRenderActionProperties(OfxPropertySet):
         self.add('OfxImageEffectPropOpenGLTextureTarget', 0)
 
 class OfxRenderActionProperties(OfxPropertySet):
-    def __init__(self, width, height):
+    def __init__(self, width, height, time, render_window=None):
         super().__init__()
 
-        self.add('OfxPropTime', 25)
+        if render_window is None:
+            render_window = [0, 0, width, height]
+
+        self.add('OfxPropTime', float(time))
         self.add('OfxImageEffectPropFieldToRender', 'OfxImageFieldNone')
-        self.add('OfxImageEffectPropRenderWindow', [0, 0, width, height])
+        self.add('OfxImageEffectPropRenderWindow', render_window)
         self.add('OfxImageEffectPropRenderScale', [1.0, 1.0])
         self.add('OfxImageEffectPropSequentialRenderStatus', 1)
         self.add('OfxImageEffectPropInteractiveRenderStatus', 0)
@@ -715,19 +899,3 @@ class OfxRenderActionProperties(OfxPropertySet):
         self.add('OfxImageEffectPropOpenGLEnabled', 0)
         self.add('OfxImageEffectPropOpenGLTextureIndex', 0)
         self.add('OfxImageEffectPropOpenGLTextureTarget', 0)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
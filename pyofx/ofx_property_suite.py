@@ -64,66 +64,12 @@ class OfxPropertySuite():
         return handle.property_type.decode("utf-8")
 
     def _get_property_object(self, ctype_handle):
-        handle = ofx_ctypes.CStructOfxHandle.from_address(ctype_handle)
-        property_type = handle.property_type.decode("utf-8")
-        bundle = handle.bundle.decode("utf-8")
-        plugin = handle.plugin.decode("utf-8")
-        context = handle.context.decode("utf-8")
-        active_uid = handle.active_uid.decode("utf-8")
-        name = handle.name.decode("utf-8")
-
-        if property_type == 'OfxTypeImageEffectHost':
-            return self._host['ctypes']
-
-        if property_type == 'OfxTypeImageEffect':
-            if plugin in self._host['bundles'][bundle]['plugins']:
-                return self._host['bundles'][bundle]['plugins'][plugin]['ctypes']
-
-        if property_type == 'OfxImageEffectPropContext':
-            if plugin in self._host['bundles'][bundle]['plugins']:
-                if context in self._host['bundles'][bundle]['plugins'][plugin]['contexts']:
-                    return self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['ctypes']
-
-        if property_type == 'OfxTypeClip':
-            if plugin in self._host['bundles'][bundle]['plugins']:
-                if context in self._host['bundles'][bundle]['plugins'][plugin]['contexts']:
-                    if name in self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['clips']:
-                        return self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['clips'][name]['ctypes']
-
-        if property_type == 'OfxTypeParameter':
-            if plugin in self._host['bundles'][bundle]['plugins']:
-                if context in self._host['bundles'][bundle]['plugins'][plugin]['contexts']:
-                    if name in self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['parameters']:
-                        return self._host['bundles'][bundle]['plugins'][plugin]['contexts'][context]['parameters'][name]['ctypes']
-
-        if property_type == 'OfxTypeImageEffectInstance':
-            if active_uid in self._host['active']['plugins']:
-                return self._host['active']['plugins'][active_uid]['ctypes']
-
-        if property_type == 'OfxTypeClipInstance':
-            if active_uid in self._host['active']['plugins']:
-                if name in self._host['active']['plugins'][active_uid]['clips']:
-                    return self._host['active']['plugins'][active_uid]['clips'][name]['ctypes']
-
-        if property_type == 'OfxTypeParameterInstance':
-            if active_uid in self._host['active']['plugins']:
-                if name in self._host['active']['plugins'][active_uid]['parameters']:
-                    return self._host['active']['plugins'][active_uid]['parameters'][name]['ctypes']
-
-        if property_type == 'OfxRenderAction':
-            if active_uid in self._host['active']['plugins']:
-                return self._host['active']['plugins'][active_uid]['render']['action']['ctypes']
-
-        if property_type == 'OfxSequenceRenderAction':
-            if active_uid in self._host['active']['plugins']:
-                return self._host['active']['plugins'][active_uid]['render']['sequence']['ctypes']
-
-        if property_type == 'OfxImage':
-            if active_uid in self._host['active']['plugins']:
-                if name in self._host['active']['plugins'][active_uid]['clips']:
-                    return self._host['active']['plugins'][active_uid]['clips'][name]['image']['ctypes']
-
-        return None
+        record = self._host['handles'].get(ctype_handle)
+
+        if record is None:
+            return None
+
+        return record['ctypes']
 
     ##################################################################################################################
     #
@@ -139,13 +85,14 @@ class OfxPropertySuite():
             logging.error('propSetString, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetString, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetString, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        property_obj.update(ctype_string.decode('utf-8'), ctype_value.decode('utf-8'), 'str', ctype_index)
+        property_obj.update(property_key, ctype_value, 'str', ctype_index)
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -157,13 +104,14 @@ class OfxPropertySuite():
             logging.error('propSetDouble, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetDouble, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetDouble, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        property_obj.update(ctype_string.decode('utf-8'), ctype_value, 'dbl', ctype_index)
+        property_obj.update(property_key, ctype_value, 'dbl', ctype_index)
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -175,13 +123,14 @@ class OfxPropertySuite():
             logging.error('propSetInt, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetInt, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetInt, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        property_obj.update(ctype_string.decode('utf-8'), ctype_value, 'int', ctype_index)
+        property_obj.update(property_key, ctype_value, 'int', ctype_index)
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -193,16 +142,14 @@ class OfxPropertySuite():
             logging.error('propSetPointer, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetPointer, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetPointer, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        if ctype_value:
-            property_obj.update(ctype_string.decode('utf-8'), ctype_value, 'ptr', ctype_index)
-        else:
-            property_obj.update(ctype_string.decode('utf-8'), 0, 'ptr', ctype_index)
+        property_obj.update(property_key, ctype_value, 'ptr', ctype_index)
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -214,15 +161,14 @@ class OfxPropertySuite():
             logging.error('propSetPointerN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetPointerN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetPointerN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_int))
-        for index in range(0, ctype_count):
-            property_obj.update(ctype_string.decode('utf-8'), ctype_value_ptr[index], 'ptr', index)
+        property_obj.set_n(property_key, ctype_count, ctype_value, 'ptr')
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -234,16 +180,14 @@ class OfxPropertySuite():
             logging.error('propSetStringN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetStringN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetStringN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_char_p))
-        for index in range(0, ctype_count):
-            value_as_string = ctype_value_ptr[index].decode('utf-8')
-            property_obj.update(ctype_string.decode('utf-8'), value_as_string, 'ptr', index)
+        property_obj.set_n(property_key, ctype_count, ctype_value, 'str')
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -255,15 +199,14 @@ class OfxPropertySuite():
             logging.error('propSetDoubleN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetDoubleN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetDoubleN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_double))
-        for index in range(0, ctype_count):
-            property_obj.update(ctype_string.decode('utf-8'), ctype_value_ptr[index], 'dbl', index)
+        property_obj.set_n(property_key, ctype_count, ctype_value, 'dbl')
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -275,15 +218,14 @@ class OfxPropertySuite():
             logging.error('propSetIntN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propSetIntN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propSetIntN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_int))
-        for index in range(0, ctype_count):
-            property_obj.update(ctype_string.decode('utf-8'), ctype_value_ptr[index], 'int', index)
+        property_obj.set_n(property_key, ctype_count, ctype_value, 'int')
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -298,16 +240,22 @@ class OfxPropertySuite():
 
         if property_obj is None:
             property_type = self._get_handle_type(ctype_handle)
-            logging.error('propGetInt, unknown handle {}'.format(property_type)) 
+            logging.error('propGetString, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetInt, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetString, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value.contents.value = property_obj.ptr(ctype_string.decode('utf-8'), ctype_index)
+        address = property_obj.ptr(property_key, ctype_index)
+
+        if address is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_void_p))[0] = address
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -319,13 +267,19 @@ class OfxPropertySuite():
             logging.error('propGetDouble, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetDouble, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetDouble, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value.contents.value = property_obj.get(ctype_string.decode('utf-8'), ctype_index).value
+        value = property_obj.get_value(property_key, ctype_index)
+
+        if value is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        ctype_value[0] = value
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -337,13 +291,19 @@ class OfxPropertySuite():
             logging.error('propGetInt, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetInt, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetInt, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value.contents.value = property_obj.get(ctype_string.decode('utf-8'), ctype_index).value
+        value = property_obj.get_value(property_key, ctype_index)
+
+        if value is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        ctype_value[0] = value
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -355,13 +315,19 @@ class OfxPropertySuite():
             logging.error('propGetPointer, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetPointer, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetPointer, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value.contents.value = property_obj.get(ctype_string.decode('utf-8'), ctype_index).value
+        value = property_obj.get_value(property_key, ctype_index)
+
+        if value is None:
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
+
+        ctype_value[0] = value
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -373,15 +339,15 @@ class OfxPropertySuite():
             logging.error('propGetDoubleN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetDoubleN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetDoubleN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_double))
-        for index in range(0, ctype_count):
-            ctype_value_ptr[index] = float(property_obj.get(ctype_string.decode('utf-8'), index).value)
+        if not property_obj.get_n(property_key, ctype_count, ctype_value, 'dbl'):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -393,15 +359,15 @@ class OfxPropertySuite():
             logging.error('propGetIntN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetIntN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetIntN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_int))
-        for index in range(0, ctype_count):
-            ctype_value_ptr[index] = int(property_obj.get(ctype_string.decode('utf-8'), index).value)
+        if not property_obj.get_n(property_key, ctype_count, ctype_value, 'int'):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -413,15 +379,15 @@ class OfxPropertySuite():
             logging.error('propGetPointerN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetPointerN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetPointerN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_void_p))
-        for index in range(0, ctype_count):
-            ctype_value_ptr[index] = int(property_obj.get(ctype_string.decode('utf-8'), index).value)
+        if not property_obj.get_n(property_key, ctype_count, ctype_value, 'ptr'):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -433,15 +399,15 @@ class OfxPropertySuite():
             logging.error('propGetStringN, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetStringN, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetStringN, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_value_ptr = ctypes.cast(ctype_value, ctypes.POINTER(ctypes.c_char_p))
-        for index in range(0, ctype_count):
-            ctype_value_ptr[index] = int(property_obj.get(ctype_string.decode('utf-8'), index).value)
+        if not property_obj.get_n(property_key, ctype_count, ctype_value, 'str'):
+            return ofx_status_codes.OFX_STATUS_ERR_BAD_INDEX
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -453,13 +419,14 @@ class OfxPropertySuite():
             logging.error('propGetDimension, unknown handle {}'.format(property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_BAD_HANDLE
 
-        if not property_obj.contains(ctype_string.decode('utf-8')):
+        property_key = ctype_string.decode('utf-8')
+
+        if not property_obj.contains(property_key):
             property_type = self._get_handle_type(ctype_handle)
-            property_string = ctype_string.decode('utf-8')
-            logging.warning('propGetDimension, property {} not in {}'.format(property_string, property_type)) 
+            logging.warning('propGetDimension, property {} not in {}'.format(property_key, property_type)) 
             return ofx_status_codes.OFX_STATUS_ERR_UNKNOWN
 
-        ctype_count.contents.value = property_obj.length(ctype_string.decode('utf-8'))
+        ctype_count.contents.value = property_obj.length(property_key)
 
         return ofx_status_codes.OFX_STATUS_OK
 
@@ -0,0 +1,120 @@
+#! /usr/bin/python3
+#
+# Copyright 2020 by David Barker.
+# All rights reserved.
+# This file is part of pyofx the Python3 based OpenFX plugin render host,
+# and is released under the "MIT License Agreement". Please see the LICENSE
+# file that should have been included as part of this package.
+
+# Jobs are sent to the server as one JSON object per line:
+#
+#     {"command": "render", "dir": "/path/to/bundles", "settings": {...}}
+#     {"command": "shutdown"}
+#
+# where settings is the same dictionary as the render command's JSON file.
+# The server answers each job with one JSON line, {"status": 0} on success.
+
+import os
+import json
+import socket
+import logging
+import socketserver
+import ofx_host
+import ofx_status_codes
+
+DEFAULT_SOCKET = '/tmp/pyofx.sock'
+
+class OfxRenderRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            reply = self.server.handle_job(line)
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+class OfxRenderServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path=DEFAULT_SOCKET, num_threads=None, negative_row_bytes=False, instrument=False, trace_file=None,
+                 memory_budget=None, instance_memory_budget=None, spill='file'):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        super().__init__(socket_path, OfxRenderRequestHandler)
+
+        self._socket_path = socket_path
+        self._ofx_host = ofx_host.OfxHost(num_threads, negative_row_bytes, instrument, memory_budget, instance_memory_budget, spill)
+        self._trace_file = trace_file
+        self._running = False
+
+    def handle_job(self, line):
+        try:
+            job = json.loads(line.decode('utf-8'))
+        except ValueError:
+            logging.error('Render server received invalid JSON')
+            return {'status': ofx_status_codes.OFX_STATUS_ERR_FORMAT, 'message': 'Invalid JSON'}
+
+        command = job.get('command', 'render')
+
+        if command == 'shutdown':
+            self._running = False
+            return {'status': ofx_status_codes.OFX_STATUS_OK}
+
+        if command != 'render':
+            logging.error('Render server received unknown command {}'.format(command))
+            return {'status': ofx_status_codes.OFX_STATUS_ERR_UNSUPPORTED, 'message': 'Unknown command'}
+
+        try:
+            status = self._ofx_host.warm_render(job['dir'], job['settings'])
+        except Exception as e:
+            logging.exception('Render job failed')
+            return {'status': ofx_status_codes.OFX_STATUS_FAILED, 'message': str(e)}
+
+        return {'status': status}
+
+    def serve(self):
+        logging.info('Render server listening on {}'.format(self._socket_path))
+
+        self._running = True
+
+        try:
+            while self._running:
+                self.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._ofx_host.release_warm()
+            self._ofx_host.report_timing(self._trace_file)
+            self.server_close()
+            os.unlink(self._socket_path)
+
+def submit_job(directory, json_file, socket_path=DEFAULT_SOCKET):
+    with open(json_file, 'r') as fp:
+        settings = json.load(fp)
+
+    # The server has its own working directory, so send absolute paths
+    for group in ['required', 'optional']:
+        for clip_name in settings['image_paths'][group]:
+            if settings['image_paths'][group][clip_name] is not None:
+                settings['image_paths'][group][clip_name] = os.path.abspath(settings['image_paths'][group][clip_name])
+
+    job = {
+        'command':  'render',
+        'dir':      os.path.abspath(directory),
+        'settings': settings
+    }
+
+    return send_command(job, socket_path)
+
+def send_command(job, socket_path=DEFAULT_SOCKET):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(job).encode('utf-8') + b'\n')
+
+        with client.makefile('rb') as fp:
+            reply = json.loads(fp.readline().decode('utf-8'))
+
+    if reply['status'] != ofx_status_codes.OFX_STATUS_OK:
+        logging.error('Render job failed: {}'.format(reply.get('message', reply['status'])))
+
+    return reply['status']